@@ -0,0 +1,141 @@
+import os
+import datetime
+import threading
+import uuid
+
+from alert_delivery import enqueue_alert_flow
+
+SEVERITY_RANK = {'Low': 1, 'Medium': 2, 'High': 3}
+
+class AlertAggregator:
+    """
+    Coalesces investigation results before the alert fan-out.
+
+    Investigations are grouped by (volume, SVM, behavior pattern). All groups
+    that open within `window_seconds` are emitted together as one digest (one
+    PDF, one email, one Teams card). Once a group has been alerted, repeats
+    for the same key are suppressed until it has been quiet for
+    `incident_timeout` seconds, i.e. the incident is over.
+    """
+
+    def __init__(self, on_digest, window_seconds=60, incident_timeout=1800):
+        self.on_digest = on_digest
+        self.window = datetime.timedelta(seconds=window_seconds)
+        self.incident_timeout = datetime.timedelta(seconds=incident_timeout)
+        self._lock = threading.Lock()
+        self._groups = {}      # key -> pending group in the current window
+        self._alerted = {}     # key -> last time an already-alerted incident was seen
+        self._window_start = None
+        self._suppressed = 0
+        self._timer = None
+        self.stats = {'submitted': 0, 'suppressed': 0, 'digests': 0}
+
+    @staticmethod
+    def group_key(result):
+        return (result['volume'], result.get('svm', 'N/A'), result['analysis']['behavior_pattern'])
+
+    def submit(self, result, now=None):
+        """
+        Adds a completed investigation. Returns False if it was suppressed as
+        a repeat of an ongoing incident.
+        """
+        if result.get('status') != 'Completed':
+            return False
+        now = now or datetime.datetime.now()
+        key = self.group_key(result)
+
+        with self._lock:
+            self.stats['submitted'] += 1
+            last_seen = self._alerted.get(key)
+            if key not in self._groups and last_seen is not None and now - last_seen <= self.incident_timeout:
+                self._alerted[key] = now
+                self._suppressed += 1
+                self.stats['suppressed'] += 1
+                return False
+
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = {
+                    'volume': key[0],
+                    'svm': key[1],
+                    'pattern': key[2],
+                    'count': 0,
+                    'first_seen': now,
+                    'severity': result['severity']
+                }
+            group['count'] += 1
+            group['last_seen'] = now
+            group['investigation'] = result
+            group['primary_cause'] = result['findings']['primary_cause']
+            if SEVERITY_RANK.get(result['severity'], 0) > SEVERITY_RANK.get(group['severity'], 0):
+                group['severity'] = result['severity']
+
+            if self._window_start is None:
+                self._window_start = now
+                self._timer = threading.Timer(self.window.total_seconds(), self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            return True
+
+    def flush(self):
+        """
+        Emits the pending window as one digest (called by the window timer).
+        A window holding a single event is passed through as the original
+        investigation so it keeps its full report with the performance graph.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            groups = list(self._groups.values())
+            if not groups:
+                self._window_start = None
+                return None
+
+            for group in groups:
+                self._alerted[(group['volume'], group['svm'], group['pattern'])] = group['last_seen']
+            now = datetime.datetime.now()
+            self._alerted = {k: t for k, t in self._alerted.items() if now - t <= self.incident_timeout}
+
+            if len(groups) == 1 and groups[0]['count'] == 1:
+                digest = groups[0]['investigation']
+            else:
+                digest = {
+                    'id': f"DIGEST-{now.strftime('%Y%m%d')}-{str(uuid.uuid4())[:8]}",
+                    'window_start': self._window_start.strftime('%Y-%m-%d %H:%M:%S'),
+                    'window_end': now.strftime('%Y-%m-%d %H:%M:%S'),
+                    'severity': max((g['severity'] for g in groups), key=lambda s: SEVERITY_RANK.get(s, 0)),
+                    'suppressed': self._suppressed,
+                    'groups': [
+                        dict(g, first_seen=g['first_seen'].strftime('%H:%M:%S'), last_seen=g['last_seen'].strftime('%H:%M:%S'))
+                        for g in sorted(groups, key=lambda g: -SEVERITY_RANK.get(g['severity'], 0))
+                    ]
+                }
+
+            self._groups = {}
+            self._window_start = None
+            self._suppressed = 0
+            self.stats['digests'] += 1
+
+        self.on_digest(digest)
+        return digest
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+_alert_config = {}
+
+def aggregate_alert(investigation_result, config):
+    """
+    Submits an investigation to the process-wide aggregator. Digests are
+    queued on the alert dispatcher with the most recent config.
+    """
+    global _aggregator
+    with _aggregator_lock:
+        if _aggregator is None:
+            _aggregator = AlertAggregator(
+                on_digest=lambda digest: enqueue_alert_flow(digest, dict(_alert_config)),
+                window_seconds=int(os.getenv('ALERT_WINDOW_SECONDS', '60')),
+                incident_timeout=int(os.getenv('ALERT_INCIDENT_TIMEOUT', '1800'))
+            )
+        _alert_config.update(config)
+    return _aggregator.submit(investigation_result)
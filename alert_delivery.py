@@ -0,0 +1,178 @@
+import os
+import queue
+import smtplib
+import threading
+import time
+import random
+from concurrent.futures import Future
+import requests
+
+import alerting
+from report_renderer import render_report
+
+class SMTPConnectionPool:
+    """
+    Keeps authenticated SMTP connections open between messages instead of
+    paying TLS + AUTH for every alert. Connections are checked with NOOP
+    before reuse and dropped on any error.
+    """
+
+    def __init__(self, max_size=2, connect=None):
+        self.max_size = max_size
+        self.connect = connect or alerting.open_smtp_connection
+        self._idle = queue.LifoQueue()
+
+    def _checkout(self):
+        while True:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                return self.connect()
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(server)
+
+    def _discard(self, server):
+        try:
+            server.close()
+        except Exception:
+            pass
+
+    def send_message(self, msg):
+        server = self._checkout()
+        try:
+            server.send_message(msg)
+        except Exception:
+            self._discard(server)
+            raise
+        if self._idle.qsize() < self.max_size:
+            self._idle.put(server)
+        else:
+            self._discard(server)
+
+    def close(self):
+        while not self._idle.empty():
+            server = self._idle.get_nowait()
+            try:
+                server.quit()
+            except Exception:
+                self._discard(server)
+
+def retry_with_backoff(fn, attempts=3, base_delay=1.0, label="task"):
+    """
+    Calls fn() until it returns truthy, retrying exceptions and falsy results
+    with exponential backoff (base_delay * 2^n, plus jitter).
+    """
+    for attempt in range(attempts):
+        try:
+            if fn():
+                return True
+        except Exception as e:
+            print(f"[DELIVERY ERROR] {label} attempt {attempt + 1}/{attempts}: {e}")
+        if attempt < attempts - 1:
+            time.sleep(base_delay * (2 ** attempt) * random.uniform(1.0, 1.5))
+    return False
+
+class AlertDispatcher:
+    """
+    Background alert delivery: enqueue() returns immediately and worker
+    threads have the PDF rendered by the report_renderer process pool, email it through a persistent SMTP pool and post
+    the Teams card through a shared keep-alive HTTP session, with retries.
+    """
+
+    def __init__(self, workers=2, attempts=3, base_delay=1.0, smtp_pool=None, session=None):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.smtp_pool = smtp_pool or SMTPConnectionPool(max_size=workers)
+        self.session = session or requests.Session()
+        self._queue = queue.Queue()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"alert-delivery-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def enqueue(self, investigation_result, config):
+        """
+        Queues an alert flow and returns a Future resolving to the list of
+        channels delivered (same as trigger_alert_flow()).
+        """
+        future = Future()
+        self._queue.put((investigation_result, config, future))
+        return future
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def shutdown(self, wait=True):
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self.smtp_pool.close()
+        self.session.close()
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            investigation_result, config, future = item
+            try:
+                future.set_result(self.deliver(investigation_result, config))
+            except Exception as e:
+                print(f"[DELIVERY ERROR] {e}")
+                future.set_exception(e)
+
+    def deliver(self, investigation_result, config):
+        """Runs one alert flow synchronously on the calling (worker) thread."""
+        actions = []
+
+        # Only alert on High Severity for this POC (or config based)
+        if investigation_result['severity'] != 'High':
+            return actions
+
+        # Rendered in a worker process (several delivery threads can wait on it
+        # at once) and kept in memory; digests come from alert_aggregation
+        pdf_bytes = render_report(investigation_result)
+        print(f"[REPORT] Generated AI Investigation PDF: {alerting.report_filename(investigation_result)} ({len(pdf_bytes) // 1024} KB)")
+
+        if config.get('enable_email', False):
+            msg = alerting.build_email_message(investigation_result, attachment=pdf_bytes)
+
+            def send():
+                self.smtp_pool.send_message(msg)
+                return True
+
+            if retry_with_backoff(send, self.attempts, self.base_delay, label="Email"):
+                print(f"[EMAIL SENT] Report emailed to {msg['To']}")
+                actions.append('Email')
+
+        if config.get('enable_teams', False):
+            if retry_with_backoff(
+                lambda: alerting.send_teams(investigation_result, attachment=pdf_bytes, session=self.session),
+                self.attempts, self.base_delay, label="Teams"
+            ):
+                actions.append('Teams')
+
+        return actions
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher():
+    """Returns the process-wide dispatcher, starting it on first use."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = AlertDispatcher(workers=int(os.getenv('ALERT_WORKERS', '2')))
+        return _dispatcher
+
+def enqueue_alert_flow(investigation_result, config):
+    """Non-blocking counterpart of alerting.trigger_alert_flow()."""
+    return get_dispatcher().enqueue(investigation_result, config)
@@ -1,6 +1,9 @@
 import os
 import smtplib
 import ssl
+import datetime
+import threading
+import time
 from email.message import EmailMessage
 from dotenv import load_dotenv
 import requests
@@ -22,6 +25,12 @@ GMAIL_REFRESH_TOKEN = os.getenv('GMAIL_REFRESH_TOKEN')
 # NOTE: Teams requires an incoming webhook URL, not an email address. Use a placeholder if not set.
 TEAMS_WEBHOOK_URL = os.getenv('TEAMS_WEBHOOK_URL', 'https://outlook.office.com/webhook/PLACEHOLDER')
 
+# SMTP endpoint. Point these at a local debugging server for testing, e.g.
+# SMTP_HOST=localhost SMTP_PORT=8025 SMTP_SECURITY=none
+SMTP_HOST = os.getenv('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.getenv('SMTP_PORT', '465'))
+SMTP_SECURITY = os.getenv('SMTP_SECURITY', 'ssl')  # 'ssl', 'starttls' or 'none'
+
 
 def format_email_body(anomaly_data):
     """
@@ -90,11 +99,76 @@ def format_teams_card(data):
 
 
 
-def get_gmail_access_token():
-    """Rerieve a valid access token using the refresh token."""
-    if not all([GMAIL_CLIENT_ID, GMAIL_CLIENT_SECRET, GMAIL_REFRESH_TOKEN]):
-        return None
-    
+class AccessTokenCache:
+    """
+    Process-wide OAuth2 access-token cache. The token is reused until
+    `refresh_margin` seconds before it expires; concurrent senders that find
+    it stale wait on a lock so only one of them performs the network refresh.
+    """
+
+    def __init__(self, refresh_margin=300):
+        self.refresh_margin = datetime.timedelta(seconds=refresh_margin)
+        self._lock = threading.Lock()
+        self._token = None
+        self._expiry = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.refresh_seconds_total = 0.0
+        self.refresh_seconds_max = 0.0
+
+    def _fresh(self):
+        # google-auth reports expiry as naive UTC
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return self._token is not None and (self._expiry is None or now < self._expiry - self.refresh_margin)
+
+    def get(self, refresh):
+        """
+        Returns the cached token, or calls refresh() -> (token, expiry) once under the lock.
+        """
+        if self._fresh():
+            self.hits += 1
+            return self._token
+        with self._lock:
+            # Another sender may have refreshed while we waited
+            if self._fresh():
+                self.hits += 1
+                return self._token
+            self.misses += 1
+            start = time.perf_counter()
+            try:
+                self._token, self._expiry = refresh()
+            except Exception:
+                self.failures += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self.refresh_seconds_total += elapsed
+                self.refresh_seconds_max = max(self.refresh_seconds_max, elapsed)
+            self.refreshes += 1
+            return self._token
+
+    def invalidate(self):
+        """Drops the cached token (e.g. after the server rejected it)."""
+        with self._lock:
+            self._token = None
+            self._expiry = None
+
+    def stats(self):
+        attempts = self.refreshes + self.failures
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "avg_refresh_ms": 1000 * self.refresh_seconds_total / attempts if attempts else 0.0,
+            "max_refresh_ms": 1000 * self.refresh_seconds_max
+        }
+
+_token_cache = AccessTokenCache()
+
+def _refresh_gmail_access_token():
     creds = Credentials(
         None,
         refresh_token=GMAIL_REFRESH_TOKEN,
@@ -102,72 +176,114 @@ def get_gmail_access_token():
         client_id=GMAIL_CLIENT_ID,
         client_secret=GMAIL_CLIENT_SECRET
     )
+    creds.refresh(Request())
+    return creds.token, creds.expiry
+
+def get_gmail_access_token():
+    """Rerieve a valid access token using the refresh token (cached until shortly before expiry)."""
+    if not all([GMAIL_CLIENT_ID, GMAIL_CLIENT_SECRET, GMAIL_REFRESH_TOKEN]):
+        return None
     
     try:
-        creds.refresh(Request())
-        return creds.token
+        return _token_cache.get(_refresh_gmail_access_token)
     except Exception as e:
         print(f"[OAUTH ERROR] Failed to refresh token: {e}")
         return None
 
-def send_email(investigation_result, attachment=None):
-    """Send an email via Gmail using OAuth2 (preferred) or App Password.
-    """
-    user = GMAIL_USER
-    
-    # Try OAuth2 first
-    access_token = get_gmail_access_token()
-    use_oauth = bool(access_token)
-    
-    # Fallback to App Password
-    password = GMAIL_APP_PASSWORD
-    
-    if not use_oauth and not password:
-        print('[EMAIL ERROR] No valid Gmail credentials (neither OAuth2 nor App Password) found.')
-        return False
+def get_token_cache_stats():
+    """Hit/miss/refresh-latency counters of the access-token cache."""
+    return _token_cache.stats()
 
+def report_filename(investigation_result):
+    """Attachment name of a rendered investigation or digest report."""
+    prefix = "AI_Digest" if 'groups' in investigation_result else "AI_Investigation"
+    return f"{prefix}_{investigation_result['id']}.pdf"
+
+def build_email_message(investigation_result, attachment=None):
+    """
+    Builds the report email (with optional PDF attachment). `attachment` is
+    the rendered PDF as bytes, or the path of a PDF file.
+    """
     msg = EmailMessage()
-    msg['Subject'] = f"AI Investigation Report for volume {investigation_result['volume']}"
-    msg['From'] = user
-    msg['To'] = user  # sending to self for POC
+    if 'groups' in investigation_result:
+        msg['Subject'] = f"AI Incident Digest: {len(investigation_result['groups'])} incident(s) ({investigation_result['window_end']})"
+    else:
+        msg['Subject'] = f"AI Investigation Report for volume {investigation_result['volume']}"
+    msg['From'] = GMAIL_USER
+    msg['To'] = GMAIL_USER  # sending to self for POC
     msg.set_content(format_email_body(investigation_result))
 
-    if attachment and os.path.isfile(attachment):
+    if isinstance(attachment, (bytes, bytearray)):
+        msg.add_attachment(bytes(attachment), maintype='application', subtype='pdf',
+                           filename=report_filename(investigation_result))
+    elif attachment and os.path.isfile(attachment):
         with open(attachment, 'rb') as f:
             file_data = f.read()
             file_name = os.path.basename(attachment)
         msg.add_attachment(file_data, maintype='application', subtype='pdf', filename=file_name)
+    return msg
 
+def open_smtp_connection():
+    """Opens an SMTP connection and authenticates via OAuth2 (preferred) or App Password.
+    Servers that do not advertise AUTH (e.g. a local debugging server) are used unauthenticated.
+    """
+    user = GMAIL_USER
+    password = GMAIL_APP_PASSWORD
     context = ssl.create_default_context()
+
+    if SMTP_SECURITY == 'ssl':
+        server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=context, timeout=30)
+    else:
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
     try:
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465, context=context) as server:
-            server.ehlo()  # Explicitly identify ourselves to the server
-            if use_oauth:
-                # OAuth2 Authentication
-                auth_string = f"user={user}\1auth=Bearer {access_token}\1\1"
-                code, response = server.docmd('AUTH', 'XOAUTH2 ' + base64.b64encode(auth_string.encode()).decode())
-                if code != 235:
-                    print(f"[OAUTH AUTH ERROR] Code: {code}, Response: {response}")
-                    # If OAuth fails, try falling back to App Password if available
-                    if password:
-                        print("[INFO] Falling back to App Password...")
-                        server.login(user, password)
-                    else:
-                        raise Exception(f"OAuth authentication failed: {response}")
-            else:
-                # Standard App Password Authentication
-                server.login(user, password)
-            
+        server.ehlo()  # Explicitly identify ourselves to the server
+        if SMTP_SECURITY == 'starttls':
+            server.starttls(context=context)
+            server.ehlo()
+        if not server.has_extn('auth'):
+            return server
+
+        # Try OAuth2 first
+        access_token = get_gmail_access_token()
+        if access_token:
+            # OAuth2 Authentication
+            auth_string = f"user={user}\1auth=Bearer {access_token}\1\1"
+            code, response = server.docmd('AUTH', 'XOAUTH2 ' + base64.b64encode(auth_string.encode()).decode())
+            if code == 235:
+                return server
+            print(f"[OAUTH AUTH ERROR] Code: {code}, Response: {response}")
+            _token_cache.invalidate()  # Don't keep handing out a rejected token
+            # If OAuth fails, try falling back to App Password if available
+            if not password:
+                raise Exception(f"OAuth authentication failed: {response}")
+            print("[INFO] Falling back to App Password...")
+        elif not password:
+            raise Exception('No valid Gmail credentials (neither OAuth2 nor App Password) found.')
+
+        # Standard App Password Authentication
+        server.login(user, password)
+        return server
+    except Exception:
+        server.close()
+        raise
+
+def send_email(investigation_result, attachment=None):
+    """Send an email via Gmail using OAuth2 (preferred) or App Password.
+    Opens a fresh connection per call; alert_delivery.AlertDispatcher reuses pooled connections instead.
+    """
+    msg = build_email_message(investigation_result, attachment)
+    try:
+        with open_smtp_connection() as server:
             server.send_message(msg)
-        print(f"[EMAIL SENT] Report emailed to {user}")
+        print(f"[EMAIL SENT] Report emailed to {GMAIL_USER}")
         return True
     except Exception as e:
         print(f"[EMAIL ERROR] {e}")
         return False
 
-def send_teams(investigation_result, attachment=None):
+def send_teams(investigation_result, attachment=None, session=None):
     """Send a Microsoft Teams message via Incoming Webhook with the investigation report attached.
-    Expects environment variable TEAMS_WEBHOOK_URL.
+    Expects environment variable TEAMS_WEBHOOK_URL. Pass a requests.Session to reuse keep-alive connections.
     """
     webhook_url = os.getenv('TEAMS_WEBHOOK_URL')
     if not webhook_url:
@@ -175,18 +291,20 @@ def send_teams(investigation_result, attachment=None):
         return False
     card = format_teams_card(investigation_result)
     try:
-        response = requests.post(webhook_url, json=card)
+        response = (session or requests).post(webhook_url, json=card, timeout=30)
         if response.status_code == 200:
             print('[TEAMS SENT] Notification posted.')
         else:
             print(f'[TEAMS ERROR] Status {response.status_code}: {response.text}')
+            return False
     except Exception as e:
         print(f'[TEAMS EXCEPTION] {e}')
         return False
     # Attachment handling is not supported directly by Teams webhook; the PDF is attached via email.
     return True
 
-from reporting import generate_investigation_report
+from reporting import render_investigation_body, stamp_report
+from report_cache import report_cache, report_key
 
 def trigger_alert_flow(investigation_result, config):
     """
@@ -198,34 +316,25 @@ def trigger_alert_flow(investigation_result, config):
     if investigation_result['severity'] != 'High':
         return actions
 
-    # Generate Detailed PDF Report
+    # Generate Detailed PDF Report (in memory; attached straight from bytes)
     # Uses the new AI-specific report generator
-    pdf_path = generate_investigation_report(
-        investigation_result, 
-        filename=f"AI_Investigation_{investigation_result['id']}.pdf"
-    )
-    print(f"[REPORT] Generated AI Investigation PDF: {pdf_path}")
+    body = report_cache.get_or_render(report_key(investigation_result),
+                                      lambda: render_investigation_body(investigation_result))
+    pdf_bytes = stamp_report(body, investigation_result)
+    print(f"[REPORT] Generated AI Investigation PDF: {report_filename(investigation_result)} ({len(pdf_bytes) // 1024} KB)")
 
     # Check Email Config
     if config.get('enable_email', False):
         # Use real Gmail email sending
-        if send_email(investigation_result, attachment=pdf_path):
+        if send_email(investigation_result, attachment=pdf_bytes):
             actions.append('Email')
 
     # Check Teams Config
     if config.get('enable_teams', False):
         # Use real Teams webhook
-        if send_teams(investigation_result, attachment=pdf_path):
+        if send_teams(investigation_result, attachment=pdf_bytes):
             actions.append('Teams')
             
-    # Cleanup temporary PDF report
-    if pdf_path and os.path.isfile(pdf_path):
-        try:
-            os.remove(pdf_path)
-            print(f"[CLEANUP] Removed temporary report: {pdf_path}")
-        except Exception as e:
-            print(f"[CLEANUP ERROR] Could not remove report: {e}")
-            
     return actions
 
 def format_email_body(data):
@@ -257,6 +366,27 @@ def format_email_body(data):
         
         A detailed PDF report with technical analysis is attached.
         """
+    elif 'groups' in data:
+        # Coalesced digest from alert_aggregation
+        lines = "\n".join(
+            f"        - {g['volume']} ({g['svm']}): {g['pattern']} -> {g['primary_cause']} "
+            f"[{g['severity']}, {g['count']} event(s), {g['first_seen']} - {g['last_seen']}]"
+            for g in data['groups']
+        )
+        return f"""
+        Subject: AI INCIDENT DIGEST: {len(data['groups'])} incident(s)
+        
+        To: Storage Admin Team
+        From: NetApp AI Monitor (POC)
+        
+        DIGEST {data['id']} ({data['window_start']} - {data['window_end']}):
+        --------------------------------------------------
+{lines}
+        --------------------------------------------------
+        Repeats suppressed for ongoing incidents: {data['suppressed']}
+        
+        A PDF digest with per-incident findings is attached.
+        """
     else:
         # Fallback for old simple rows (if any)
         return f"Legacy Alert for {data.get('Volume_Name', 'Unknown')}"
@@ -281,6 +411,20 @@ def format_teams_card(data):
                 "text": data['analysis']['description']
             }]
         }
+    if 'groups' in data:
+        return {
+            "@type": "MessageCard",
+            "summary": f"AI Incident Digest: {len(data['groups'])} incident(s)",
+            "sections": [{
+                "activityTitle": "AI Incident Digest",
+                "activitySubtitle": f"{data['window_start']} - {data['window_end']} | Severity: {data['severity']}",
+                "facts": [
+                    {"name": g['volume'], "value": f"{g['pattern']} / {g['primary_cause']} ({g['count']}x)"}
+                    for g in data['groups']
+                ],
+                "text": f"{data['suppressed']} repeat alert(s) for ongoing incidents were suppressed. See attached PDF."
+            }]
+        }
     return {}
 
 if __name__ == "__main__":
@@ -1,38 +1,696 @@
+import os
+import shutil
+import threading
+import uuid
 import pandas as pd
 import numpy as np
+from telemetry_store import open_store, apply_schema, DATA_PATH, COLUMNS, METRIC_COLUMNS
 
-def load_data(file_path):
+def load_data(file_path=DATA_PATH, volumes=None, start=None, end=None):
     """
-    Loads storage data from CSV.
+    Loads storage data from the telemetry store (CSV file or Parquet directory).
     EXPECTS: Volume_Name, Timestamp, Latency_ms
+    Optional volume list and time range are pushed down to the store so callers
+    only read what they need.
     """
-    df = pd.read_csv(file_path)
-    df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+    df = open_store(file_path).read(volumes=volumes, start=start, end=end)
     df['Hour'] = df['Timestamp'].dt.hour
     return df
 
-def calculate_baseline(df):
+# Baseline mean / StdDev and z-score columns per metric. Latency_ms keeps the
+# original Baseline_Mean / Baseline_Std names the bounds and reports use.
+METRIC_BASELINE_COLUMNS = {
+    'Latency_ms': ('Baseline_Mean', 'Baseline_Std', 'Latency_Z'),
+    'IOPS': ('IOPS_Mean', 'IOPS_Std', 'IOPS_Z'),
+    'Throughput_MB': ('Throughput_Mean', 'Throughput_Std', 'Throughput_Z')
+}
+
+def calculate_baseline(df, rollups=None):
     """
-    Calculates the 'normal' behavior (Mean, StdDev) per Volume and Hour.
+    Calculates the 'normal' behavior (Mean, StdDev) per Volume and Hour for
+    every metric in df (METRIC_BASELINE_COLUMNS), in a single groupby pass.
+    With a RollupStore the moments come from the coarsest rollup tier that
+    resolves hours (its full retention, for the volumes in df) instead of
+    regrouping raw samples.
     """
+    if rollups is not None:
+        tier = rollups.tier_for(pd.Timedelta(hours=1))
+        return baseline_from_rollup(rollups.read(tier, volumes=pd.unique(df['Volume_Name'].astype(str))))
+
     # Group by Volume and Hour
-    baseline = df.groupby(['Volume_Name', 'Hour'])['Latency_ms'].agg(['mean', 'std']).reset_index()
-    baseline.rename(columns={'mean': 'Baseline_Mean', 'std': 'Baseline_Std'}, inplace=True)
-    # Handle cases with 0 std (single data point or constant), replace with small epsilon
+    metrics = [m for m in METRIC_BASELINE_COLUMNS if m in df.columns]
+    stats = df.groupby(['Volume_Name', 'Hour'], observed=True)[metrics].agg(['mean', 'std'])
+    baseline = pd.DataFrame(index=stats.index)
+    for metric in metrics:
+        mean_col, std_col, _ = METRIC_BASELINE_COLUMNS[metric]
+        baseline[mean_col] = stats[(metric, 'mean')]
+        # Handle cases with 0 std (single data point or constant), replace with small epsilon
+        baseline[std_col] = stats[(metric, 'std')].replace(0, 0.1)
+    return baseline.reset_index()
+
+# Robust baselines: one slot per hour of the week (0 = Monday 00:00), and the
+# factor turning a median absolute deviation into a StdDev for normal data
+HOURS_PER_WEEK = 168
+MAD_SCALE = 1.4826
+
+def hour_of_week(timestamps):
+    """Hour of the week (0-167, Monday 00:00 = 0) of a datetime Series."""
+    return (timestamps.dt.dayofweek * 24 + timestamps.dt.hour).to_numpy().astype('int32')
+
+def _sort_by_group(groups, values):
+    """
+    Sorts (group, value) pairs by group, then value, with a single np.sort of
+    packed uint64 keys: group id in the high word, the order-preserving bit
+    pattern of the float32 value in the low word. Returns sorted groups and
+    values (metrics are float32 in the store, so nothing is lost).
+    """
+    bits = values.astype('float32').view('uint32')
+    # Flip every bit of negative floats and the sign bit of the rest, so unsigned order = float order
+    bits = np.where(bits >> 31, ~bits, bits | np.uint32(0x80000000))
+    keys = (groups.astype('uint64') << np.uint64(32)) | bits
+    keys.sort()
+    bits = (keys & np.uint64(0xFFFFFFFF)).astype('uint32')
+    values = np.where(bits >> 31, bits & np.uint32(0x7FFFFFFF), ~bits).view('float32')
+    return (keys >> np.uint64(32)).astype('int64'), values.astype('float64')
+
+def calculate_robust_baseline(df, metric='Latency_ms'):
+    """
+    Robust seasonal baseline per Volume and hour of the week: Baseline_Mean
+    is the median and Baseline_Std the scaled MAD (MAD_SCALE x median
+    absolute deviation), so spikes in the history don't inflate the band
+    and weekend backup windows don't leak into weekday hours.
+    Medians come from one sort of packed (group, value) keys, not per-group
+    quantile calls.
+    """
+    volumes = df['Volume_Name']
+    if isinstance(volumes.dtype, pd.CategoricalDtype):
+        codes, names = volumes.cat.codes.to_numpy(), volumes.cat.categories
+    else:
+        codes, names = pd.factorize(volumes, sort=True)
+    slots = df['Hour_Of_Week'].to_numpy() if 'Hour_Of_Week' in df.columns else hour_of_week(df['Timestamp'])
+    values = df[metric].to_numpy(dtype='float64')
+    valid = (codes >= 0) & ~np.isnan(values)
+    groups = codes[valid].astype('int64') * HOURS_PER_WEEK + slots[valid]
+    values = values[valid]
+
+    # 1. Sort by (group, value): each group's median sits in the middle of its run
+    groups, values = _sort_by_group(groups, values)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else np.array([], dtype='int64')
+    counts = np.diff(np.r_[starts, len(groups)])
+    lo, hi = starts + (counts - 1) // 2, starts + counts // 2
+    median = (values[lo] + values[hi]) / 2
+
+    # 2. Same for the absolute deviations, re-sorted within the (contiguous) groups
+    _, deviation = _sort_by_group(groups, np.abs(values - np.repeat(median, counts)))
+    mad = (deviation[lo] + deviation[hi]) / 2
+
+    keys = groups[starts]
+    baseline = pd.DataFrame({
+        'Volume_Name': pd.Categorical.from_codes(keys // HOURS_PER_WEEK, categories=names),
+        'Hour_Of_Week': (keys % HOURS_PER_WEEK).astype('int32'),
+        'Baseline_Mean': median,
+        'Baseline_Std': MAD_SCALE * mad
+    })
+    # Constant hours (MAD 0) get the same small epsilon as the mean/std baseline
     baseline['Baseline_Std'] = baseline['Baseline_Std'].replace(0, 0.1)
     return baseline
 
-def detect_anomalies(df, std_threshold=3.0):
+def baseline_from_rollup(rollup):
+    """
+    Merges hourly rollup buckets (Count, mean, m2) into the per Volume and
+    Hour baseline of every metric; exact, the same as grouping the raw samples.
+    """
+    keys = [rollup['Volume_Name'], rollup['Timestamp'].dt.hour.rename('Hour')]
+    metrics = [m for m in METRIC_BASELINE_COLUMNS if f"{m}_mean" in rollup.columns]
+    count = rollup['Count'].astype('float64')
+    means = pd.DataFrame({m: rollup[f"{m}_mean"] for m in metrics})
+    total = count.groupby(keys, observed=True).transform('sum')
+    grand_means = means.mul(count, axis=0).groupby(keys, observed=True).transform('sum').div(total, axis=0)
+    # Chan et al.: within-bucket M2 plus the spread of the bucket means
+    m2 = pd.DataFrame({m: rollup[f"{m}_m2"] for m in metrics}) + (means - grand_means) ** 2 * count.to_numpy()[:, None]
+    moments = pd.concat([count.rename('count'), grand_means.add_suffix('_mean'), m2.add_suffix('_m2')], axis=1)
+    moments = moments.groupby(keys, observed=True).agg(
+        {'count': 'sum', **{f"{m}_mean": 'first' for m in metrics}, **{f"{m}_m2": 'sum' for m in metrics}}
+    )
+
+    baseline = pd.DataFrame(index=moments.index)
+    for metric in metrics:
+        mean_col, std_col, _ = METRIC_BASELINE_COLUMNS[metric]
+        std = np.sqrt(moments[f"{metric}_m2"] / (moments['count'] - 1).where(moments['count'] > 1))
+        baseline[mean_col] = moments[f"{metric}_mean"]
+        baseline[std_col] = std.replace(0, 0.1)
+    baseline = baseline.reset_index()
+    baseline['Hour'] = baseline['Hour'].astype('int32')
+    return baseline
+
+def _moment_metrics(moments):
+    # Metrics held by a moments table (one <metric>_mean / <metric>_m2 pair each)
+    return [col[:-len('_mean')] for col in moments.columns if col.endswith('_mean')]
+
+def _moments_to_baseline(moments, denominator):
+    """
+    Baseline table in the calculate_baseline() shape from a moments table;
+    StdDev = sqrt(M2 / denominator), NaN where the denominator is.
+    """
+    baseline = pd.DataFrame(index=moments.index)
+    for metric in _moment_metrics(moments):
+        mean_col, std_col, _ = METRIC_BASELINE_COLUMNS[metric]
+        baseline[mean_col] = moments[f"{metric}_mean"]
+        baseline[std_col] = np.sqrt(moments[f"{metric}_m2"] / denominator).replace(0, 0.1)
+    baseline = baseline.reset_index()
+    baseline['Hour'] = baseline['Hour'].astype('int32')
+    return baseline
+
+def _volume_codes(df):
+    # Integer code per row and the volume names they index (categorical or not)
+    volumes = df['Volume_Name']
+    if isinstance(volumes.dtype, pd.CategoricalDtype):
+        return volumes.cat.codes.to_numpy(), volumes.cat.categories.astype(str)
+    codes, names = pd.factorize(volumes)
+    return codes, pd.Index(names).astype(str)
+
+def _sync_table(df, metrics, codes=None, names=None):
+    """
+    Per volume: row count, newest timestamp and the sum of each metric. What
+    sync() keeps of the rows folded in, to tell appended rows from a history
+    that was rewritten underneath the state.
+    """
+    if codes is None:
+        codes, names = _volume_codes(df) if not df.empty else (np.array([], dtype='int64'), pd.Index([], dtype=object))
+    n = len(names)
+    last = np.full(n, np.iinfo('int64').min)
+    if len(codes):
+        np.maximum.at(last, codes, df['Timestamp'].to_numpy(dtype='datetime64[ns]').view('int64'))
+    table = pd.DataFrame({'rows': np.bincount(codes, minlength=n), 'last': last.view('datetime64[ns]')},
+                         index=pd.Index(names, dtype=object, name='Volume_Name'))
+    for metric in metrics:
+        values = df[metric].to_numpy(dtype='float64') if len(codes) else np.array([])
+        table[f"{metric}_sum"] = np.bincount(codes, weights=np.nan_to_num(values), minlength=n)
+    return table[table['rows'] > 0]
+
+def _split_synced(seen, df, metrics):
+    """
+    Splits a frame against a state's sync table: returns the rows newer than
+    their volume's newest folded-in timestamp (wherever they sit in the frame)
+    and the frame's own sync table. The rows are None when the part already
+    folded in no longer matches the table (rows inserted, removed or rewritten
+    inside the seen range): the state must then be rebuilt from the whole frame.
+    """
+    if df.empty:
+        return (df if seen.empty else None), _sync_table(df, metrics)
+    codes, names = _volume_codes(df)
+    last = seen['last'].reindex(names).to_numpy(dtype='datetime64[ns]')[codes]
+    new = ~(df['Timestamp'].to_numpy(dtype='datetime64[ns]') <= last)
+    folded = _sync_table(df[~new], metrics, codes[~new], names).reindex(seen.index)
+    sums = [f"{m}_sum" for m in metrics]
+    unchanged = (
+        folded['rows'].fillna(0).eq(seen['rows']).all()
+        and np.allclose(folded[sums].fillna(0).to_numpy(), seen[sums].to_numpy(), rtol=1e-9, atol=1e-9)
+    )
+    return (df[new] if unchanged else None), _sync_table(df, metrics, codes, names)
+
+def _merge_sync_tables(a, b):
+    # Sync tables of two states built on separate partitions
+    if a.empty or b.empty:
+        return b.copy() if a.empty else a.copy()
+    merged = pd.concat([a, b]).groupby(level=0)
+    return merged.agg({col: 'max' if col == 'last' else 'sum' for col in a.columns})
+
+def _sync_table_arrays(seen):
+    # .npz arrays of a sync table, read back by _sync_table_from()
+    return {
+        'seen_volume': seen.index.to_numpy(dtype=str),
+        'seen_rows': seen['rows'].to_numpy(dtype='int64'),
+        'seen_last': seen['last'].to_numpy(dtype='datetime64[ns]'),
+        **{f"seen_{col}": seen[col].to_numpy(dtype='float64') for col in seen.columns if col.endswith('_sum')}
+    }
+
+def _sync_table_from(data, metrics):
+    if 'seen_volume' not in data.files:
+        raise ValueError("checkpoint predates per-volume sync tables")
+    columns = ['rows', 'last'] + [f"{m}_sum" for m in metrics]
+    return pd.DataFrame({col: data[f"seen_{col}"] for col in columns}, index=pd.Index(data['seen_volume'].astype(object), name='Volume_Name'))
+
+class BaselineState:
+    """
+    Persistent, incrementally updatable baseline per Volume and Hour.
+    Keeps Welford-style running moments (count, plus mean and M2 per metric
+    in METRIC_BASELINE_COLUMNS) so new rows can be folded in without
+    regrouping the full history, and two states built on separate partitions
+    can be merged exactly.
+    """
+    KEYS = ['Volume_Name', 'Hour']
+
+    def __init__(self, metrics=tuple(METRIC_BASELINE_COLUMNS)):
+        self.metrics = list(metrics)
+        self.reset()
+
+    def reset(self):
+        """Forget all accumulated history."""
+        index = pd.MultiIndex.from_arrays([[], []], names=self.KEYS)
+        columns = {'count': []}
+        for metric in self.metrics:
+            columns.update({f"{metric}_mean": [], f"{metric}_m2": []})
+        self.moments = pd.DataFrame(columns, index=index)
+        self.seen = _sync_table(pd.DataFrame(), self.metrics)
+
+    def update(self, rows):
+        """
+        Folds a batch of new rows (e.g. freshly appended telemetry) into the state.
+        """
+        if rows.empty:
+            return self
+        # Accumulate in float64 even when the store hands back float32 metrics
+        grouped = rows[self.metrics].astype('float64').groupby([rows[k] for k in self.KEYS], observed=True)
+        count = grouped.size().astype(float)
+        batch = pd.concat([
+            count.rename('count'),
+            grouped.mean().add_suffix('_mean'),
+            grouped.var(ddof=0).mul(count, axis=0).add_suffix('_m2')
+        ], axis=1)
+        self.moments = _combine_moments(self.moments, batch)
+        return self
+
+    def merge(self, other):
+        """
+        Merges another state (e.g. built on a different partition) into this one.
+        """
+        self.moments = _combine_moments(self.moments, other.moments)
+        self.seen = _merge_sync_tables(self.seen, other.seen)
+        return self
+
+    def sync(self, df):
+        """
+        Brings the state in line with a frame by folding only the rows newer
+        than each volume's newest row seen so far, wherever they sit in the
+        frame. If rows were added, removed or rewritten inside the range
+        already seen, the state is rebuilt from the whole frame.
+        """
+        rows, seen = _split_synced(self.seen, df, self.metrics)
+        if rows is None:
+            self.reset()
+            rows = df
+        self.update(rows)
+        self.seen = seen
+        return self
+
+    def to_frame(self):
+        """
+        Returns the baseline in the same shape as calculate_baseline().
+        """
+        count = self.moments['count']
+        # Sample StdDev (ddof=1) to match pandas .std(); single samples yield NaN
+        return _moments_to_baseline(self.moments, (count - 1).where(count > 1))
+
+def _combine_moments(a, b):
+    """
+    Parallel (Chan et al.) combination of two count / per-metric mean and M2 tables.
+    """
+    if a.empty:
+        return b.copy()
+    if b.empty:
+        return a.copy()
+    index = a.index.union(b.index)
+    a = a.reindex(index, fill_value=0.0)
+    b = b.reindex(index, fill_value=0.0)
+    n = a['count'] + b['count']
+    combined = {'count': n}
+    for metric in _moment_metrics(a):
+        mean, m2 = f"{metric}_mean", f"{metric}_m2"
+        delta = b[mean] - a[mean]
+        combined[mean] = a[mean] + delta * b['count'] / n
+        combined[m2] = a[m2] + b[m2] + delta ** 2 * a['count'] * b['count'] / n
+    return pd.DataFrame(combined, index=index)
+
+# A sample's weight in the EWMA baseline halves every BASELINE_HALF_LIFE_DAYS
+BASELINE_HALF_LIFE = pd.Timedelta(days=float(os.getenv('BASELINE_HALF_LIFE_DAYS', '7')))
+
+class EwmaBaselineState:
+    """
+    Exponentially decayed baseline per Volume and Hour (EWMA / EWMVar).
+    A sample's weight halves every `half_life`, so recent behavior dominates
+    and old data fades out without rescanning history. The state is a fixed
+    (volume x hour) table of decayed weight, squared weight, last timestamp
+    and a mean and M2 per metric in METRIC_BASELINE_COLUMNS: updates cost O(1) per sample (vectorized per batch)
+    regardless of retention, and save()/load() checkpoint it to disk.
+    Drop-in for BaselineState in detect_anomalies(baseline_state=...).
+    """
+    KEYS = ['Volume_Name', 'Hour']
+
+    def __init__(self, metrics=tuple(METRIC_BASELINE_COLUMNS), half_life=BASELINE_HALF_LIFE):
+        self.metrics = list(metrics)
+        self.half_life = pd.Timedelta(half_life)
+        self.reset()
+
+    def reset(self):
+        """Forget all accumulated history."""
+        index = pd.MultiIndex.from_arrays([[], []], names=self.KEYS)
+        columns = {'weight': []}
+        for metric in self.metrics:
+            columns.update({f"{metric}_mean": [], f"{metric}_m2": []})
+        self.moments = pd.DataFrame({**columns, 'weight_sq': [], 'last': pd.to_datetime([])}, index=index)
+        self.seen = _sync_table(pd.DataFrame(), self.metrics)
+
+    def update(self, rows):
+        """
+        Folds a batch of new rows into the state. Within the batch each sample
+        is weighted by its age relative to the newest sample of its key, which
+        gives exactly the result of folding the samples in one at a time.
+        """
+        if rows.empty:
+            return self
+        keys = [rows[k] for k in self.KEYS]
+        timestamps = rows['Timestamp']
+        values = rows[self.metrics].astype('float64')
+        last = timestamps.groupby(keys, observed=True).transform('max')
+        weight = pd.Series(np.exp2(-((last - timestamps) / self.half_life).to_numpy(dtype='float64')), index=rows.index)
+
+        weights = pd.DataFrame({'w': weight, 'w2': weight ** 2}).groupby(keys, observed=True).sum()
+        weighted = values.mul(weight, axis=0)
+        row_mean = weighted.groupby(keys, observed=True).transform('sum').div(weight.groupby(keys, observed=True).transform('sum'), axis=0)
+        batch = pd.concat([
+            weights['w'].rename('weight'),
+            weighted.groupby(keys, observed=True).sum().div(weights['w'], axis=0).add_suffix('_mean'),
+            (values - row_mean).pow(2).mul(weight, axis=0).groupby(keys, observed=True).sum().add_suffix('_m2'),
+            weights['w2'].rename('weight_sq'),
+            timestamps.groupby(keys, observed=True).max().rename('last')
+        ], axis=1)
+        self.moments = _combine_decayed(self.moments, batch, self.half_life)
+        return self
+
+    def merge(self, other):
+        """Merges another state (e.g. built on a different partition) into this one."""
+        self.moments = _combine_decayed(self.moments, other.moments, self.half_life)
+        self.seen = _merge_sync_tables(self.seen, other.seen)
+        return self
+
+    def sync(self, df):
+        """
+        Brings the state in line with a frame by folding only the rows newer
+        than each volume's newest row seen so far (see BaselineState.sync()).
+        If rows were added, removed or rewritten inside the range already
+        seen, the state is rebuilt from the whole frame.
+        """
+        rows, seen = _split_synced(self.seen, df, self.metrics)
+        if rows is None:
+            self.reset()
+            rows = df
+        self.update(rows)
+        self.seen = seen
+        return self
+
+    def to_frame(self):
+        """
+        Returns the baseline in the same shape as calculate_baseline().
+        """
+        m = self.moments
+        # Unbiased weighted variance (reliability weights); equals the sample StdDev when nothing has decayed
+        effective = m['weight'] - m['weight_sq'] / m['weight']
+        return _moments_to_baseline(m, effective.where(effective > 1e-9))
+
+    def save(self, path):
+        """Checkpoints the state to a compact .npz file (atomically replaced)."""
+        m = self.moments
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                volume=m.index.get_level_values('Volume_Name').astype(str).to_numpy(dtype=str),
+                hour=m.index.get_level_values('Hour').to_numpy(dtype='int32'),
+                metrics=np.array(self.metrics, dtype=str),
+                **{col: m[col].to_numpy(dtype='float64') for col in m.columns if col != 'last'},
+                last=m['last'].to_numpy(dtype='datetime64[ns]'),
+                half_life=np.int64(self.half_life.value),
+                **_sync_table_arrays(self.seen)
+            )
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Restores a state written by save()."""
+        with np.load(path) as data:
+            if 'metrics' not in data.files:
+                raise ValueError("checkpoint predates per-metric baselines")
+            state = cls(metrics=data['metrics'].tolist(), half_life=pd.Timedelta(int(data['half_life']), 'ns'))
+            state.seen = _sync_table_from(data, state.metrics)
+            index = pd.MultiIndex.from_arrays([pd.Categorical(data['volume']), data['hour']], names=cls.KEYS)
+            state.moments = pd.DataFrame({col: data[col] for col in state.moments.columns}, index=index)
+        return state
+
+def _baseline_checkpoint_dir(path):
+    # Next to the store, like the rollups: <name>_baselines/ or <root>/_baselines/
+    if str(path).lower().endswith('.csv'):
+        return os.path.splitext(path)[0] + '_baselines'
+    return os.path.join(path, '_baselines')
+
+def reset_baseline_checkpoints(path=DATA_PATH):
+    """Drops all baseline checkpoints (e.g. before the raw store is rewritten)."""
+    root = _baseline_checkpoint_dir(path)
+    if os.path.isdir(root):
+        shutil.rmtree(root)
+
+def _combine_decayed(a, b, half_life):
+    """
+    Combines two decayed weight / per-metric mean and M2 tables: both are
+    decayed to the newer of their last timestamps, then merged like
+    _combine_moments().
+    """
+    if a.empty:
+        return b.copy()
+    if b.empty:
+        return a.copy()
+    index = a.index.union(b.index)
+    a = a.reindex(index)
+    b = b.reindex(index)
+    last = pd.concat([a['last'], b['last']], axis=1).max(axis=1)
+    decay_a = np.exp2(-((last - a['last']) / half_life).astype('float64')).fillna(0)
+    decay_b = np.exp2(-((last - b['last']) / half_life).astype('float64')).fillna(0)
+    wa, wb = a['weight'].fillna(0) * decay_a, b['weight'].fillna(0) * decay_b
+    n = wa + wb
+    combined = {'weight': n}
+    for metric in _moment_metrics(a):
+        mean, m2 = f"{metric}_mean", f"{metric}_m2"
+        ma, mb = a[mean].fillna(0), b[mean].fillna(0)
+        delta = mb - ma
+        combined[mean] = ma + delta * wb / n
+        combined[m2] = a[m2].fillna(0) * decay_a + b[m2].fillna(0) * decay_b + delta ** 2 * wa * wb / n
+    combined['weight_sq'] = a['weight_sq'].fillna(0) * decay_a ** 2 + b['weight_sq'].fillna(0) * decay_b ** 2
+    combined['last'] = last
+    return pd.DataFrame(combined, index=index)
+
+class FleetCheckpoint:
+    """
+    The fleet's baseline checkpoint: every volume's EwmaBaselineState in one
+    .npz, stamped with the store data and rewrite versions each was last
+    synced at:
+
+        <name>_baselines/_fleet.npz       (CSV store)
+        <root>/_baselines/_fleet.npz      (Parquet store)
+
+    load() reads the file once at startup; a volume's state is only built
+    from it when first used. refresh() syncs one volume lazily: if its data
+    version hasn't moved it is returned as is, otherwise only the rows
+    appended since are folded in and the checkpoint is saved. If the volume's
+    rows were replaced since (its rewrite version moved, e.g. replace_range())
+    the state is rebuilt from the volume's data instead. A restart therefore
+    never replays history that is unchanged.
+    """
+
+    def __init__(self, path=DATA_PATH, half_life=BASELINE_HALF_LIFE):
+        self.data_path = path
+        self.store = open_store(path)
+        self.path = os.path.join(_baseline_checkpoint_dir(path), '_fleet.npz')
+        self.half_life = pd.Timedelta(half_life)
+        self.states = {}
+        self.versions = {}
+        self.rewrites = {}
+        # Saved states not used yet: their volumes, metrics, moments and sync tables
+        self._metrics = list(METRIC_BASELINE_COLUMNS)
+        self._stored = None
+        self._stored_seen = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Restores the checkpoint, if one was saved."""
+        if not os.path.isfile(self.path):
+            return self
+        with np.load(self.path) as data:
+            self.half_life = pd.Timedelta(int(data['half_life']), 'ns')
+            self._metrics = data['metrics'].tolist()
+            columns = EwmaBaselineState(metrics=self._metrics).moments.columns
+            index = pd.MultiIndex.from_arrays([data['volume'], data['hour']], names=EwmaBaselineState.KEYS)
+            self._stored = pd.DataFrame({col: data[col] for col in columns}, index=index).sort_index()
+            self._stored_seen = _sync_table_from(data, self._metrics)
+            self._pending = set(data['state_volume'].tolist())
+            self.versions = dict(zip(data['state_volume'].tolist(), data['state_version'].tolist()))
+            self.rewrites = dict(zip(data['state_volume'].tolist(), data['state_rewrite'].tolist()))
+        return self
+
+    def _state(self, vol_name):
+        # Called with the lock held
+        state = self.states.get(vol_name)
+        if state is not None:
+            return state
+        if vol_name not in self._pending:
+            state = EwmaBaselineState(half_life=self.half_life)
+        else:
+            state = EwmaBaselineState(metrics=self._metrics, half_life=self.half_life)
+            moments = self._stored.xs(vol_name, level='Volume_Name', drop_level=False)
+            moments.index = pd.MultiIndex.from_arrays(
+                [pd.Categorical(moments.index.get_level_values(0)), moments.index.get_level_values(1)], names=state.KEYS
+            )
+            state.moments = moments
+            state.seen = self._stored_seen[self._stored_seen.index == vol_name]
+            self._pending.discard(vol_name)
+        self.states[vol_name] = state
+        return state
+
+    def save(self):
+        """Writes the checkpoint (atomically replaced)."""
+        with self._lock:
+            frames = [state.moments for state in self.states.values()]
+            seen = [state.seen for state in self.states.values()]
+            volumes = list(self.states)
+            if self._pending:
+                # Never-used volumes are carried over from the loaded file
+                frames.append(self._stored[self._stored.index.get_level_values('Volume_Name').isin(list(self._pending))])
+                seen.append(self._stored_seen[self._stored_seen.index.isin(list(self._pending))])
+                volumes += sorted(self._pending)
+            versions = dict(self.versions)
+            rewrites = dict(self.rewrites)
+        moments = pd.concat([f for f in frames if not f.empty]) if any(not f.empty for f in frames) else EwmaBaselineState().moments
+        metrics = _moment_metrics(moments)
+        seen = [s for s in seen if not s.empty]
+        seen = pd.concat(seen) if seen else _sync_table(pd.DataFrame(), metrics)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                volume=moments.index.get_level_values('Volume_Name').astype(str).to_numpy(dtype=str),
+                hour=moments.index.get_level_values('Hour').to_numpy(dtype='int32'),
+                metrics=np.array(metrics, dtype=str),
+                **{col: moments[col].to_numpy(dtype='float64') for col in moments.columns if col != 'last'},
+                last=moments['last'].to_numpy(dtype='datetime64[ns]'),
+                half_life=np.int64(self.half_life.value),
+                **_sync_table_arrays(seen),
+                state_volume=np.array(volumes, dtype=str),
+                state_version=np.array([versions.get(vol, -1) for vol in volumes], dtype='int64'),
+                state_rewrite=np.array([rewrites.get(vol, -1) for vol in volumes], dtype='int64')
+            )
+        os.replace(tmp_path, self.path)
+        return self.path
+
+    def _current_versions(self):
+        # Volumes never written through the store have no stamp; they report 0 like data_version()
+        versions = self.store.data_versions()
+        volumes = self.store.latest()['Volume_Name'].astype(str)
+        return {vol: versions.get(vol, 0) for vol in set(volumes) | set(versions)}
+
+    def stale_volumes(self):
+        """Volumes whose data changed (or that were added or removed) since their state was synced."""
+        current = self._current_versions()
+        return sorted(vol for vol in set(current) | set(self.versions) if current.get(vol) != self.versions.get(vol))
+
+    def refresh(self, vol_name, df=None):
+        """
+        Returns the volume's state, synced with its data first if the data
+        version moved since the checkpoint (df: the volume's frame if the
+        caller already has it, otherwise it is read from the store).
+        """
+        vol_name = str(vol_name)
+        # Versions read before the data, so a write racing this refresh is caught by the next one
+        rewrite = self.store.rewrite_version(vol_name)
+        version = self.store.data_version(vol_name)
+        with self._lock:
+            state = self._state(vol_name)
+            if self.versions.get(vol_name) == version:
+                return state
+        if df is None:
+            df = load_data(self.data_path, volumes=[vol_name])
+        with self._lock:
+            if self.rewrites.get(vol_name, 0) != rewrite:
+                state.reset()
+            state.sync(df)
+            self.versions[vol_name] = version
+            self.rewrites[vol_name] = rewrite
+        self.save()
+        return state
+
+    def detect(self, vol_name, df, **kwargs):
+        """Scores one volume's frame with detect_anomalies() against its lazily refreshed state."""
+        return detect_anomalies(df, baseline_state=self.refresh(vol_name, df), **kwargs)
+
+    def drop(self, vol_name):
+        """Forgets a volume's state (e.g. its history was rewritten); it is rebuilt on next use."""
+        vol_name = str(vol_name)
+        with self._lock:
+            self.states.pop(vol_name, None)
+            self._pending.discard(vol_name)
+            self.versions.pop(vol_name, None)
+            self.rewrites.pop(vol_name, None)
+        self.save()
+
+    def baseline(self, volumes):
+        """Baseline table in the calculate_baseline() shape for some volumes, each refreshed first."""
+        frames = [self.refresh(vol).to_frame() for vol in volumes]
+        return pd.concat(frames, ignore_index=True) if frames else EwmaBaselineState().to_frame()
+
+# Severity -> hint / recommendation, shared by the batch and streaming paths
+ROOT_CAUSE_HINTS = {
+    'High': 'Possible Backend Contention',
+    'Medium': 'Potential Workload Spike',
+    'Low': 'Transient I/O Burst'
+}
+RESOLUTION_STEPS = {
+    'Possible Backend Contention': 'Check aggregate utilization and disk saturation.',
+    'Potential Workload Spike': 'Identify top consumers and review QoS policies.',
+    'Transient I/O Burst': 'Monitor for recurrence; no immediate action.'
+}
+
+# Compact mode: Severity is stored as int8 codes into these levels and the
+# text columns are looked up by code instead of being repeated per row.
+SEVERITY_LEVELS = ['Normal', 'Low', 'Medium', 'High']
+ROOT_CAUSE_BY_CODE = np.array(['None'] + [ROOT_CAUSE_HINTS[sev] for sev in SEVERITY_LEVELS[1:]], dtype=object)
+RESOLUTION_BY_CODE = np.array(['N/A'] + [RESOLUTION_STEPS[cause] for cause in ROOT_CAUSE_BY_CODE[1:]], dtype=object)
+
+def detect_anomalies(df, std_threshold=3.0, baseline_state=None, compact=False, rollups=None, robust=False, baseline=None):
     """
     Detects anomalies by comparing actual latency to the baseline.
     Anomaly = Latency > Mean + (std_threshold * StdDev)
     Returns original DF with added columns: Baseline_Mean, Baseline_Std, Upper_Bound, Is_Anomaly, Severity
+    and per-metric z-scores (Latency_Z; IOPS_Z / Throughput_Z where the baseline covers them)
+    If a BaselineState is given, only rows appended since its last sync are folded in.
+    With compact=True a memory-lean CompactDetection is returned instead.
+    With a RollupStore, df can be just the recent window to score while the
+    baseline covers the full rollup retention.
+    With robust=True the baseline is the median/MAD per Volume and hour of
+    the week (calculate_robust_baseline); an Hour_Of_Week column is added.
+    A precomputed baseline table (e.g. FleetCheckpoint.baseline()) skips the
+    baseline pass, so df can be just the recent window to score.
     """
-    # Calculate baseline
-    baseline = calculate_baseline(df)
+    # Calculate baseline (incrementally when a persistent state is supplied)
+    keys = ['Volume_Name', 'Hour']
+    if robust:
+        if baseline_state is not None or rollups is not None or baseline is not None:
+            raise ValueError("Robust baselines are computed from raw samples; baseline_state, rollups and baseline are not supported.")
+        df = df.assign(Hour_Of_Week=hour_of_week(df['Timestamp']))
+        baseline = calculate_robust_baseline(df)
+        keys = ['Volume_Name', 'Hour_Of_Week']
+    elif baseline is not None:
+        pass  # Precomputed
+    elif baseline_state is not None:
+        baseline = baseline_state.sync(df).to_frame()
+    else:
+        baseline = calculate_baseline(df, rollups=rollups)
+
+    if compact:
+        return CompactDetection(df, baseline, std_threshold)
     
     # Merge baseline back to original data
-    merged = pd.merge(df, baseline, on=['Volume_Name', 'Hour'], how='left')
+    merged = pd.merge(df, baseline, on=keys, how='left')
     
     # Calculate Upper Bound
     merged['Upper_Bound'] = merged['Baseline_Mean'] + (std_threshold * merged['Baseline_Std'])
@@ -40,6 +698,12 @@ def detect_anomalies(df, std_threshold=3.0):
     # Latency shouldn't really be below 0, but for completeness (and avoiding clutter) we focus on high latency
     merged['Lower_Bound'] = merged['Lower_Bound'].clip(lower=0) 
 
+    # Per-metric z-scores against the volume's own hourly baseline (Latency_Z
+    # always; IOPS_Z / Throughput_Z when the baseline covers those metrics)
+    for metric, (mean_col, std_col, z_col) in METRIC_BASELINE_COLUMNS.items():
+        if metric in merged.columns and mean_col in merged.columns:
+            merged[z_col] = ((merged[metric] - merged[mean_col]) / merged[std_col]).astype('float32')
+
     # Flag Anomalies (High Latency)
     merged['Is_Anomaly'] = merged['Latency_ms'] > merged['Upper_Bound']
     
@@ -59,33 +723,322 @@ def detect_anomalies(df, std_threshold=3.0):
         merged['Severity'] == 'Medium',
         merged['Severity'] == 'Low'
     ]
-    rc_choices = [
-        'Possible Backend Contention', 
-        'Potential Workload Spike', 
-        'Transient I/O Burst'
-    ]
+    rc_choices = [ROOT_CAUSE_HINTS[sev] for sev in ['High', 'Medium', 'Low']]
     merged['Root_Cause'] = np.select(rc_conditions, rc_choices, default='None')
     
     # Troubleshooting Recommendations
-    res_conditions = [
-        merged['Root_Cause'] == 'Possible Backend Contention',
-        merged['Root_Cause'] == 'Potential Workload Spike',
-        merged['Root_Cause'] == 'Transient I/O Burst'
-    ]
-    res_choices = [
-        'Check aggregate utilization and disk saturation.',
-        'Identify top consumers and review QoS policies.',
-        'Monitor for recurrence; no immediate action.'
-    ]
+    res_conditions = [merged['Root_Cause'] == cause for cause in RESOLUTION_STEPS]
+    res_choices = list(RESOLUTION_STEPS.values())
     merged['Resolution_Steps'] = np.select(res_conditions, res_choices, default='N/A')
     
     return merged
 
+def _to_datetime64(ts):
+    return pd.Timestamp(ts).to_datetime64().astype('datetime64[ns]')
+
+class AnomalyIndex:
+    """
+    Sparse lookup structure over a detect_anomalies() frame.
+
+    Rows are ordered once by (volume, timestamp). A per-volume offset table
+    plus the positions/timestamps of the anomalous rows turn "volume X slice",
+    "anomalies for volume X in a window" and "latest anomalies" into binary
+    searches instead of boolean masks over the full frame. Time bounds are
+    inclusive, like load_data(start=, end=).
+    """
+
+    def __init__(self, frame=None):
+        self.frame = None
+        if frame is not None:
+            self.rebuild(frame)
+
+    def rebuild(self, frame):
+        """Re-indexes a (new) detect_anomalies() frame."""
+        volumes = frame['Volume_Name']
+        if isinstance(volumes.dtype, pd.CategoricalDtype):
+            codes, names = volumes.cat.codes.to_numpy(), volumes.cat.categories
+        else:
+            codes, names = pd.factorize(volumes, sort=True)
+        timestamps = frame['Timestamp'].to_numpy().astype('datetime64[ns]')
+
+        # 1. Row order by volume, then time (stable, so ties keep write order)
+        order = np.lexsort((timestamps, codes))
+        sorted_codes = codes[order]
+        self.volume_codes = {name: code for code, name in enumerate(names)}
+        self.positions = order
+        self.timestamps = timestamps[order]
+        self.offsets = np.searchsorted(sorted_codes, np.arange(len(names) + 1))
+
+        # 2. Anomalous rows, in the same (volume, time) order
+        is_anomaly = frame['Is_Anomaly'].to_numpy(dtype=bool)[order]
+        self.anomaly_positions = order[is_anomaly]
+        self.anomaly_timestamps = self.timestamps[is_anomaly]
+        self.anomaly_offsets = np.searchsorted(sorted_codes[is_anomaly], np.arange(len(names) + 1))
+
+        # 3. All anomalies by time, for fleet-wide "latest" queries
+        by_time = np.argsort(self.anomaly_timestamps, kind='stable')
+        self.latest_positions = self.anomaly_positions[by_time]
+        self.latest_timestamps = self.anomaly_timestamps[by_time]
+
+        self.frame = frame
+        return self
+
+    def _window(self, timestamps, lo, hi, start, end):
+        # Narrows [lo, hi) of a time-sorted run to the inclusive [start, end] window
+        run = timestamps[lo:hi]
+        first = lo + (np.searchsorted(run, _to_datetime64(start), 'left') if start is not None else 0)
+        last = lo + (np.searchsorted(run, _to_datetime64(end), 'right') if end is not None else len(run))
+        return first, last
+
+    def volume_positions(self, vol_name, start=None, end=None):
+        """Row positions of one volume, in time order."""
+        code = self.volume_codes.get(vol_name)
+        if code is None:
+            return self.positions[:0]
+        first, last = self._window(self.timestamps, self.offsets[code], self.offsets[code + 1], start, end)
+        return self.positions[first:last]
+
+    def anomaly_positions_for(self, vol_name=None, start=None, end=None):
+        """Row positions of anomalies (of one volume, or the whole fleet), in time order."""
+        if vol_name is None:
+            first, last = self._window(self.latest_timestamps, 0, len(self.latest_timestamps), start, end)
+            return self.latest_positions[first:last]
+        code = self.volume_codes.get(vol_name)
+        if code is None:
+            return self.anomaly_positions[:0]
+        first, last = self._window(self.anomaly_timestamps, self.anomaly_offsets[code], self.anomaly_offsets[code + 1], start, end)
+        return self.anomaly_positions[first:last]
+
+    def volume_slice(self, vol_name, start=None, end=None):
+        """Rows of one volume (optionally within a time window), sorted by time."""
+        return self.frame.iloc[self.volume_positions(vol_name, start, end)]
+
+    def anomalies(self, vol_name=None, start=None, end=None):
+        """Anomalous rows for one volume or the whole fleet, sorted by time."""
+        return self.frame.iloc[self.anomaly_positions_for(vol_name, start, end)]
+
+    def latest_anomalies(self, n=10):
+        """The n most recent anomalies across the fleet, oldest first."""
+        return self.frame.iloc[self.latest_positions[max(len(self.latest_positions) - n, 0):]]
+
+    def anomaly_counts(self):
+        """Number of anomalies per volume."""
+        return pd.Series(np.diff(self.anomaly_offsets), index=list(self.volume_codes), name='Anomalies')
+
+class CompactDetection:
+    """
+    Memory-lean counterpart of the detect_anomalies() frame.
+
+    `frame` holds the input columns (categorical volume, int8 Hour, float32
+    metrics) plus Is_Anomaly and a categorical Severity (int8 codes into
+    SEVERITY_LEVELS). Baselines live in small dense (volume code x hour, or
+    hour of week for robust baselines) arrays, so Baseline_Mean/Std and the bounds are computed on demand instead
+    of being materialized per row; Root_Cause and Resolution_Steps are looked
+    up from the severity code.
+    """
+
+    def __init__(self, df, baseline, std_threshold=3.0):
+        self.std_threshold = std_threshold
+        frame = df.copy()
+        frame['Volume_Name'] = frame['Volume_Name'].astype('category')
+        frame['Hour'] = frame['Hour'].astype('int8')
+        self.season = 'Hour_Of_Week' if 'Hour_Of_Week' in baseline.columns else 'Hour'
+        if self.season == 'Hour_Of_Week':
+            frame['Hour_Of_Week'] = frame['Hour_Of_Week'].astype('int16')
+        for col in METRIC_COLUMNS:
+            if col in frame.columns:
+                frame[col] = frame[col].astype('float32')
+
+        # Dense baseline arrays indexed by [volume category code, hour (of week)]
+        volumes = frame['Volume_Name'].cat.categories
+        slots = HOURS_PER_WEEK if self.season == 'Hour_Of_Week' else 24
+        self.baseline_mean = np.full((len(volumes), slots), np.nan, dtype=baseline['Baseline_Mean'].dtype)
+        self.baseline_std = np.full((len(volumes), slots), np.nan, dtype=baseline['Baseline_Std'].dtype)
+        codes = pd.Categorical(baseline['Volume_Name'], categories=volumes).codes
+        known = codes >= 0
+        hours = baseline[self.season].to_numpy()[known]
+        self.baseline_mean[codes[known], hours] = baseline['Baseline_Mean'].to_numpy()[known]
+        self.baseline_std[codes[known], hours] = baseline['Baseline_Std'].to_numpy()[known]
+
+        # Severity thresholds: Low > 3 std (std_threshold), Med > 5 std, High > 8 std
+        mean, std = self._lookup(frame)
+        latency = frame['Latency_ms'].to_numpy()
+        severity = np.select(
+            [latency > mean + 8 * std, latency > mean + 5 * std, latency > mean + std_threshold * std],
+            [3, 2, 1], default=0
+        ).astype('int8')
+        frame['Is_Anomaly'] = severity > 0
+        frame['Severity'] = pd.Categorical.from_codes(severity, categories=SEVERITY_LEVELS)
+        self.frame = frame
+
+    def _lookup(self, frame):
+        vol = frame['Volume_Name'].cat.codes.to_numpy()
+        hour = frame[self.season].to_numpy()
+        return self.baseline_mean[vol, hour], self.baseline_std[vol, hour]
+
+    def baseline(self, rows=None):
+        """Baseline_Mean and Baseline_Std arrays for `rows` (a frame slice; default all rows)."""
+        return self._lookup(self.frame if rows is None else rows)
+
+    def bounds(self, rows=None):
+        """Upper_Bound and Lower_Bound arrays for `rows`, computed on demand."""
+        mean, std = self.baseline(rows)
+        return mean + self.std_threshold * std, np.clip(mean - self.std_threshold * std, 0, None)
+
+    def root_cause(self, rows=None):
+        codes = (self.frame if rows is None else rows)['Severity'].cat.codes.to_numpy()
+        return ROOT_CAUSE_BY_CODE[codes]
+
+    def resolution_steps(self, rows=None):
+        codes = (self.frame if rows is None else rows)['Severity'].cat.codes.to_numpy()
+        return RESOLUTION_BY_CODE[codes]
+
+    def expand(self, rows=None):
+        """
+        Materializes `rows` (e.g. only the anomalies) in the full
+        detect_anomalies() shape for code that expects per-row columns.
+        """
+        out = (self.frame if rows is None else rows).copy()
+        out['Hour'] = out['Hour'].astype('int32')
+        if self.season == 'Hour_Of_Week':
+            out['Hour_Of_Week'] = out['Hour_Of_Week'].astype('int32')
+        out['Baseline_Mean'], out['Baseline_Std'] = self.baseline(out)
+        out['Upper_Bound'] = out['Baseline_Mean'] + self.std_threshold * out['Baseline_Std']
+        out['Lower_Bound'] = (out['Baseline_Mean'] - self.std_threshold * out['Baseline_Std']).clip(lower=0)
+        is_anomaly = out.pop('Is_Anomaly')
+        out['Is_Anomaly'] = is_anomaly
+        out['Severity'] = out.pop('Severity').astype(str)
+        out['Root_Cause'] = self.root_cause(rows)
+        out['Resolution_Steps'] = self.resolution_steps(rows)
+        return out
+
+    def memory_usage(self):
+        """Bytes held by the frame and the baseline arrays."""
+        return int(self.frame.memory_usage(deep=True).sum()) + self.baseline_mean.nbytes + self.baseline_std.nbytes
+
+def memory_report(df, std_threshold=3.0):
+    """
+    Compares the memory footprint of the full detect_anomalies() frame with
+    the compact mode on the same data. Returns a dict of byte counts.
+    """
+    full = detect_anomalies(df, std_threshold)
+    compact = detect_anomalies(df, std_threshold, compact=True)
+    full_bytes = int(full.memory_usage(deep=True).sum())
+    compact_bytes = compact.memory_usage()
+    return {
+        'rows': len(df),
+        'input_bytes': int(df.memory_usage(deep=True).sum()),
+        'full_bytes': full_bytes,
+        'compact_bytes': compact_bytes,
+        'reduction': 1 - compact_bytes / full_bytes,
+        'full_columns': full.memory_usage(deep=True).drop('Index').to_dict(),
+        'compact_columns': compact.frame.memory_usage(deep=True).drop('Index').to_dict()
+    }
+
+class StreamingDetector:
+    """
+    Real-time scorer for collectors pushing one sample (or a micro-batch) per
+    volume each interval. Each sample is scored in O(1) against a cached
+    per-(Volume_Name, Hour) baseline instead of rebuilding the merged frame.
+    Anomalies are yielded by score_batch() and passed to on_anomaly(event).
+    """
+
+    def __init__(self, baseline_state, std_threshold=3.0, on_anomaly=None, learn=False):
+        self.std_threshold = std_threshold
+        self.on_anomaly = on_anomaly
+        # When learn=True every scored sample is also folded into the cached moments
+        self.learn = learn
+        self.refresh(baseline_state)
+
+    @classmethod
+    def from_history(cls, df, **kwargs):
+        """Builds a detector from a historical frame (e.g. load_data())."""
+        return cls(BaselineState(metrics=['Latency_ms']).sync(df), **kwargs)
+
+    def refresh(self, baseline_state):
+        """Reloads the cache from a (re-synced) BaselineState."""
+        m = baseline_state.moments
+        keys = zip(m.index.get_level_values('Volume_Name').astype(str), m.index.get_level_values('Hour').astype(int))
+        self._moments = {key: [c, mu, m2] for key, c, mu, m2 in zip(keys, m['count'], m['Latency_ms_mean'], m['Latency_ms_m2'])}
+
+    def _baseline(self, key):
+        moments = self._moments.get(key)
+        if moments is None or moments[0] < 2:
+            return np.nan, np.nan
+        count, mean, m2 = moments
+        std = np.sqrt(m2 / (count - 1))
+        return mean, (std if std != 0 else 0.1)
+
+    def _learn(self, key, value):
+        # Welford single-sample update
+        moments = self._moments.setdefault(key, [0.0, 0.0, 0.0])
+        moments[0] += 1
+        delta = value - moments[1]
+        moments[1] += delta / moments[0]
+        moments[2] += delta * (value - moments[1])
+
+    def score(self, vol_name, timestamp, latency_ms, **metrics):
+        """
+        Scores one sample. Returns an event dict with the same fields that
+        detect_anomalies() adds per row; on_anomaly is called for anomalies.
+        """
+        timestamp = pd.Timestamp(timestamp)
+        key = (str(vol_name), timestamp.hour)
+        mean, std = self._baseline(key)
+        upper = mean + self.std_threshold * std
+
+        if latency_ms > mean + 8 * std:
+            severity = 'High'
+        elif latency_ms > mean + 5 * std:
+            severity = 'Medium'
+        elif latency_ms > upper:
+            severity = 'Low'
+        else:
+            severity = 'Normal'
+        root_cause = ROOT_CAUSE_HINTS.get(severity, 'None')
+
+        event = {
+            'Volume_Name': vol_name,
+            'Timestamp': timestamp,
+            'Latency_ms': latency_ms,
+            **metrics,
+            'Hour': timestamp.hour,
+            'Baseline_Mean': mean,
+            'Baseline_Std': std,
+            'Upper_Bound': upper,
+            'Lower_Bound': max(mean - self.std_threshold * std, 0),
+            'Is_Anomaly': severity != 'Normal',
+            'Severity': severity,
+            'Root_Cause': root_cause,
+            'Resolution_Steps': RESOLUTION_STEPS.get(root_cause, 'N/A')
+        }
+
+        if self.learn:
+            self._learn(key, latency_ms)
+        if event['Is_Anomaly'] and self.on_anomaly is not None:
+            self.on_anomaly(event)
+        return event
+
+    def score_batch(self, samples):
+        """
+        Scores a micro-batch (DataFrame or iterable of dicts with Volume_Name,
+        Timestamp, Latency_ms and optional IOPS/Throughput_MB) and yields only
+        the anomaly events.
+        """
+        if isinstance(samples, pd.DataFrame):
+            samples = samples.to_dict('records')
+        for sample in samples:
+            sample = dict(sample)
+            sample.pop('Hour', None)
+            event = self.score(sample.pop('Volume_Name'), sample.pop('Timestamp'), sample.pop('Latency_ms'), **sample)
+            if event['Is_Anomaly']:
+                yield event
+
 if __name__ == "__main__":
     # Test run
     try:
         print("Testing anomaly detection...")
-        df = load_data('storage_data.csv')
+        df = load_data()
         processed = detect_anomalies(df)
         
         anomalies = processed[processed['Is_Anomaly'] == True]
@@ -1,10 +1,16 @@
+import os
 import streamlit as st
 import pandas as pd
 import altair as alt
 import random
 import datetime
-from anomaly_detection import load_data, detect_anomalies
-from alerting import trigger_alert_flow
+from anomaly_detection import load_data, FleetCheckpoint
+from telemetry_store import open_store, DATA_PATH
+from alert_aggregation import aggregate_alert
+from fleet_metrics import get_latest_metrics
+from downsampling import build_pyramid, chart_series, rollup_series, window_series, TIME_RANGES, MAX_POINTS
+from rollups import RollupStore, TIERS
+from hot_cache import get_hot_cache, HOT_CACHE_WINDOW
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -281,56 +287,61 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# --- DYNAMIC DATA AGGREGATION ---
-def get_latest_metrics(df):
-    """
-    Aggregates the latest metrics for each volume from the AI dataframe.
-    """
-    if df.empty:
-        return []
-    
-    # Get latest timestamp per volume
-    latest = df.sort_values('Timestamp').groupby('Volume_Name').tail(1)
-    
-    fleet_data = []
-    for _, row in latest.iterrows():
-        # Mocking static attributes for UI fidelity (in a real app, this comes from ONTAP API)
-        vol_name = row['Volume_Name']
-        static_props = {
-            'AZURETEST': {'SVM': 'USERDATA_SVM', 'Total': 10, 'Used': 6.81, 'Unit': 'TB'},
-            'DESKTOPS':  {'SVM': 'EUC_SVM', 'Total': 2.11, 'Used': 1.73, 'Unit': 'TB'},
-            'vol_vdi_boot': {'SVM': 'EUC_SVM', 'Total': 1, 'Used': 0.8, 'Unit': 'TB'},
-            'vol_analytics_01': {'SVM': 'USERDATA_SVM', 'Total': 10, 'Used': 6.8, 'Unit': 'TB'}
-        }
-        # Default props if not in mock map
-        props = static_props.get(vol_name, {'SVM': 'DATA_SVM', 'Total': 5, 'Used': 2.5, 'Unit': 'TB'})
-        
-        fleet_data.append({
-            "Name": vol_name,
-            "SVM": props['SVM'],
-            "Status": "Online",
-            "Total": props['Total'],
-            "Used": props['Used'],
-            "Unit": props['Unit'],
-            "IOPS": f"{row['IOPS']:.0f}", 
-            "Lat": round(row['Latency_ms'], 2),
-            "Tput": round(row['Throughput_MB'], 2)
-        })
-    return fleet_data
-
-
 # --- LOAD AI DATA ---
-@st.cache_data
-def get_ai_data():
-    return detect_anomalies(load_data('storage_data.csv'))
+# Cache entries are keyed by the store's data version (per volume where possible),
+# so a write to one volume only invalidates that volume's entries.
+store = open_store(DATA_PATH)
+rollups = RollupStore(DATA_PATH)
+hot_cache = get_hot_cache(DATA_PATH)
+
+# Every write adds a version to the per-volume caches: keep about two versions of as many
+# volumes as the dashboard is likely to have open, and let idle entries age out
+VOLUME_CACHE_ENTRIES = 2 * int(os.getenv('VOLUME_CACHE_VOLUMES', '25'))
+VOLUME_CACHE_TTL = int(os.getenv('VOLUME_CACHE_TTL_SECONDS', '3600'))
+
+@st.cache_resource
+def get_baseline_checkpoint():
+    # Fleet baseline checkpoint, read once per server; survives cache invalidation, so rescoring
+    # a volume only folds in its newly appended rows and a restart doesn't replay history
+    checkpoint = FleetCheckpoint(DATA_PATH)
+    try:
+        return checkpoint.load()
+    except Exception as e:
+        print(f"[BASELINE ERROR] Could not load {checkpoint.path}: {e}")
+        return FleetCheckpoint(DATA_PATH)
+
+@st.cache_data(max_entries=2, ttl=VOLUME_CACHE_TTL)
+def get_fleet_latest(version):
+    # List view only needs the latest sample per volume (no scoring)
+    return store.latest()
+
+@st.cache_data(max_entries=VOLUME_CACHE_ENTRIES, ttl=VOLUME_CACHE_TTL)
+def get_volume_data(vol_name, version):
+    # Detail view only reads the selected volume from the store
+    return load_data(volumes=[vol_name])
+
+@st.cache_data(max_entries=VOLUME_CACHE_ENTRIES, ttl=VOLUME_CACHE_TTL)
+def get_volume_pyramid(vol_name, version):
+    # Decimated resolutions for the detail charts, built once per data version
+    return build_pyramid(get_volume_data(vol_name, version))
+
+@st.cache_data(max_entries=len(TIERS) * VOLUME_CACHE_ENTRIES, ttl=VOLUME_CACHE_TTL)
+def get_volume_rollup(vol_name, tier, version):
+    # Hourly/daily aggregates for long time ranges (no raw samples read)
+    return rollups.read(tier, volumes=[vol_name])
+
+@st.cache_data(max_entries=VOLUME_CACHE_ENTRIES, ttl=VOLUME_CACHE_TTL)
+def get_volume_ai_data(vol_name, version):
+    # Baselines are per (volume, hour), so scoring one volume alone gives the same result as the fleet
+    return get_baseline_checkpoint().detect(vol_name, get_volume_data(vol_name, version))
 
 try:
-    df_ai = get_ai_data()
+    df_latest = get_fleet_latest(store.data_version())
 except:
-    df_ai = pd.DataFrame()
+    df_latest = pd.DataFrame()
 
-if not df_ai.empty:
-    mock_fleet = get_latest_metrics(df_ai)
+if not df_latest.empty:
+    mock_fleet = get_latest_metrics(df_latest)
 else:
     # Fallback if no data
     mock_fleet = []
@@ -510,24 +521,20 @@ elif st.session_state.view == 'detail':
         
         from data_generator import inject_latency_spike, inject_normal_data
         from investigation import run_investigation
-        from alerting import trigger_alert_flow
+        from alert_aggregation import aggregate_alert
         
         # 1. Trigger Spike (Randomly picks scenario in backend)
         if st.button("⚠️ Trigger Latency Spike", key="sim_trigger_btn", use_container_width=True):
              with st.spinner("Injecting Anomaly..."):
                 inject_latency_spike(vol_name, scenario="random")
-                get_ai_data.clear() # Clear cache to fetch new spike
                 
-                # Fetch fresh data for AI Analysis
-                df_fresh = get_ai_data()
+                # Fetch fresh data for AI Analysis (the spike bumped only this volume's data version)
+                df_fresh = get_volume_ai_data(vol_name, store.data_version(vol_name))
                 
                 # Filter strictly to "Now" to avoid future timestamp confusion in reports
                 # (Simulation might generate a batch, but we only want to report up to current moment)
                 now = datetime.datetime.now()
-                df_fresh['Timestamp'] = pd.to_datetime(df_fresh['Timestamp'])
-                df_fresh = df_fresh[df_fresh['Timestamp'] <= now + datetime.timedelta(minutes=5)] # Small buffer
-                
-                vol_fresh_data = df_fresh[df_fresh['Volume_Name'] == vol_name]
+                vol_fresh_data = df_fresh[df_fresh['Timestamp'] <= now + datetime.timedelta(minutes=5)] # Small buffer
                 
                 if not vol_fresh_data.empty:
                     # Get the spike data (last row)
@@ -538,8 +545,8 @@ elif st.session_state.view == 'detail':
                         # Force High severity for simulation
                         result = run_investigation(vol_name, latest_metrics, "High", history_df=vol_fresh_data) 
                         
-                        # Trigger Alerts (PDF generation happening here)
-                        trigger_alert_flow(result, {'enable_email': True, 'enable_teams': True})
+                        # Queue Alerts (coalesced per window, then delivered by background workers)
+                        aggregate_alert(result, {'enable_email': True, 'enable_teams': True})
                         
                         # Store in session state for display
                         st.session_state['ai_result'] = result
@@ -552,12 +559,12 @@ elif st.session_state.view == 'detail':
         if st.button("✅ Normalize Performance", key="sim_norm_btn", use_container_width=True):
              with st.spinner("Stabilizing..."):
                 inject_normal_data(vol_name)
+                get_baseline_checkpoint().drop(vol_name) # History was rewritten, not appended
                 # Clear AI result on normalization
                 if 'ai_result' in st.session_state:
                     del st.session_state['ai_result']
                 
                 st.toast(f"Performance normalized for {vol_name}.", icon="✅")
-                get_ai_data.clear() 
                 st.rerun()
     
 # AI result display removed per user request    
@@ -605,11 +612,14 @@ elif st.session_state.view == 'detail':
             <h4 style="margin:0; color:#555;">Performance</h4>
             <div style="background:#0067C5; color:white; padding:5px; border-radius:3px; cursor:pointer;">⬇</div>
         </div>
-        <div style="display:flex; justify-content:space-between; font-size:12px; color:#666; margin-bottom:20px; border-bottom:1px solid #eee; padding-bottom:10px;">
-             <span>Hour</span><span>Day</span><span>Week</span><span>Month</span><span style="font-weight:bold; color:#00609C; border-bottom:2px solid #00609C;">Year</span>
-        </div>
     """, unsafe_allow_html=True)
     
+    # Time range tabs (Year shows the full retention)
+    time_range = st.radio(
+        "Time range", list(TIME_RANGES), index=len(TIME_RANGES) - 1,
+        horizontal=True, label_visibility="collapsed", key="perf_time_range"
+    )
+    
     # Helper to clean chart axis
     def make_chart(data, y_col, color, title, unit=""):
         base = alt.Chart(data).encode(x=alt.X('Timestamp:T', axis=None))
@@ -635,12 +645,35 @@ elif st.session_state.view == 'detail':
         return (area + line + points).properties(height=100, width='container')
 
     # Get Data
-    vol_data = df_ai[df_ai['Volume_Name'] == vol_name]
+    # Short ranges (Hour/Day) come straight from the hot cache of recent samples,
+    # without reading the volume's full history
+    version = store.data_version(vol_name)
+    span = TIME_RANGES[time_range]
+    recent = hot_cache.recent(vol_name, span) if span <= HOT_CACHE_WINDOW else None
+    vol_data = recent if recent is not None else get_volume_data(vol_name, version)
     
     if not vol_data.empty:
         # Get Current Values (Last datapoint)
         curr = vol_data.iloc[-1]
         
+        # Charts get a bounded number of points for the selected range, whatever the retention:
+        # the recent raw samples, else the coarsest rollup tier that resolves the range, else the raw-sample pyramid.
+        # The range is clamped to the history the volume actually has, so e.g. 30 days of data on the
+        # Year tab is drawn from hourly buckets rather than ~30 daily ones.
+        covered = min(span, vol_data['Timestamp'].max() - vol_data['Timestamp'].min())
+        tier = rollups.tier_for(covered / MAX_POINTS, span=covered) if recent is None else None
+        rollup = get_volume_rollup(vol_name, tier, version) if tier else None
+        if rollup is not None and rollup.empty:
+            rollup = None
+        pyramid = get_volume_pyramid(vol_name, version) if recent is None and rollup is None else None
+        
+        def series(metric):
+            if recent is not None:
+                return window_series(recent, metric, time_range)
+            if rollup is not None:
+                return rollup_series(rollup, metric, time_range)
+            return chart_series(pyramid, metric, time_range)
+        
         # 1. Latency Chart (Fixed Layering)
         st.markdown(f"""
         <div style="display:flex; justify-content:space-between; align-items:flex-end;">
@@ -650,7 +683,7 @@ elif st.session_state.view == 'detail':
         """, unsafe_allow_html=True)
         
         # Robust Altair Chart Construction
-        lat_chart = make_chart(vol_data, 'Latency_ms', '#0087F5', 'Latency')
+        lat_chart = make_chart(series('Latency_ms'), 'Latency_ms', '#0087F5', 'Latency')
         st.altair_chart(lat_chart, use_container_width=True)
         
         st.markdown("<hr style='margin:10px 0; border-top:1px solid #eee;'>", unsafe_allow_html=True)
@@ -662,7 +695,7 @@ elif st.session_state.view == 'detail':
             <div style="font-size:20px; font-weight:600; color:#333;">{curr['IOPS']/1000:.2f} <span style="font-size:14px; color:#666;">k</span></div>
         </div>
         """, unsafe_allow_html=True)
-        iops_chart = make_chart(vol_data, 'IOPS', '#0087F5', 'IOPS')
+        iops_chart = make_chart(series('IOPS'), 'IOPS', '#0087F5', 'IOPS')
         st.altair_chart(iops_chart, use_container_width=True)
         
         st.markdown("<hr style='margin:10px 0; border-top:1px solid #eee;'>", unsafe_allow_html=True)
@@ -674,7 +707,7 @@ elif st.session_state.view == 'detail':
             <div style="font-size:20px; font-weight:600; color:#333;">{curr['Throughput_MB']:.2f} <span style="font-size:14px; color:#666;">MB/s</span></div>
         </div>
         """, unsafe_allow_html=True)
-        tput_chart = make_chart(vol_data, 'Throughput_MB', '#0087F5', 'Throughput')
+        tput_chart = make_chart(series('Throughput_MB'), 'Throughput_MB', '#0087F5', 'Throughput')
         st.altair_chart(tput_chart, use_container_width=True)
 
     else:
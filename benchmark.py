@@ -0,0 +1,279 @@
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import argparse
+import datetime
+import platform
+import subprocess
+import tempfile
+import threading
+import tracemalloc
+import multiprocessing
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+RESULTS_DIR = 'benchmark_results'
+REGRESSION_THRESHOLD = 0.20  # Flag stages more than 20% slower than the reference run
+
+def _peak_rss_mb():
+    """Process high-water-mark RSS in MB (None where the platform can't report it)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _current_rss_mb():
+    """Current RSS in MB from /proc (Linux); None elsewhere."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class _RssSampler:
+    """
+    Samples the current RSS on a background thread while a stage runs and
+    returns how far it rose above its value at the start. Without /proc it
+    falls back to the growth of the high-water mark, a lower bound that reads
+    0 once an earlier stage peaked higher.
+    """
+    INTERVAL = 0.005
+
+    def __init__(self):
+        self._start = _current_rss_mb()
+        self._peak = self._start
+        self._start_hwm = _peak_rss_mb()
+        self._done = threading.Event()
+        self._thread = None
+        if self._start is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+
+    def _sample(self):
+        while not self._done.wait(self.INTERVAL):
+            self._peak = max(self._peak, _current_rss_mb())
+
+    def stop(self):
+        if self._thread is None:
+            end_hwm = _peak_rss_mb()
+            return end_hwm - self._start_hwm if end_hwm is not None else None
+        self._done.set()
+        self._thread.join()
+        return max(self._peak, _current_rss_mb()) - self._start
+
+class StageTimer:
+    """
+    Records wall time, rows/sec and memory for each pipeline stage.
+    stage_rss_mb is how far the process RSS rose above its level at the start
+    of the stage (sampled while it runs), so each stage is charged only for
+    its own memory. With trace_memory=True, peak_traced_mb is the tracemalloc peak during the stage
+    (numpy/pandas buffers included); tracing slows Python-heavy stages such as
+    report rendering by an order of magnitude, so it is off by default.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    def run(self, name, rows, fn, *args, **kwargs):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        sampler = _RssSampler()
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        stage_rss_mb = sampler.stop()
+        self.stages[name] = {
+            'seconds': elapsed,
+            'rows': rows if not callable(rows) else rows(result),
+            'peak_traced_mb': tracemalloc.get_traced_memory()[1] / (1024 * 1024) if self.trace_memory else None,
+            'stage_rss_mb': stage_rss_mb
+        }
+        self.stages[name]['rows_per_sec'] = self.stages[name]['rows'] / elapsed if elapsed > 0 else None
+        return result
+
+def _run_size(args):
+    """
+    Worker: generates one fleet size and drives every stage in a fresh process,
+    so memory numbers of one size don't leak into the next.
+    """
+    num_volumes, num_days, backend, seed, workdir, trace_memory = args
+    from data_generator import generate_fleet
+    from anomaly_detection import load_data, detect_anomalies, AnomalyIndex, calculate_baseline, calculate_robust_baseline
+    from fleet_metrics import get_latest_metrics
+    from investigation import run_investigation
+    from reporting import generate_investigation_report
+
+    path = os.path.join(workdir, f"fleet_{num_volumes}x{num_days}" + ('.csv' if backend == 'csv' else ''))
+    generate_fleet(path, num_volumes=num_volumes, num_days=num_days, workers=1, seed=seed,
+                   end_time='2026-01-01')
+
+    if trace_memory:
+        tracemalloc.start()
+    timer = StageTimer(trace_memory)
+    df = timer.run('load_data', len, load_data, path)
+    scored = timer.run('detect_anomalies', len(df), detect_anomalies, df)
+    # Baseline cost: mean/std per hour vs median/MAD per hour of week
+    timer.run('calculate_baseline', len(df), calculate_baseline, df)
+    timer.run('calculate_robust_baseline', len(df), calculate_robust_baseline, df)
+    timer.run('detect_anomalies_robust', len(df), detect_anomalies, df, robust=True)
+    index = timer.run('anomaly_index', len(scored), AnomalyIndex, scored)
+    compact = timer.run('detect_anomalies_compact', len(df), detect_anomalies, df, compact=True)
+    frame_mb = {
+        'full': scored.memory_usage(deep=True).sum() / (1024 * 1024),
+        'compact': compact.memory_usage() / (1024 * 1024)
+    }
+    del compact
+    timer.run('get_latest_metrics', len(scored), get_latest_metrics, scored)
+
+    # Investigate (and report on) the most recent anomaly of up to 20 volumes
+    anomalies = index.anomalies().groupby('Volume_Name', observed=True).tail(1).tail(20)
+
+    def investigate_all():
+        return [
+            run_investigation(row['Volume_Name'], row, row['Severity'],
+                              history_df=index.volume_slice(row['Volume_Name']))
+            for row in anomalies.to_dict('records')
+        ]
+
+    results = timer.run('run_investigation', len(anomalies), investigate_all)
+    completed = [r for r in results if r['status'] == 'Completed'][:5]
+
+    def report_all():
+        for r in completed:
+            generate_investigation_report(r, filename=os.path.join(workdir, f"{r['id']}.pdf"))
+
+    timer.run('generate_investigation_report', len(completed), report_all)
+    if trace_memory:
+        tracemalloc.stop()
+
+    return {'volumes': num_volumes, 'days': num_days, 'rows': len(df), 'stages': timer.stages, 'frame_mb': frame_mb}
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return 'unknown'
+
+def run_benchmarks(sizes, num_days=7, backend='csv', seed=42, trace_memory=False):
+    """
+    Runs the detection -> investigation -> reporting pipeline on synthetic
+    fleets of increasing size and returns a result document.
+    """
+    import pandas as pd
+    import numpy as np
+
+    workdir = tempfile.mkdtemp(prefix='netapp_bench_')
+    runs = []
+    try:
+        ctx = multiprocessing.get_context('spawn')
+        for num_volumes in sizes:
+            print(f"[BENCH] {num_volumes} volumes x {num_days} days ({backend})...")
+            with ctx.Pool(1) as pool:
+                runs.append(pool.apply(_run_size, ((num_volumes, num_days, backend, seed, workdir, trace_memory),)))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'backend': backend,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'runs': runs
+    }
+
+def save_results(results, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(results_dir, f"{stamp}-{results['commit']}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    return path
+
+def latest_result(backend, results_dir=RESULTS_DIR, exclude=None):
+    """Most recent stored result for the same backend (file names sort by time)."""
+    for path in sorted(glob.glob(os.path.join(results_dir, '*.json')), reverse=True):
+        if path == exclude:
+            continue
+        with open(path) as f:
+            if json.load(f).get('backend') == backend:
+                return path
+    return None
+
+def print_results(results):
+    print(f"\nCommit {results['commit']} | {results['backend']} | pandas {results['pandas']}")
+    print(f"{'volumes':>8} {'rows':>10}  {'stage':<32} {'seconds':>9} {'rows/sec':>12} {'traced MB':>10} {'+RSS MB':>8}")
+    for run in results['runs']:
+        for name, s in run['stages'].items():
+            rss = f"{s['stage_rss_mb']:.0f}" if s.get('stage_rss_mb') is not None else 'n/a'
+            rps = f"{s['rows_per_sec']:.0f}" if s['rows_per_sec'] else 'n/a'
+            traced = f"{s['peak_traced_mb']:.1f}" if s['peak_traced_mb'] is not None else 'n/a'
+            print(f"{run['volumes']:>8} {run['rows']:>10}  {name:<32} {s['seconds']:>9.3f} {rps:>12} "
+                  f"{traced:>10} {rss:>8}")
+
+    print(f"\nDetection frame memory (MB):")
+    print(f"{'volumes':>8} {'days':>5} {'rows':>10} {'full':>10} {'compact':>10} {'reduction':>10}")
+    for run in results['runs']:
+        mb = run.get('frame_mb')
+        if mb:
+            print(f"{run['volumes']:>8} {run['days']:>5} {run['rows']:>10} {mb['full']:>10.1f} {mb['compact']:>10.1f} "
+                  f"{1 - mb['compact'] / mb['full']:>10.0%}")
+
+def compare_results(current, reference, threshold=REGRESSION_THRESHOLD):
+    """
+    Prints per-stage time ratios against a reference run and returns the
+    list of (volumes, stage, ratio) that regressed beyond the threshold.
+    """
+    ref_runs = {(r['volumes'], r['days']): r for r in reference['runs']}
+    regressions = []
+    print(f"\nComparison against {reference['commit']} ({reference['timestamp']}):")
+    for run in current['runs']:
+        ref = ref_runs.get((run['volumes'], run['days']))
+        if ref is None:
+            continue
+        for name, s in run['stages'].items():
+            if name not in ref['stages'] or not ref['stages'][name]['seconds']:
+                continue
+            ratio = s['seconds'] / ref['stages'][name]['seconds']
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = '  <-- REGRESSION'
+                regressions.append((run['volumes'], name, ratio))
+            print(f"{run['volumes']:>8}  {name:<32} {ratio:>6.2f}x{flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the detection -> investigation -> reporting pipeline.")
+    parser.add_argument('--sizes', default='10,100,1000', help="Comma-separated fleet sizes (volumes).")
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--backend', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--compare', help="Reference result JSON (default: the latest stored result).")
+    parser.add_argument('--trace-memory', action='store_true', help="Record tracemalloc peaks per stage (slow).")
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    results = run_benchmarks([int(s) for s in args.sizes.split(',')], num_days=args.days, backend=args.backend,
+                             trace_memory=args.trace_memory)
+    print_results(results)
+
+    saved = None if args.no_save else save_results(results)
+    if saved:
+        print(f"\n[BENCH] Results stored in {saved}")
+
+    reference_path = args.compare or latest_result(args.backend, exclude=saved)
+    if reference_path:
+        with open(reference_path) as f:
+            regressions = compare_results(results, json.load(f))
+        if regressions:
+            print(f"[BENCH] {len(regressions)} stage(s) regressed by more than {REGRESSION_THRESHOLD:.0%}")
+            sys.exit(1)
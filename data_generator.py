@@ -2,8 +2,95 @@ import pandas as pd
 import numpy as np
 import datetime
 import random
+import os
+import multiprocessing
+from telemetry_store import open_store, DATA_PATH
+from rollups import RollupStore, compute_rollup, TIERS
+from anomaly_detection import reset_baseline_checkpoints
+from hot_cache import get_hot_cache
 
-def generate_synthetic_data(file_path='storage_data.csv', num_days=30):
+def generate_volume_series(vol, timestamps, rng, anomaly_rate=0.01, num_storms=2):
+    """
+    Generates the synthetic Latency/IOPS/Throughput series of one volume.
+    All randomness comes from `rng` (a numpy Generator) so output is reproducible per seed.
+    """
+    # Base latency logic:
+    # 1. Sinusoidal pattern (higher during day, lower at night)
+    # 2. Random Gaussian noise
+    # 3. Different characteristics per volume
+    
+    base_latency = rng.uniform(2.0, 5.0) # Base ms
+    vol_noise_factor = rng.uniform(0.5, 1.5)
+    
+    # Create a day-of-week factor (weekends quieter?)
+    # For simplicity, just daily cycle here.
+    
+    # Vectorized generation for speed
+    n = len(timestamps)
+    
+    # Hour of day component (0-23 converted to radians for sine)
+    hours = timestamps.hour.values + timestamps.minute.values / 60.0
+    daily_pattern = np.sin((hours - 6) * np.pi / 12) # Peak around 12 PM (noon)
+    # Shift sine to be 0 to 1-ish
+    daily_pattern = (daily_pattern + 1) / 2 # Normalize 0-1
+    
+    # Latency series
+    # Base + (Pattern * Amplitude) + Noise
+    latency_series = base_latency + (daily_pattern * 5.0) + rng.normal(0, vol_noise_factor, n)
+    
+    # Ensure no negative latency
+    latency_series = np.maximum(latency_series, 0.5)
+    
+    # 4. Generate IOPS (Poisson-like but scaled) - correlated with latency slightly
+    # Base load + daily cycle + random noise
+    base_iops_vol_factor = rng.uniform(500, 2000) # Base IOPS for this volume
+    iops_series = base_iops_vol_factor + (daily_pattern * 1000) + rng.normal(0, 200, n)
+    iops_series = np.maximum(iops_series, 0) # Ensure no negative IOPS
+
+    # 5. Generate Throughput (MB/s) -> IOPS * BlockSize (random between 4k and 64k mixed)
+    # roughly: IOPS * (avg 32KB) / 1024 / 1024
+    avg_block_size_kb = rng.normal(32, 10, n)
+    avg_block_size_kb = np.maximum(avg_block_size_kb, 4) # min 4KB
+    throughput_series = (iops_series * avg_block_size_kb) / 1024
+    throughput_series = np.maximum(throughput_series, 0) # Ensure no negative throughput
+
+    # Inject Anomalies (Spikes)
+    # anomaly_rate chance of a spike (1% by default)
+    num_anomalies = int(n * anomaly_rate)
+    anomaly_indices = rng.choice(n, num_anomalies, replace=False)
+    
+    # Latency spikes
+    latency_series[anomaly_indices] += rng.uniform(20.0, 100.0, num_anomalies)
+    # IOPS spikes (often correlated with latency spikes, but can be independent)
+    iops_series[anomaly_indices] += rng.uniform(2000, 5000, num_anomalies)
+    # Throughput spikes (derived from IOPS spikes)
+    throughput_series[anomaly_indices] = (iops_series[anomaly_indices] * avg_block_size_kb[anomaly_indices]) / 1024
+    
+    # Inject Sustained High Latency (e.g., a "storm" lasting 1 hour)
+    # Pick num_storms random start points
+    for _ in range(num_storms if n > 24 else 0):
+        start_idx = rng.integers(0, n - 24, endpoint=True) # 24 5-min intervals = 2 hours approx
+        duration = rng.integers(6, 24, endpoint=True)
+        storm = slice(start_idx, start_idx + duration)
+        
+        # Latency storm
+        latency_series[storm] += rng.uniform(15.0, 40.0)
+        # IOPS might drop or stay high during a latency storm, let's make it drop slightly
+        iops_series[storm] = np.maximum(iops_series[storm] * rng.uniform(0.5, 0.8), 0)
+        # Throughput adjusted based on new IOPS
+        throughput_series[storm] = (iops_series[storm] * avg_block_size_kb[storm]) / 1024
+
+    # Build DataFrame part
+    return pd.DataFrame({
+        'Volume_Name': vol,
+        'Timestamp': timestamps,
+        # Round latency for readability
+        'Latency_ms': latency_series.round(2),
+        'IOPS': iops_series,
+        'Throughput_MB': throughput_series
+    })
+
+def generate_synthetic_data(file_path=DATA_PATH, num_days=30):
     """
     Generates synthetic storage latency data for a fictional NetApp environment.
     """
@@ -22,85 +109,9 @@ def generate_synthetic_data(file_path='storage_data.csv', num_days=30):
     
     # Generate Time Series
     timestamps = pd.date_range(start=start_time, end=end_time, freq=freq)
+    rng = np.random.default_rng()
     
-    all_data = []
-
-    for vol in volumes:
-        # Base latency logic:
-        # 1. Sinusoidal pattern (higher during day, lower at night)
-        # 2. Random Gaussian noise
-        # 3. Different characteristics per volume
-        
-        base_latency = random.uniform(2.0, 5.0) # Base ms
-        vol_noise_factor = random.uniform(0.5, 1.5)
-        
-        # Create a day-of-week factor (weekends quieter?)
-        # For simplicity, just daily cycle here.
-        
-        # Vectorized generation for speed
-        n = len(timestamps)
-        
-        # Hour of day component (0-23 converted to radians for sine)
-        hours = timestamps.hour.values + timestamps.minute.values / 60.0
-        daily_pattern = np.sin((hours - 6) * np.pi / 12) # Peak around 12 PM (noon)
-        # Shift sine to be 0 to 1-ish
-        daily_pattern = (daily_pattern + 1) / 2 # Normalize 0-1
-        
-        # Latency series
-        # Base + (Pattern * Amplitude) + Noise
-        latency_series = base_latency + (daily_pattern * 5.0) + np.random.normal(0, vol_noise_factor, n)
-        
-        # Ensure no negative latency
-        latency_series = np.maximum(latency_series, 0.5)
-        
-        # 4. Generate IOPS (Poisson-like but scaled) - correlated with latency slightly
-        # Base load + daily cycle + random noise
-        base_iops_vol_factor = random.uniform(500, 2000) # Base IOPS for this volume
-        iops_series = base_iops_vol_factor + (daily_pattern * 1000) + np.random.normal(0, 200, n)
-        iops_series = np.maximum(iops_series, 0) # Ensure no negative IOPS
-
-        # 5. Generate Throughput (MB/s) -> IOPS * BlockSize (random between 4k and 64k mixed)
-        # roughly: IOPS * (avg 32KB) / 1024 / 1024
-        avg_block_size_kb = np.random.normal(32, 10, n)
-        avg_block_size_kb = np.maximum(avg_block_size_kb, 4) # min 4KB
-        throughput_series = (iops_series * avg_block_size_kb) / 1024
-        throughput_series = np.maximum(throughput_series, 0) # Ensure no negative throughput
-
-        # Inject Anomalies (Spikes)
-        # 1% chance of a spike
-        num_anomalies = int(n * 0.01)
-        anomaly_indices = np.random.choice(n, num_anomalies, replace=False)
-        
-        # Latency spikes
-        latency_series[anomaly_indices] += np.random.uniform(20.0, 100.0, num_anomalies)
-        # IOPS spikes (often correlated with latency spikes, but can be independent)
-        iops_series[anomaly_indices] += np.random.uniform(2000, 5000, num_anomalies)
-        # Throughput spikes (derived from IOPS spikes)
-        throughput_series[anomaly_indices] = (iops_series[anomaly_indices] * avg_block_size_kb[anomaly_indices]) / 1024
-        
-        # Inject Sustained High Latency (e.g., a "storm" lasting 1 hour)
-        # Pick 2 random start points
-        for _ in range(2):
-            start_idx = random.randint(0, n - 24) # 24 5-min intervals = 2 hours approx
-            duration = random.randint(6, 24) 
-            
-            # Latency storm
-            latency_series[start_idx : start_idx + duration] += random.uniform(15.0, 40.0)
-            # IOPS might drop or stay high during a latency storm, let's make it drop slightly
-            iops_series[start_idx : start_idx + duration] = np.maximum(iops_series[start_idx : start_idx + duration] * random.uniform(0.5, 0.8), 0)
-            # Throughput adjusted based on new IOPS
-            throughput_series[start_idx : start_idx + duration] = (iops_series[start_idx : start_idx + duration] * avg_block_size_kb[start_idx : start_idx + duration]) / 1024
-
-
-        # Build DataFrame part
-        df_vol = pd.DataFrame({
-            'Volume_Name': vol,
-            'Timestamp': timestamps,
-            'Latency_ms': latency_series,
-            'IOPS': iops_series,
-            'Throughput_MB': throughput_series
-        })
-        all_data.append(df_vol)
+    all_data = [generate_volume_series(vol, timestamps, rng) for vol in volumes]
     
     # Combine all
     final_df = pd.concat(all_data)
@@ -108,26 +119,100 @@ def generate_synthetic_data(file_path='storage_data.csv', num_days=30):
     # Sort
     final_df.sort_values(by=['Volume_Name', 'Timestamp'], inplace=True)
     
-    # Round latency for readability
-    final_df['Latency_ms'] = final_df['Latency_ms'].round(2)
-    
-    # Save
-    final_df.to_csv(file_path, index=False)
+    # Save (and rebuild the hourly/daily rollups from the same frame)
+    open_store(file_path).rewrite(final_df)
+    rollups = RollupStore(file_path)
+    rollups.reset()
+    rollups.ingest(final_df, complete=True)
+    reset_baseline_checkpoints(file_path)
     print(f"Successfully generated {len(final_df)} rows of data at {file_path}")
 
-def inject_latency_spike(vol_name, scenario="random", duration_mins=30):
+def _generate_fleet_shard(args):
+    """Worker: builds one shard of volumes. Each volume has its own seed, so output does not depend on sharding."""
+    vol_indices, timestamps, seed, anomaly_rate, storm_rate = args
+    num_days = (timestamps[-1] - timestamps[0]).total_seconds() / 86400
+    parts = []
+    for idx in vol_indices:
+        rng = np.random.default_rng([seed, idx])
+        num_storms = rng.poisson(storm_rate * num_days)
+        parts.append(generate_volume_series(f"vol_{idx:05d}", timestamps, rng, anomaly_rate, num_storms))
+    return pd.concat(parts, ignore_index=True)
+
+def _generate_fleet_shard_with_rollups(args):
+    """Worker: builds one shard plus its rollup tables, so aggregation runs in parallel too."""
+    shard_df = _generate_fleet_shard(args)
+    return shard_df, {tier: compute_rollup(shard_df, tier) for tier in TIERS}
+
+def generate_fleet(file_path, num_volumes=10000, num_days=90, workers=None, seed=42,
+                   anomaly_rate=0.01, storm_rate=2 / 30, shard_size=20, end_time=None, freq='5min',
+                   rollups=True):
+    """
+    Generates a large synthetic fleet for load testing.
+    
+    Volumes are split into shards generated in parallel worker processes and
+    streamed to the store shard by shard (CSV append or Parquet part files),
+    so the full fleet is never held in memory.
+    
+    Args:
+        num_volumes / num_days: Fleet size (volumes are named vol_00000, vol_00001, ...).
+        workers: Process count (default: CPU count). 1 runs in-process.
+        seed: Fixed seed; identical arguments produce identical data.
+        anomaly_rate: Fraction of samples that get a latency/IOPS spike.
+        storm_rate: Expected sustained-latency storms per volume per day.
+        end_time: Last timestamp (default: now). Pin it for fully reproducible output.
+        rollups: Also write the hourly/daily rollup tiers (computed in the workers).
+    """
+    end_time = pd.Timestamp(end_time or datetime.datetime.now()).floor(freq)
+    timestamps = pd.date_range(end=end_time, periods=int(num_days * 86400 / pd.Timedelta(freq).total_seconds()) + 1, freq=freq)
+    shards = [
+        (range(i, min(i + shard_size, num_volumes)), timestamps, seed, anomaly_rate, storm_rate)
+        for i in range(0, num_volumes, shard_size)
+    ]
+    workers = workers or os.cpu_count() or 1
+    print(f"Generating {num_volumes} volumes x {num_days} days in {len(shards)} shards on {workers} worker(s)...")
+    
+    store = open_store(file_path)
+    rollup_store = RollupStore(file_path) if rollups else None
+    job = _generate_fleet_shard_with_rollups if rollups else _generate_fleet_shard
+    total = 0
+    
+    def write(result, first):
+        shard_df, tables = result if rollups else (result, None)
+        # First shard replaces any previous output, the rest are appended
+        if first:
+            if rollup_store:
+                rollup_store.reset()
+            reset_baseline_checkpoints(file_path)
+            store.rewrite(shard_df)
+        else:
+            store.append(shard_df)
+        if tables:
+            rollup_store.replace_volumes(tables)
+        return len(shard_df)
+    
+    if workers == 1:
+        for i, shard in enumerate(shards):
+            total += write(job(shard), i == 0)
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for i, result in enumerate(pool.imap(job, shards)):
+                total += write(result, i == 0)
+    
+    print(f"Successfully generated {total} rows of data at {file_path}")
+    return total
+
+def inject_latency_spike(vol_name, scenario="random", duration_mins=30, file_path=DATA_PATH):
     """
     Injects a real-time latency spike based on realistic, baseline-relative scenarios.
     Defaults to 30 mins to simulate a CURRENT incident onset.
     """
     try:
-        df = pd.read_csv('storage_data.csv')
+        store = open_store(file_path)
         
         # 1. Get Robust Baseline (Median of last 50 points to avoid outlier compounding)
-        vol_data = df[df['Volume_Name'] == vol_name]
-        if not vol_data.empty:
-            # Look at recent history (last 50 points ~ 4 hours)
-            recent_history = vol_data.tail(50)
+        # Look at recent history (last 50 points ~ 4 hours), served by the in-process hot cache
+        recent_history = get_hot_cache(file_path).tail(vol_name, 50)
+        if not recent_history.empty:
             base_lat = recent_history['Latency_ms'].median()
             base_iops = recent_history['IOPS'].median()
             base_tput = recent_history['Throughput_MB'].median()
@@ -205,62 +290,52 @@ def inject_latency_spike(vol_name, scenario="random", duration_mins=30):
             })
             
         spike_df = pd.DataFrame(new_rows)
-        spike_df.to_csv('storage_data.csv', mode='a', header=False, index=False)
+        store.append(spike_df)
+        RollupStore(file_path).ingest(spike_df)
         return True
     except Exception as e:
         print(f"Injection failed: {e}")
         return False
 
-def inject_normal_data(vol_name, duration_mins=15):
+def inject_normal_data(vol_name, duration_mins=15, file_path=DATA_PATH):
     """
     Injects normal data AND removes any future 'bad' data to effectively stop the simulation.
+    Only this volume's last hour (and anything after it) is read (from the hot
+    cache when it covers it) and replaced.
     """
     try:
-        df = pd.read_csv('storage_data.csv')
-        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+        store = open_store(file_path)
         
         current_time = datetime.datetime.now()
+        one_hour_ago = current_time - datetime.timedelta(hours=1)
+        recent = get_hot_cache(file_path).since(vol_name, one_hour_ago)
+        if recent is None:
+            recent = store.read(volumes=[vol_name], start=one_hour_ago)
         
         # 1. REMOVE FUTURE DATA for this volume (The sustained spike we just added)
-        # Keep data that is NOT (This Volume AND in the Future)
-        mask = ~((df['Volume_Name'] == vol_name) & (df['Timestamp'] > current_time))
-        df_clean = df[mask].copy() # Work on a copy
-        
         # 2. RETROACTIVE CLEANUP: Clear spikes from the last 60 minutes
-        # Find rows for this volume in the last hour and reset their values to normal
-        one_hour_ago = current_time - datetime.timedelta(hours=1)
-        retro_mask = (df_clean['Volume_Name'] == vol_name) & \
-                     (df_clean['Timestamp'] >= one_hour_ago) & \
-                     (df_clean['Timestamp'] <= current_time)
-                     
-        if retro_mask.any():
-            print(f"Cleaning {retro_mask.sum()} historical rows for {vol_name}...")
-            # Set to normal baselines directly
-            df_clean.loc[retro_mask, 'Latency_ms'] = df_clean.loc[retro_mask, 'Latency_ms'].apply(lambda x: random.uniform(1.0, 3.0))
-            df_clean.loc[retro_mask, 'IOPS'] = df_clean.loc[retro_mask, 'IOPS'].apply(lambda x: random.uniform(800, 1200))
-            df_clean.loc[retro_mask, 'Throughput_MB'] = df_clean.loc[retro_mask, 'Throughput_MB'].apply(lambda x: random.uniform(30, 50))
+        # Keep the timestamps of the last hour but reset their values to normal
+        retro = recent.loc[recent['Timestamp'] <= current_time, ['Volume_Name', 'Timestamp']]
+        if not retro.empty:
+            print(f"Cleaning {len(retro)} historical rows for {vol_name}...")
         
-        # 2. Append ONE clean data point explicitly at NOW to bridge the gap
+        # 3. Append ONE clean data point explicitly at NOW to bridge the gap
         # And a few minutes into future to show "All Green"
         new_times = [current_time + datetime.timedelta(minutes=5 * i) for i in range(int(duration_mins/5) + 1)]
         
-        new_rows = []
-        for t in new_times:
-            new_rows.append({
-                'Volume_Name': vol_name,
-                'Timestamp': t,
-                'Latency_ms': random.uniform(1.0, 3.0),   # Very Healthy
-                'IOPS': random.uniform(800, 1200),        # Normal
-                'Throughput_MB': random.uniform(30, 50)   # Normal
-            })
-            
-        norm_df = pd.DataFrame(new_rows)
-        
-        # Combine clean history + new normal future
-        final_df = pd.concat([df_clean, norm_df], ignore_index=True)
-        final_df.sort_values(by=['Volume_Name', 'Timestamp'], inplace=True)
+        timestamps = list(retro['Timestamp']) + new_times
+        n = len(timestamps)
+        norm_df = pd.DataFrame({
+            'Volume_Name': vol_name,
+            'Timestamp': timestamps,
+            'Latency_ms': np.random.uniform(1.0, 3.0, n),   # Very Healthy
+            'IOPS': np.random.uniform(800, 1200, n),        # Normal
+            'Throughput_MB': np.random.uniform(30, 50, n)   # Normal
+        }).sort_values('Timestamp', ignore_index=True)
         
-        final_df.to_csv('storage_data.csv', index=False)
+        # Replace everything for this volume from one hour ago onwards
+        store.replace_range(vol_name, one_hour_ago, None, norm_df)
+        RollupStore(file_path).refresh([vol_name], one_hour_ago)
         print(f"Normalized {vol_name} and cleaned future data.")
         return True
     except Exception as e:
@@ -268,4 +343,19 @@ def inject_normal_data(vol_name, duration_mins=15):
         return False
 
 if __name__ == "__main__":
-    generate_synthetic_data()
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate synthetic storage telemetry.")
+    parser.add_argument('--fleet', type=int, help="Generate a load-test fleet with this many volumes instead of the demo data.")
+    parser.add_argument('--days', type=int, default=None)
+    parser.add_argument('--out', default=None, help="Output path (.csv file or Parquet directory).")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anomaly-rate', type=float, default=0.01)
+    parser.add_argument('--storm-rate', type=float, default=2 / 30, help="Storms per volume per day.")
+    args = parser.parse_args()
+    
+    if args.fleet:
+        generate_fleet(args.out or 'fleet_data', num_volumes=args.fleet, num_days=args.days or 90,
+                       workers=args.workers, seed=args.seed, anomaly_rate=args.anomaly_rate, storm_rate=args.storm_rate)
+    else:
+        generate_synthetic_data(args.out or DATA_PATH, num_days=args.days or 30)
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from telemetry_store import METRIC_COLUMNS
+
+# Chart time ranges (the Hour/Day/Week/Month/Year tabs of the detail view)
+TIME_RANGES = {
+    'Hour': pd.Timedelta(hours=1),
+    'Day': pd.Timedelta(days=1),
+    'Week': pd.Timedelta(days=7),
+    'Month': pd.Timedelta(days=30),
+    'Year': pd.Timedelta(days=365)
+}
+
+# Pyramid levels: raw samples, then min/max-decimated buckets of increasing width
+PYRAMID_LEVELS = [None, '15min', '1h', '4h', '12h']
+
+# Points per chart (roughly one per horizontal pixel)
+MAX_POINTS = 600
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of n_out points that keep the
+    visual shape of the series. First and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype('int64')
+    indices = np.empty(n_out, dtype='int64')
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average point of the next bucket (the last point for the final bucket)
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        # Pick the point forming the largest triangle with the previous pick and that average
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+def minmax_indices(timestamps, values, bucket):
+    """
+    Indices of the min and max sample of every time bucket, in time order.
+    Unlike averaging, this keeps latency spikes visible at any zoom level.
+    """
+    keys = pd.DatetimeIndex(timestamps).floor(bucket).asi8
+    grouped = pd.Series(np.asarray(values)).groupby(keys, sort=False)
+    return np.union1d(grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy())
+
+def build_pyramid(df, metrics=METRIC_COLUMNS):
+    """
+    Pre-computes decimated resolutions of one volume's series:
+    {metric: [raw, 15min, 1h, 4h, 12h]}, each level a Timestamp/metric frame
+    sorted by time and built from the level below it. Every level holds real
+    samples (bucket min and max), so tooltips still show measured values, and
+    keeps the first and last sample so charts reach the newest one.
+    """
+    df = df.sort_values('Timestamp', kind='stable')
+    pyramid = {}
+    for metric in metrics:
+        level = pd.DataFrame({
+            'Timestamp': df['Timestamp'].to_numpy(),
+            metric: df[metric].to_numpy()
+        })
+        levels = [level]
+        for bucket in PYRAMID_LEVELS[1:]:
+            keep = np.union1d(minmax_indices(level['Timestamp'], level[metric], bucket), [0, len(level) - 1])
+            level = level.iloc[keep].reset_index(drop=True)
+            levels.append(level)
+        pyramid[metric] = levels
+    return pyramid
+
+def chart_series(pyramid, metric, time_range='Year', end=None, max_points=MAX_POINTS):
+    """
+    Returns at most max_points samples of `metric` for the requested tab:
+    the finest pyramid level that is small enough for the window, reduced
+    with LTTB if it is still above max_points.
+    """
+    levels = pyramid[metric]
+    raw = levels[0]
+    if raw.empty:
+        return raw
+    end = pd.Timestamp(end) if end is not None else raw['Timestamp'].iloc[-1]
+    start = end - TIME_RANGES[time_range]
+
+    for level in levels:
+        timestamps = level['Timestamp'].to_numpy()
+        lo, hi = np.searchsorted(timestamps, start.to_datetime64(), 'left'), np.searchsorted(timestamps, end.to_datetime64(), 'right')
+        window = level.iloc[lo:hi]
+        if len(window) <= 2 * max_points:
+            break
+
+    if len(window) > max_points:
+        window = window.iloc[lttb_indices(window['Timestamp'].to_numpy().astype('int64'), window[metric], max_points)]
+    return window
+
+def rollup_series(rollup, metric, time_range='Year', end=None, max_points=MAX_POINTS):
+    """
+    Chart series from a rollup tier (see rollups.py): the bucket max, so
+    spikes stay visible, bounded the same way as chart_series().
+    """
+    series = pd.DataFrame({
+        'Timestamp': rollup['Timestamp'].to_numpy(),
+        metric: rollup[f"{metric}_max"].to_numpy()
+    }).sort_values('Timestamp', kind='stable').reset_index(drop=True)
+    return chart_series({metric: [series]}, metric, time_range, end, max_points)
+
+def window_series(window, metric, time_range='Day', end=None, max_points=MAX_POINTS):
+    """
+    Chart series from a time-ordered window of raw samples (e.g.
+    HotCache.recent()), bounded the same way as chart_series().
+    """
+    return chart_series({metric: [window[['Timestamp', metric]]]}, metric, time_range, end, max_points)
+
+if __name__ == "__main__":
+    # Payload size per tab for one 30-day volume
+    from anomaly_detection import load_data
+
+    df = load_data()
+    vol = df['Volume_Name'].iloc[0]
+    vol_df = df[df['Volume_Name'] == vol]
+    pyramid = build_pyramid(vol_df)
+    print(f"{vol}: {len(vol_df)} raw samples")
+    for name in TIME_RANGES:
+        print(f"  {name:<6} {len(chart_series(pyramid, 'Latency_ms', name)):>5} points")
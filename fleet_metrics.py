@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+from anomaly_detection import SEVERITY_LEVELS
+
+# Mocked static attributes for UI fidelity (in a real app, this comes from ONTAP API)
+VOLUME_METADATA = pd.DataFrame([
+    {'Name': 'AZURETEST', 'SVM': 'USERDATA_SVM', 'Total': 10, 'Used': 6.81, 'Unit': 'TB'},
+    {'Name': 'DESKTOPS', 'SVM': 'EUC_SVM', 'Total': 2.11, 'Used': 1.73, 'Unit': 'TB'},
+    {'Name': 'vol_vdi_boot', 'SVM': 'EUC_SVM', 'Total': 1, 'Used': 0.8, 'Unit': 'TB'},
+    {'Name': 'vol_analytics_01', 'SVM': 'USERDATA_SVM', 'Total': 10, 'Used': 6.8, 'Unit': 'TB'}
+], dtype=object).set_index('Name')  # object dtype keeps 10 / 6.81 as entered for display
+
+# Default props if not in the metadata table
+DEFAULT_METADATA = {'SVM': 'DATA_SVM', 'Total': 5, 'Used': 2.5, 'Unit': 'TB'}
+
+def _metadata_column(meta, col):
+    # Object array so missing entries take the default without dtype coercion
+    values = meta[col].to_numpy(dtype=object)
+    values[pd.isna(values)] = DEFAULT_METADATA[col]
+    return values
+
+def latest_rows(df):
+    """
+    Latest row per volume without sorting the frame (one groupby idxmax).
+    A store snapshot (TelemetryStore.latest()) is already in this shape.
+    """
+    volumes = df['Volume_Name']
+    keys = volumes.cat.codes.to_numpy() if isinstance(volumes.dtype, pd.CategoricalDtype) else volumes.to_numpy()
+    positions = pd.Series(df['Timestamp'].to_numpy()).groupby(keys).idxmax().to_numpy()
+    return df.iloc[positions]
+
+def get_latest_metrics(df, as_frame=False):
+    """
+    Aggregates the latest metrics for each volume from the AI dataframe (or
+    a latest-row snapshot) and joins them to the volume metadata in one
+    vectorized step. Returns a list of records, or the DataFrame with
+    as_frame=True.
+    """
+    if df.empty:
+        return pd.DataFrame() if as_frame else []
+
+    latest = latest_rows(df)
+    names = latest['Volume_Name'].astype(str).to_numpy()
+    meta = VOLUME_METADATA.reindex(names)
+
+    fleet = pd.DataFrame({
+        "Name": names,
+        "SVM": _metadata_column(meta, 'SVM'),
+        "Status": "Online",
+        "Total": _metadata_column(meta, 'Total'),
+        "Used": _metadata_column(meta, 'Used'),
+        "Unit": _metadata_column(meta, 'Unit'),
+        "IOPS": np.char.mod('%.0f', latest['IOPS'].to_numpy(dtype='float64')),
+        "Lat": latest['Latency_ms'].to_numpy(dtype='float64').round(2),
+        "Tput": latest['Throughput_MB'].to_numpy(dtype='float64').round(2)
+    })
+    return fleet if as_frame else fleet.to_dict('records')
+
+class FleetAnomalySummary:
+    """
+    Running fleet-wide aggregate of anomalies for the summary report.
+    add() takes anomaly rows (or scored frames, filtered on Is_Anomaly) in
+    any number of chunks, e.g. one volume or store read at a time, and
+    folds them into per-volume, per-severity and per-time-bucket counts, so
+    memory follows volumes x buckets rather than the number of anomalies.
+    """
+
+    def __init__(self, bucket='1h'):
+        self.bucket = bucket
+        self.total = 0
+        self._severity = None   # (volume, severity) -> count
+        self._buckets = None    # (volume, bucket start) -> count
+        self._volumes = pd.DataFrame(columns=['First_Seen', 'Last_Seen', 'Max_Latency_ms', 'Sum_Latency_ms'])
+
+    def add(self, anomalies):
+        """Folds one chunk of anomaly rows into the summary; returns self."""
+        if 'Is_Anomaly' in anomalies.columns:
+            anomalies = anomalies[anomalies['Is_Anomaly']]
+        if anomalies.empty:
+            return self
+        volumes = anomalies['Volume_Name'].astype(str)
+        timestamps = pd.to_datetime(anomalies['Timestamp'])
+
+        # 1. Counts per volume and severity, and per volume and time bucket
+        severity = anomalies.groupby([volumes, anomalies['Severity'].astype(str)]).size()
+        buckets = anomalies.groupby([volumes, timestamps.dt.floor(self.bucket)]).size()
+        if self._severity is None:
+            self._severity, self._buckets = severity, buckets
+        else:
+            self._severity = self._severity.add(severity, fill_value=0).astype('int64')
+            self._buckets = self._buckets.add(buckets, fill_value=0).astype('int64')
+
+        # 2. Per-volume extremes, merged with what earlier chunks saw
+        latency = anomalies['Latency_ms'].astype('float64')
+        chunk = pd.DataFrame({
+            'First_Seen': timestamps.groupby(volumes).min(),
+            'Last_Seen': timestamps.groupby(volumes).max(),
+            'Max_Latency_ms': latency.groupby(volumes).max(),
+            'Sum_Latency_ms': latency.groupby(volumes).sum()
+        })
+        merged = pd.concat([self._volumes, chunk]) if not self._volumes.empty else chunk
+        self._volumes = merged.groupby(level=0).agg({
+            'First_Seen': 'min', 'Last_Seen': 'max', 'Max_Latency_ms': 'max', 'Sum_Latency_ms': 'sum'
+        })
+        self.total += len(anomalies)
+        return self
+
+    def volumes(self, top_n=None):
+        """
+        One row per affected volume with its SVM, anomaly counts per severity,
+        max/mean latency and first/last seen; worst first (High count, then
+        total, then max latency).
+        """
+        if self._volumes.empty:
+            return pd.DataFrame()
+        counts = self._severity.unstack(fill_value=0).reindex(columns=SEVERITY_LEVELS[:0:-1], fill_value=0)
+        names = self._volumes.index.to_numpy()
+        table = pd.DataFrame({
+            'Volume': names,
+            'SVM': _metadata_column(VOLUME_METADATA.reindex(names), 'SVM'),
+            'Anomalies': counts.sum(axis=1).reindex(names).to_numpy()
+        })
+        for level in counts.columns:
+            table[level] = counts[level].reindex(names).to_numpy()
+        table['Max_Latency_ms'] = self._volumes['Max_Latency_ms'].to_numpy(dtype='float64')
+        table['Mean_Latency_ms'] = self._volumes['Sum_Latency_ms'].to_numpy(dtype='float64') / table['Anomalies']
+        table['First_Seen'] = pd.to_datetime(self._volumes['First_Seen']).to_numpy()
+        table['Last_Seen'] = pd.to_datetime(self._volumes['Last_Seen']).to_numpy()
+        table = table.sort_values(['High', 'Anomalies', 'Max_Latency_ms'], ascending=False, kind='stable')
+        return table.head(top_n).reset_index(drop=True) if top_n else table.reset_index(drop=True)
+
+    def by_svm(self):
+        """Anomaly counts per SVM and severity (plus a Total column)."""
+        table = self.volumes()
+        if table.empty:
+            return pd.DataFrame()
+        levels = SEVERITY_LEVELS[:0:-1]
+        svm = table.groupby('SVM')[levels + ['Anomalies']].sum().rename(columns={'Anomalies': 'Total'})
+        return svm.sort_values('Total', ascending=False)
+
+    def heatmap(self, volumes, max_columns=168):
+        """
+        Anomaly counts of `volumes` (rows) per time bucket (columns). If the
+        covered span has more than max_columns buckets, buckets are merged
+        into a coarser multiple of the summary bucket.
+        """
+        if self._buckets is None:
+            return pd.DataFrame()
+        counts = self._buckets[self._buckets.index.get_level_values(0).isin(list(volumes))]
+        starts = counts.index.get_level_values(1)
+        width = pd.Timedelta(self.bucket)
+        span = self._buckets.index.get_level_values(1)
+        n_buckets = int((span.max() - span.min()) / width) + 1
+        if n_buckets > max_columns:
+            width = width * int(np.ceil(n_buckets / max_columns))
+            starts = starts.floor(width)
+        grid = counts.groupby([counts.index.get_level_values(0), starts]).sum().unstack(fill_value=0)
+        columns = pd.date_range(span.min().floor(width), span.max().floor(width), freq=width)
+        return grid.reindex(index=list(volumes), columns=columns, fill_value=0)
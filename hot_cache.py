@@ -0,0 +1,228 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from telemetry_store import open_store, add_write_listener, DATA_PATH, METRIC_COLUMNS
+
+# Recent history kept per volume: 48 hours at the 5-minute collection interval
+HOT_CACHE_WINDOW = pd.Timedelta(hours=float(os.getenv('HOT_CACHE_WINDOW_HOURS', '48')))
+HOT_CACHE_SAMPLES = int(HOT_CACHE_WINDOW / pd.Timedelta(minutes=5))
+
+class VolumeRing:
+    """
+    Fixed-capacity ring of one volume's newest samples, in time order:
+    int64 (ns) timestamps and a float32 row per sample with METRIC_COLUMNS.
+    Appending evicts the oldest samples; `covered_from` is the earliest
+    time from which the ring holds every sample of the volume.
+    """
+
+    def __init__(self, capacity, covered_from):
+        self.capacity = capacity
+        self.timestamps = np.empty(capacity, dtype='int64')
+        self.metrics = np.empty((capacity, len(METRIC_COLUMNS)), dtype='float32')
+        self.start = 0  # slot of the oldest sample
+        self.size = 0
+        self.covered_from = covered_from
+
+    def _slots(self, first=0):
+        return (self.start + np.arange(first, self.size)) % self.capacity
+
+    def newest(self):
+        return self.timestamps[(self.start + self.size - 1) % self.capacity] if self.size else None
+
+    def push(self, timestamps, metrics):
+        """Appends samples no older than the newest one; O(len(timestamps))."""
+        n = len(timestamps)
+        dropped = self.size + n - self.capacity
+        if n >= self.capacity:
+            timestamps, metrics, n = timestamps[-self.capacity:], metrics[-self.capacity:], self.capacity
+            self.start, self.size = 0, 0
+        slots = (self.start + self.size + np.arange(n)) % self.capacity
+        self.timestamps[slots] = timestamps
+        self.metrics[slots] = metrics
+        self.start = (self.start + max(0, self.size + n - self.capacity)) % self.capacity
+        self.size = min(self.capacity, self.size + n)
+        if dropped > 0:
+            # Older samples were evicted: the ring is only complete from its oldest one on
+            self.covered_from = max(self.covered_from, int(self.timestamps[self.start]))
+
+    def load(self, timestamps, metrics):
+        """Replaces the content with samples in any order (sorted here)."""
+        order = np.argsort(timestamps, kind='stable')
+        self.start, self.size = 0, 0
+        self.push(timestamps[order], metrics[order])
+
+    def search(self, timestamp):
+        """Position (0 = oldest) of the first sample at or after timestamp: binary search over the two ring segments."""
+        first = self.timestamps[self.start:min(self.capacity, self.start + self.size)]
+        if len(first) and timestamp <= first[-1]:
+            return int(np.searchsorted(first, timestamp, 'left'))
+        second = self.timestamps[:self.size - len(first)]
+        return len(first) + int(np.searchsorted(second, timestamp, 'left'))
+
+    def arrays(self, first=0):
+        """Timestamps and metrics from position `first` to the newest sample."""
+        slots = self._slots(first)
+        return self.timestamps[slots], self.metrics[slots]
+
+class HotCache:
+    """
+    In-process cache of the newest HOT_CACHE_SAMPLES samples per volume of
+    one telemetry store, one VolumeRing each. A volume's ring is primed on
+    first use with a single store read of its last HOT_CACHE_WINDOW, then
+    kept current by the store's write listener (append, replace_range,
+    rewrite); a data version moved by another process re-primes it. Recent
+    windows (tail, last 24h, ...) are then a binary search and one copy.
+    """
+
+    def __init__(self, path=DATA_PATH, capacity=HOT_CACHE_SAMPLES):
+        self.path = path
+        self.store = open_store(path)
+        self.capacity = capacity
+        self._rings = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def _prime(self, vol_name):
+        latest = self.store.latest(volumes=[vol_name])
+        if latest.empty:
+            ring = VolumeRing(self.capacity, covered_from=np.iinfo('int64').min)
+        else:
+            start = pd.Timestamp(latest['Timestamp'].max()) - HOT_CACHE_WINDOW
+            ring = VolumeRing(self.capacity, covered_from=start.value)
+            rows = self.store.read(volumes=[vol_name], start=start)
+            ring.load(rows['Timestamp'].to_numpy(dtype='datetime64[ns]').view('int64'),
+                      rows[METRIC_COLUMNS].to_numpy(dtype='float32'))
+        return ring
+
+    def _ring(self, vol_name):
+        vol_name = str(vol_name)
+        version = self.store.data_version(vol_name)
+        with self._lock:
+            ring = self._rings.get(vol_name)
+            if ring is not None and self._versions.get(vol_name) == version:
+                return ring
+        ring = self._prime(vol_name)
+        with self._lock:
+            self._rings[vol_name] = ring
+            self._versions[vol_name] = version
+        return ring
+
+    def _frame(self, vol_name, timestamps, metrics):
+        # Built in the store's typed schema directly (category volume, float32 metrics)
+        return pd.DataFrame({
+            'Volume_Name': pd.Categorical.from_codes(np.zeros(len(timestamps), dtype='int8'), categories=[str(vol_name)]),
+            'Timestamp': timestamps.view('datetime64[ns]'),
+            **{col: metrics[:, i] for i, col in enumerate(METRIC_COLUMNS)}
+        })
+
+    def tail(self, vol_name, n):
+        """The volume's last n samples (fewer if the store has fewer)."""
+        ring = self._ring(vol_name)
+        with self._lock:
+            if n <= ring.size:
+                return self._frame(vol_name, *ring.arrays(ring.size - n))
+        # Longer than the ring holds
+        return self.store.read(volumes=[str(vol_name)]).sort_values('Timestamp', kind='stable').tail(n)
+
+    def since(self, vol_name, start):
+        """The volume's samples at or after start, or None if the ring doesn't reach back that far."""
+        ring = self._ring(vol_name)
+        with self._lock:
+            return self._since(vol_name, ring, pd.Timestamp(start).value)
+
+    def recent(self, vol_name, span):
+        """The volume's samples within `span` of its newest one (e.g. the 24h report window), or None if not covered."""
+        ring = self._ring(vol_name)
+        with self._lock:
+            newest = ring.newest()
+            start = np.iinfo('int64').max if newest is None else int(newest) - pd.Timedelta(span).value
+            return self._since(vol_name, ring, start)
+
+    def _since(self, vol_name, ring, start):
+        if start < ring.covered_from:
+            return None
+        return self._frame(vol_name, *ring.arrays(ring.search(start)))
+
+    def on_write(self, op, df, vol_name=None, start=None, end=None):
+        """Store write listener: folds written rows into the primed rings."""
+        if op == 'rewrite':
+            with self._lock:
+                self._rings.clear()
+                self._versions.clear()
+            return
+        volumes = [str(vol_name)] if op == 'replace' else pd.unique(df['Volume_Name'].astype(str))
+        rows = df.assign(Volume_Name=df['Volume_Name'].astype(str))
+        for vol in volumes:
+            with self._lock:
+                ring = self._rings.get(vol)
+                if ring is None:
+                    continue  # primed from the store on first use
+                vol_rows = rows[rows['Volume_Name'] == vol]
+                timestamps = pd.to_datetime(vol_rows['Timestamp']).to_numpy(dtype='datetime64[ns]').view('int64')
+                metrics = vol_rows[METRIC_COLUMNS].to_numpy(dtype='float32')
+                # The ring only holds the volume from covered_from on
+                new = timestamps >= ring.covered_from
+                timestamps, metrics = timestamps[new], metrics[new]
+                if op == 'replace':
+                    kept_ts, kept_metrics = ring.arrays()
+                    keep = kept_ts < pd.Timestamp(start).value
+                    if end is not None:
+                        keep |= kept_ts > pd.Timestamp(end).value
+                    ring.load(np.concatenate([kept_ts[keep], timestamps]), np.concatenate([kept_metrics[keep], metrics]))
+                elif len(timestamps) and (ring.size == 0 or timestamps.min() >= ring.newest()) and (np.diff(timestamps) >= 0).all():
+                    ring.push(timestamps, metrics)
+                else:
+                    kept_ts, kept_metrics = ring.arrays()
+                    ring.load(np.concatenate([kept_ts, timestamps]), np.concatenate([kept_metrics, metrics]))
+            version = self.store.data_version(vol)
+            with self._lock:
+                if self._rings.get(vol) is ring:
+                    self._versions[vol] = version
+
+    def clear(self):
+        with self._lock:
+            self._rings.clear()
+            self._versions.clear()
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_hot_cache(path=DATA_PATH):
+    """Returns the process-wide hot cache of the store at path."""
+    key = os.path.abspath(path)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = HotCache(path)
+        return _caches[key]
+
+def _on_store_write(path, op, df, **kwargs):
+    cache = _caches.get(os.path.abspath(path))
+    if cache is None:
+        return
+    try:
+        cache.on_write(op, df, **kwargs)
+    except Exception as e:
+        print(f"[CACHE ERROR] Hot cache update failed, re-priming on next use: {e}")
+        cache.clear()
+
+add_write_listener(_on_store_write)
+
+if __name__ == "__main__":
+    # Recent-window access: full volume read vs hot cache
+    import time
+    store = open_store(DATA_PATH)
+    vol = str(store.latest()['Volume_Name'].iloc[0])
+    cache = get_hot_cache(DATA_PATH)
+
+    start = time.perf_counter()
+    tail = store.read(volumes=[vol]).tail(50)
+    print(f"  store read + tail(50): {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    cache.tail(vol, 50)
+    print(f"  hot cache prime: {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    for _ in range(100):
+        cache.tail(vol, 50)
+        cache.recent(vol, pd.Timedelta(hours=24))
+    print(f"  hot cache tail(50) + last 24h: {(time.perf_counter() - start) * 10:.2f} ms")
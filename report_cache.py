@@ -0,0 +1,182 @@
+import os
+import json
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# Memory budget per cache, and how much of its evicted entries may be kept on disk
+REPORT_CACHE_MEMORY_MB = float(os.getenv('REPORT_CACHE_MEMORY_MB', '32'))
+REPORT_CACHE_DISK_MB = float(os.getenv('REPORT_CACHE_DISK_MB', '256'))
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR', '.report_cache')
+
+# The report graph and incident timing only look at the last 24 hours of history
+REPORT_HISTORY_WINDOW = pd.Timedelta(hours=24)
+
+# Printed on every report but not part of its content: a cached body carries
+# fixed-width placeholders (this many characters) that reporting.stamp_report() fills in
+STAMPED_FIELDS = {'id': 32, 'timestamp': 19}
+
+def history_window(history_df, volume_name):
+    """A volume's rows within REPORT_HISTORY_WINDOW of its newest sample."""
+    vol_hist = history_df[history_df['Volume_Name'] == volume_name]
+    if vol_hist.empty:
+        return vol_hist
+    timestamps = pd.to_datetime(vol_hist['Timestamp'])
+    return vol_hist[timestamps >= timestamps.max() - REPORT_HISTORY_WINDOW]
+
+def chart_key(history_df, volume_name):
+    """Content hash of exactly what the performance chart draws."""
+    window = history_window(history_df, volume_name)
+    columns = [c for c in ['Timestamp', 'Latency_ms', 'Upper_Bound'] if c in window.columns]
+    digest = hashlib.sha1(str(volume_name).encode())
+    digest.update(','.join(columns).encode())
+    digest.update(pd.util.hash_pandas_object(window[columns], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def _canonical(value):
+    # JSON-able form of a result; histories are covered by chart_key(), ids and timestamps are stamped
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items() if k != 'history' and k not in STAMPED_FIELDS}
+    if isinstance(value, pd.Series):
+        return _canonical(value.to_dict())
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+def report_key(investigation_result):
+    """
+    Content hash of a rendered report body: everything the PDF prints
+    (volume, findings, analysis, metrics, recommendations, digest groups,
+    ...) plus the chart's history window, but not the STAMPED_FIELDS. Retries,
+    duplicate deliveries and repeat investigations with the same findings
+    map to the same key.
+    """
+    digest = hashlib.sha1(json.dumps(_canonical(investigation_result), sort_keys=True).encode())
+    history = investigation_result.get('history')
+    if history is not None and not history.empty and 'volume' in investigation_result:
+        digest.update(chart_key(history, investigation_result['volume']).encode())
+    return digest.hexdigest()
+
+class RenderCache:
+    """
+    Content-addressed LRU cache of rendered bytes (chart PNGs, report PDFs).
+    Entries beyond the memory budget spill to `<REPORT_CACHE_DIR>/<name>/`
+    and are promoted back on a hit; the spill directory is itself trimmed
+    (oldest first) to its own budget. Shared by threads of one process and,
+    through the spill directory, by the report_renderer worker processes.
+    """
+
+    def __init__(self, name, max_memory_mb=REPORT_CACHE_MEMORY_MB, max_disk_mb=REPORT_CACHE_DISK_MB,
+                 spill_dir=REPORT_CACHE_DIR):
+        self.max_memory = int(max_memory_mb * 1024 * 1024)
+        self.max_disk = int(max_disk_mb * 1024 * 1024)
+        self.spill_dir = os.path.join(spill_dir, name) if spill_dir else None
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'spilled': 0}
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"{key}.bin")
+
+    def get(self, key):
+        """Cached bytes for key, or None."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return data
+        data = self._read_spilled(key)
+        if data is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['disk_hits'] += 1
+        self.put(key, data)
+        return data
+
+    def put(self, key, data):
+        """Stores bytes under key, spilling least recently used entries past the memory budget."""
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_memory and len(self._entries) > 1:
+                old_key, old_data = self._entries.popitem(last=False)
+                self._size -= len(old_data)
+                evicted.append((old_key, old_data))
+        for old_key, old_data in evicted:
+            self._spill(old_key, old_data)
+
+    def get_or_render(self, key, render):
+        """Cached bytes for key, calling render() (and caching its bytes) on a miss."""
+        data = self.get(key)
+        if data is None:
+            data = render()
+            if data is not None:
+                self.put(key, data)
+        return data
+
+    def _read_spilled(self, key):
+        if not self.spill_dir:
+            return None
+        try:
+            with open(self._spill_path(key), 'rb') as f:
+                data = f.read()
+            os.utime(self._spill_path(key))  # LRU order on disk is by mtime
+            return data
+        except OSError:
+            return None
+
+    def _spill(self, key, data):
+        if not self.spill_dir or len(data) > self.max_disk:
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = self._spill_path(key)
+            if not os.path.isfile(path):
+                tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                self.stats['spilled'] += 1
+            self._trim_disk()
+        except OSError as e:
+            print(f"[CACHE ERROR] Could not spill {key}: {e}")
+
+    def _trim_disk(self):
+        files = []
+        for name in os.listdir(self.spill_dir):
+            if name.endswith('.bin'):
+                try:
+                    st = os.stat(os.path.join(self.spill_dir, name))
+                except OSError:
+                    continue  # removed by another process
+                files.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk:
+                break
+            try:
+                os.remove(os.path.join(self.spill_dir, name))
+            except OSError:
+                pass
+            total -= size
+
+    def memory_usage(self):
+        return self._size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+# Process-wide caches
+chart_cache = RenderCache('charts')
+report_cache = RenderCache('reports')
@@ -0,0 +1,137 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from reporting import render_investigation_report, render_investigation_body, render_digest_body, stamp_report
+from report_cache import report_cache, report_key, history_window
+
+def _render(result):
+    # Runs in a pool process; the body is stamped with the result's id and timestamp by the caller
+    if 'groups' in result:
+        return render_digest_body(result)
+    return render_investigation_body(result)
+
+def _stamped(body_future, result):
+    # Future of the result's own PDF, derived from the (shared) body future
+    future = Future()
+    def done(f):
+        if f.cancelled():
+            future.cancel()
+        elif f.exception() is not None:
+            future.set_exception(f.exception())
+        else:
+            future.set_result(stamp_report(f.result(), result))
+    body_future.add_done_callback(done)
+    return future
+
+def trim_history(investigation_result):
+    """
+    Copy of an investigation result whose history is cut to the volume's
+    last 24 hours (what the report uses), so only that part is
+    pickled to the pool. Digests don't chart history, so it is dropped.
+    """
+    result = dict(investigation_result)
+    if 'groups' in result:
+        result['groups'] = [
+            {**group, 'investigation': {k: v for k, v in group['investigation'].items() if k != 'history'}}
+            for group in result['groups']
+        ]
+        return result
+
+    history = result.get('history')
+    if history is not None and not history.empty:
+        result['history'] = history_window(history, result['volume'])
+    return result
+
+class ReportRenderer:
+    """
+    Renders investigation and digest PDFs in a pool of worker processes.
+    submit() returns a Future resolving to the PDF bytes, so an incident
+    storm is rendered on all cores without blocking the dashboard or the
+    alert delivery threads (fpdf and matplotlib are CPU bound and hold the GIL).
+    Rendered bodies go to report_cache, and a body that is already queued is
+    not rendered twice (retries, repeated clicks, email and Teams, repeat
+    investigations with the same findings); each caller's PDF is stamped
+    with its own id and timestamp.
+    """
+
+    def __init__(self, workers=None):
+        # spawn: the callers are multi-threaded, and forking a threaded process is unsafe
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, investigation_result):
+        """Queues one report (unless cached or already queued); returns a Future of its PDF bytes."""
+        key = report_key(investigation_result)
+        body = report_cache.get(key)
+        if body is not None:
+            future = Future()
+            future.set_result(stamp_report(body, investigation_result))
+            return future
+
+        with self._lock:
+            future = self._pending.get(key)
+            queued = future is None
+            if queued:
+                future = self._executor.submit(_render, trim_history(investigation_result))
+                self._pending[key] = future
+        if queued:
+            future.add_done_callback(lambda f: self._finish(key, f))
+        return _stamped(future, investigation_result)
+
+    def _finish(self, key, future):
+        if not future.cancelled() and future.exception() is None:
+            report_cache.put(key, future.result())
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def render_many(self, investigation_results):
+        """Renders a batch concurrently; returns the PDF bytes in input order."""
+        futures = [self.submit(result) for result in investigation_results]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+def get_renderer():
+    """Returns the process-wide renderer, starting its pool on first use."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            workers = os.getenv('REPORT_WORKERS')
+            _renderer = ReportRenderer(workers=int(workers) if workers else None)
+        return _renderer
+
+def render_report(investigation_result, timeout=None):
+    """Renders one investigation or digest report in the pool and returns the PDF bytes."""
+    return get_renderer().submit(investigation_result).result(timeout=timeout)
+
+if __name__ == "__main__":
+    # Serial vs pooled rendering of one report per volume
+    import time
+    from anomaly_detection import load_data, detect_anomalies
+    from investigation import run_investigation
+
+    df = detect_anomalies(load_data())
+    anomalies = df[df['Is_Anomaly']].groupby('Volume_Name', observed=True).tail(1)
+    results = [run_investigation(row['Volume_Name'], row, row['Severity'], history_df=df) for _, row in anomalies.iterrows()]
+    results = [r for r in results if r.get('status') == 'Completed']
+    warmup, results = results[:1], results[1:]
+    print(f"Rendering {len(results)} reports...")
+
+    start = time.perf_counter()
+    for result in results:
+        render_investigation_report(trim_history(result))
+    print(f"  serial: {time.perf_counter() - start:.2f}s")
+
+    renderer = ReportRenderer()
+    renderer.render_many(warmup)  # start the worker processes
+    start = time.perf_counter()
+    pdfs = renderer.render_many(results)
+    print(f"  pool ({renderer.workers} workers): {time.perf_counter() - start:.2f}s, {sum(map(len, pdfs)) / 1e6:.1f} MB of PDF")
+    renderer.shutdown()
@@ -1,7 +1,12 @@
 from fpdf import FPDF
 import pandas as pd
 import datetime
-import os
+import io
+import re
+import zlib
+from PIL import Image
+from report_cache import chart_cache, chart_key, STAMPED_FIELDS
+from fleet_metrics import FleetAnomalySummary
 
 class PDF(FPDF):
     def header(self):
@@ -15,10 +20,43 @@ class PDF(FPDF):
         self.set_font('Arial', 'I', 8)
         self.cell(0, 10, 'Page ' + str(self.page_no()) + '/{nb}', 0, 0, 'C')
 
-def generate_pdf_report(anomalies_df, filename="anomaly_report.pdf"):
+    def image_buffer(self, name, data, x=None, y=None, w=0, h=0):
+        """
+        image() for in-memory PNG bytes (fpdf 1.7 only reads images from
+        files). `name` just identifies the image within this PDF.
+        """
+        if name not in self.images:
+            rgb = Image.open(io.BytesIO(data)).convert('RGB')
+            width, height = rgb.size
+            self.images[name] = {
+                'i': len(self.images) + 1, 'w': width, 'h': height, 'cs': 'DeviceRGB', 'bpc': 8,
+                'f': 'FlateDecode', 'pal': '', 'trns': '', 'data': zlib.compress(rgb.tobytes())
+            }
+        self.image(name, x=x, y=y, w=w, h=h)
+
+def _stamp_placeholder(field):
+    return f"<{field}>".ljust(STAMPED_FIELDS[field], '#')
+
+def stamp_report(body, result):
+    """
+    Fills the id / timestamp placeholders of a rendered report body with the
+    result's own values. Values are padded or cut to the placeholder width,
+    so the PDF's byte offsets stay valid.
     """
-    Generates a PDF report for the detected anomalies.
+    for field, width in STAMPED_FIELDS.items():
+        # Parentheses and backslashes would need escaping (and change the length)
+        value = re.sub(r'[()\\]', '_', str(result.get(field, '')))[:width].ljust(width)
+        body = body.replace(_stamp_placeholder(field).encode('latin-1'), value.encode('latin-1', 'replace'))
+    return body
+
+def generate_pdf_report(anomalies_df, filename="anomaly_report.pdf", mode='detail'):
+    """
+    Generates a PDF report for the detected anomalies. mode='summary'
+    produces the aggregated fleet summary (see generate_fleet_summary_report),
+    which stays a few pages long for any number of anomalies.
     """
+    if mode == 'summary':
+        return generate_fleet_summary_report(anomalies_df, filename)
     pdf = PDF()
     pdf.alias_nb_pages()
     pdf.add_page()
@@ -57,11 +95,135 @@ def generate_pdf_report(anomalies_df, filename="anomaly_report.pdf"):
     pdf.output(filename, 'F')
     return filename
 
+def generate_fleet_summary_report(anomalies, filename="fleet_summary.pdf", top_n=50, bucket='1h'):
+    """
+    Generates the fleet-wide anomaly summary. `anomalies` is an anomaly
+    DataFrame or a FleetAnomalySummary that was fed chunk by chunk.
+    """
+    with open(filename, 'wb') as f:
+        f.write(render_fleet_summary_report(anomalies, top_n=top_n, bucket=bucket))
+    return filename
+
+def render_fleet_summary_report(anomalies, top_n=50, bucket='1h'):
+    """
+    Renders the fleet summary as PDF bytes: totals, severity per SVM, the
+    top_n worst volumes (table header repeated on every page) and a
+    volume x time heatmap. Page count depends on top_n, not on the number
+    of anomalies.
+    """
+    summary = anomalies if isinstance(anomalies, FleetAnomalySummary) else FleetAnomalySummary(bucket).add(anomalies)
+    volumes = summary.volumes()
+    top = volumes.head(top_n)
+
+    pdf = PDF()
+    pdf.alias_nb_pages()
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, 'Fleet Anomaly Summary', 0, 1, 'C')
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(0, 6, f'Generated on: {datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', 0, 1, 'C')
+    pdf.ln(5)
+
+    if volumes.empty:
+        pdf.cell(0, 10, 'No anomalies detected currently.', 0, 1)
+        return pdf.output(dest='S').encode('latin-1')
+
+    # --- Totals ---
+    pdf.set_fill_color(240, 240, 240)
+    first, last = volumes['First_Seen'].min(), volumes['Last_Seen'].max()
+    pdf.cell(0, 7, f"Anomalies: {summary.total}   |   Volumes affected: {len(volumes)}   |   "
+                   f"High: {int(volumes['High'].sum())}   Medium: {int(volumes['Medium'].sum())}   "
+                   f"Low: {int(volumes['Low'].sum())}", 0, 1, fill=True)
+    pdf.cell(0, 7, f"Window: {first:%Y-%m-%d %H:%M} - {last:%Y-%m-%d %H:%M}", 0, 1, fill=True)
+    pdf.ln(5)
+
+    # --- Severity by SVM ---
+    pdf.set_font('Arial', 'B', 12)
+    pdf.set_fill_color(200, 220, 255)
+    pdf.cell(0, 8, '  1. Severity by SVM', 0, 1, 'L', fill=True)
+    pdf.ln(2)
+    pdf.set_font('Arial', 'B', 9)
+    for label, width in [('SVM', 60), ('High', 25), ('Medium', 25), ('Low', 25), ('Total', 25)]:
+        pdf.cell(width, 7, label, 1, 0, 'L', fill=True)
+    pdf.ln()
+    pdf.set_font('Arial', '', 9)
+    for svm, row in summary.by_svm().iterrows():
+        pdf.cell(60, 6, str(svm), 1)
+        for level in ['High', 'Medium', 'Low', 'Total']:
+            pdf.cell(25, 6, str(int(row[level])), 1)
+        pdf.ln()
+    pdf.ln(6)
+
+    # --- Top-N volumes (paginated) ---
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(0, 8, f'  2. Top {len(top)} of {len(volumes)} Affected Volumes', 0, 1, 'L', fill=True)
+    pdf.ln(2)
+    columns = [('Volume', 35), ('SVM', 30), ('Total', 14), ('High', 13), ('Med', 13), ('Low', 13),
+               ('Max ms', 18), ('Mean ms', 18), ('Last Seen', 36)]
+
+    def table_header():
+        pdf.set_font('Arial', 'B', 8)
+        pdf.set_fill_color(200, 220, 255)
+        for label, width in columns:
+            pdf.cell(width, 7, label, 1, 0, 'L', fill=True)
+        pdf.ln()
+        pdf.set_font('Arial', '', 8)
+
+    table_header()
+    # Pre-formatted column-wise instead of per-row pandas access
+    cells = zip(
+        top['Volume'].astype(str), top['SVM'].astype(str), top['Anomalies'].astype(str),
+        top['High'].astype(str), top['Medium'].astype(str), top['Low'].astype(str),
+        top['Max_Latency_ms'].map('{:.1f}'.format), top['Mean_Latency_ms'].map('{:.1f}'.format),
+        top['Last_Seen'].dt.strftime('%Y-%m-%d %H:%M')
+    )
+    for row in cells:
+        if pdf.get_y() + 6 > pdf.page_break_trigger:
+            pdf.add_page()
+            table_header()
+        for (_, width), value in zip(columns, row):
+            pdf.cell(width, 6, value, 1)
+        pdf.ln()
+
+    # --- Heatmap ---
+    heatmap_png = render_anomaly_heatmap(summary.heatmap(top['Volume'].head(HEATMAP_MAX_VOLUMES)))
+    if heatmap_png:
+        pdf.add_page()
+        pdf.set_font('Arial', 'B', 12)
+        pdf.set_fill_color(200, 220, 255)
+        pdf.cell(0, 8, '  3. Anomaly Heatmap (Volume x Time)', 0, 1, 'L', fill=True)
+        pdf.ln(3)
+        pdf.image_buffer('heatmap.png', heatmap_png, x=10, w=190)
+        pdf.ln(3)
+        pdf.set_font('Arial', 'I', 9)
+        pdf.cell(0, 5, f'Figure 1: Anomalies per time bucket for the {min(len(top), HEATMAP_MAX_VOLUMES)} worst volumes.', 0, 1, 'C')
+
+    return pdf.output(dest='S').encode('latin-1')
+
 def generate_investigation_report(investigation_result, filename="investigation_report.pdf"):
     """
     Generates a detailed, manager-friendly PDF report from an AI investigation result.
     """
+    with open(filename, 'wb') as f:
+        f.write(render_investigation_report(investigation_result))
+    return filename
+
+def render_investigation_report(investigation_result):
+    """
+    Renders the investigation report and returns the PDF as bytes (no
+    output file is written).
+    """
+    return stamp_report(render_investigation_body(investigation_result), investigation_result)
+
+def render_investigation_body(investigation_result):
+    """
+    Renders the investigation report with placeholders for its id and
+    timestamp (see stamp_report()): the cacheable part, shared by results
+    with the same content (used by the report_renderer process pool).
+    """
     pdf = PDF()
+    # Uncompressed page streams, so the placeholders can be found in the bytes
+    pdf.set_compression(False)
     pdf.alias_nb_pages()
     pdf.add_page()
     
@@ -145,12 +307,12 @@ def generate_investigation_report(investigation_result, filename="investigation_
     pdf.set_font('Arial', 'B', 10)
     pdf.cell(30, 8, 'Investigation ID:', 0, 0)
     pdf.set_font('Arial', '', 10)
-    pdf.cell(60, 8, investigation_result['id'], 0, 0)
+    pdf.cell(60, 8, _stamp_placeholder('id'), 0, 0)
     
     pdf.set_font('Arial', 'B', 10)
     pdf.cell(25, 8, 'Date:', 0, 0)
     pdf.set_font('Arial', '', 10)
-    pdf.cell(60, 8, investigation_result['timestamp'], 0, 1)
+    pdf.cell(60, 8, _stamp_placeholder('timestamp'), 0, 1)
     
     pdf.set_x(10)
     pdf.set_font('Arial', 'B', 10)
@@ -281,26 +443,20 @@ def generate_investigation_report(investigation_result, filename="investigation_
         pdf.cell(0, 10, '  5. Performance Visual Evidence', 0, 1, 'L')
         pdf.ln(5)
         
-        # Generate graph image
-        graph_img_path = generate_performance_chart(
-            investigation_result['history'], 
-            investigation_result['volume'],
-            filename=f"trend_{investigation_result['id']}.png"
+        # Generate graph image (PNG bytes, never written to disk; reused while the history window is unchanged)
+        history, volume = investigation_result['history'], investigation_result['volume']
+        graph_png = chart_cache.get_or_render(
+            chart_key(history, volume),
+            lambda: render_performance_chart(history, volume)
         )
         
-        if graph_img_path:
+        if graph_png:
             # Embed image
             # Width = 170 (A4 width 210 - margins 20)
-            pdf.image(graph_img_path, x=15, w=180)
+            pdf.image_buffer("trend.png", graph_png, x=15, w=180)
             pdf.ln(5)
             pdf.set_font('Arial', 'I', 9)
             pdf.cell(0, 5, 'Figure 1: Actual Latency (blue) vs Historical Baseline (gray).', 0, 1, 'C')
-            
-            # Cleanup temporary graph image
-            try:
-                os.remove(graph_img_path)
-            except:
-                pass
     
     # --- Disclaimer ---
     pdf.ln(20)
@@ -308,18 +464,107 @@ def generate_investigation_report(investigation_result, filename="investigation_
     pdf.set_text_color(100, 100, 100)
     pdf.multi_cell(0, 4, "DISCLAIMER: This report was generated by an AI Proof-of-Concept system. The analysis is based on behavioral patterns and heuristic rules. No automated actions have been performed on the storage system. Please verify findings with standard NetApp tools.")
     
-    pdf.output(filename, 'F')
+    return pdf.output(dest='S').encode('latin-1')
+
+def generate_digest_report(digest, filename="incident_digest.pdf"):
+    """
+    Generates one PDF for a coalesced alert digest (see alert_aggregation.py):
+    a summary table of all incidents in the window followed by the findings
+    and recommendations of each.
+    """
+    with open(filename, 'wb') as f:
+        f.write(render_digest_report(digest))
     return filename
 
-import matplotlib.pyplot as plt
+def render_digest_report(digest):
+    """Renders the digest report and returns the PDF as bytes."""
+    return stamp_report(render_digest_body(digest), digest)
+
+def render_digest_body(digest):
+    """Renders the digest report with a placeholder for its id (see render_investigation_body())."""
+    pdf = PDF()
+    pdf.set_compression(False)
+    pdf.alias_nb_pages()
+    pdf.add_page()
+    
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, 'AI Incident Digest', 0, 1, 'C')
+    pdf.ln(5)
+    
+    # --- Digest Summary ---
+    pdf.set_font('Arial', '', 10)
+    pdf.set_fill_color(240, 240, 240)
+    pdf.cell(0, 7, f"Digest ID: {_stamp_placeholder('id')}", 0, 1, fill=True)
+    pdf.cell(0, 7, f"Window: {digest['window_start']} - {digest['window_end']}", 0, 1, fill=True)
+    pdf.cell(0, 7, f"Incidents: {len(digest['groups'])}   |   Highest Severity: {digest['severity']}   |   "
+                   f"Suppressed Repeats: {digest['suppressed']}", 0, 1, fill=True)
+    pdf.ln(5)
+    
+    # --- Incident Table ---
+    pdf.set_font('Arial', 'B', 9)
+    pdf.set_fill_color(200, 220, 255)
+    pdf.cell(35, 8, 'Volume', 1, 0, 'L', fill=True)
+    pdf.cell(30, 8, 'SVM', 1, 0, 'L', fill=True)
+    pdf.cell(35, 8, 'Pattern', 1, 0, 'L', fill=True)
+    pdf.cell(55, 8, 'Probable Cause', 1, 0, 'L', fill=True)
+    pdf.cell(15, 8, 'Events', 1, 0, 'L', fill=True)
+    pdf.cell(20, 8, 'Severity', 1, 1, 'L', fill=True)
+    
+    pdf.set_font('Arial', '', 8)
+    for group in digest['groups']:
+        pdf.cell(35, 7, str(group['volume']), 1)
+        pdf.cell(30, 7, str(group['svm']), 1)
+        pdf.cell(35, 7, str(group['pattern']), 1)
+        pdf.cell(55, 7, str(group['primary_cause']), 1)
+        pdf.cell(15, 7, str(group['count']), 1)
+        pdf.cell(20, 7, str(group['severity']), 1, 1)
+    pdf.ln(8)
+    
+    # --- Per-Incident Findings ---
+    for i, group in enumerate(digest['groups'], 1):
+        result = group['investigation']
+        if pdf.get_y() + 50 > pdf.page_break_trigger:
+            pdf.add_page()
+        pdf.set_font('Arial', 'B', 11)
+        pdf.cell(0, 8, f"  {i}. {group['volume']} - {group['pattern']}", 0, 1, 'L', fill=True)
+        pdf.set_font('Arial', '', 9)
+        pdf.cell(0, 5, f"First seen: {group['first_seen']}   Last seen: {group['last_seen']}   "
+                       f"Confidence: {result['findings']['confidence_score']}", 0, 1)
+        pdf.multi_cell(0, 5, result['findings']['reasoning'])
+        for action in result['recommendations']:
+            pdf.cell(10, 5, '-', 0, 0, 'R')
+            pdf.cell(0, 5, action, 0, 1)
+        pdf.ln(4)
+    
+    return pdf.output(dest='S').encode('latin-1')
+
+# Object-oriented Figure/Agg API: no pyplot global state, so charts can be
+# rendered from several threads or processes at once
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import matplotlib.dates as mdates
+import numpy as np
 
 def generate_performance_chart(history_df, volume_name, filename="chart.png"):
     """
     Generates a matplotlib chart of the performance trend and saves it as an image.
     """
+    png = render_performance_chart(history_df, volume_name)
+    if png is None:
+        return None
+    with open(filename, 'wb') as f:
+        f.write(png)
+    return filename
+
+def render_performance_chart(history_df, volume_name):
+    """
+    Renders the performance trend chart and returns it as PNG bytes
+    (None if it could not be drawn).
+    """
     try:
-        plt.figure(figsize=(10, 4))
+        fig = Figure(figsize=(10, 4))
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
         
         # Convert timestamps if needed
         if not pd.api.types.is_datetime64_any_dtype(history_df['Timestamp']):
@@ -338,18 +583,18 @@ def generate_performance_chart(history_df, volume_name, filename="chart.png"):
             vol_data = vol_data[vol_data['Timestamp'] >= start_window]
         
         # Plot Latency
-        plt.plot(vol_data['Timestamp'], vol_data['Latency_ms'], label='Actual Latency', color='#0066cc', linewidth=1.5)
+        ax.plot(vol_data['Timestamp'], vol_data['Latency_ms'], label='Actual Latency', color='#0066cc', linewidth=1.5)
         
         # Plot Baseline as a dashed line
         if 'Upper_Bound' in vol_data.columns:
-             plt.plot(vol_data['Timestamp'], vol_data['Upper_Bound'], label='Baseline (Upper Limit)', color='#999999', linestyle='--', linewidth=1)
+             ax.plot(vol_data['Timestamp'], vol_data['Upper_Bound'], label='Baseline (Upper Limit)', color='#999999', linestyle='--', linewidth=1)
         
         # Formatting
-        plt.title(f"Latency Trend - {volume_name} (Last 24 Hours)")
-        plt.ylabel("Latency (ms)")
-        plt.xlabel("Time")
-        plt.grid(True, linestyle=':', alpha=0.6)
-        plt.legend(loc='upper left', fontsize='small')
+        ax.set_title(f"Latency Trend - {volume_name} (Last 24 Hours)")
+        ax.set_ylabel("Latency (ms)")
+        ax.set_xlabel("Time")
+        ax.grid(True, linestyle=':', alpha=0.6)
+        ax.legend(loc='upper left', fontsize='small')
         
         # Date formatting on X axis - Dynamic based on range
         time_range = vol_data['Timestamp'].max() - vol_data['Timestamp'].min()
@@ -361,16 +606,54 @@ def generate_performance_chart(history_df, volume_name, filename="chart.png"):
         else:
             fmt = mdates.DateFormatter('%m-%d %H:%M')
             
-        plt.gca().xaxis.set_major_formatter(fmt)
-        plt.gcf().autofmt_xdate() # Rotation
+        ax.xaxis.set_major_formatter(fmt)
+        fig.autofmt_xdate() # Rotation
 
         
-        # Save
-        plt.tight_layout()
-        plt.savefig(filename, dpi=100)
-        plt.close()
+        # Save as an RGB PNG: fpdf unpacks an alpha channel byte by byte,
+        # which took longer than drawing the chart itself
+        fig.set_dpi(100)
+        fig.tight_layout()
+        canvas.draw()
+        buffer = io.BytesIO()
+        Image.fromarray(np.asarray(canvas.buffer_rgba())).convert('RGB').save(buffer, 'PNG')
         
-        return filename
+        return buffer.getvalue()
     except Exception as e:
         print(f"[GRAPH ERROR] Could not generate graph: {e}")
         return None
+
+# Rows shown in the fleet summary heatmap
+HEATMAP_MAX_VOLUMES = 40
+
+def render_anomaly_heatmap(grid):
+    """
+    Renders a volume x time-bucket anomaly count grid (see
+    FleetAnomalySummary.heatmap) as PNG bytes (None if there is nothing to draw).
+    """
+    if grid.empty:
+        return None
+    try:
+        fig = Figure(figsize=(10, 2 + 0.18 * len(grid)))
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        image = ax.imshow(grid.to_numpy(), aspect='auto', cmap='Reds', interpolation='nearest')
+        fig.colorbar(image, ax=ax, label='Anomalies', pad=0.01)
+
+        ax.set_yticks(range(len(grid)))
+        ax.set_yticklabels(grid.index, fontsize=7)
+        ticks = np.linspace(0, len(grid.columns) - 1, min(8, len(grid.columns))).astype(int)
+        ax.set_xticks(ticks)
+        ax.set_xticklabels([grid.columns[i].strftime('%m-%d %H:%M') for i in ticks], fontsize=7, rotation=30, ha='right')
+        width = grid.columns[1] - grid.columns[0] if len(grid.columns) > 1 else None
+        ax.set_xlabel(f"Time ({width / pd.Timedelta(hours=1):g}h buckets)" if width is not None else "Time")
+
+        fig.set_dpi(100)
+        fig.tight_layout()
+        canvas.draw()
+        buffer = io.BytesIO()
+        Image.fromarray(np.asarray(canvas.buffer_rgba())).convert('RGB').save(buffer, 'PNG')
+        return buffer.getvalue()
+    except Exception as e:
+        print(f"[GRAPH ERROR] Could not generate heatmap: {e}")
+        return None
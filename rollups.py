@@ -0,0 +1,238 @@
+import os
+import shutil
+import uuid
+import pandas as pd
+from telemetry_store import open_store, DATA_PATH, METRIC_COLUMNS
+from hot_cache import get_hot_cache
+
+# Rollup tiers (bucket width) and how long each one is kept
+TIERS = {
+    '1h': pd.Timedelta(hours=1),
+    '1d': pd.Timedelta(days=1)
+}
+RETENTION = {
+    '1h': pd.Timedelta(days=int(os.getenv('ROLLUP_HOURLY_RETENTION_DAYS', '90'))),
+    '1d': pd.Timedelta(days=int(os.getenv('ROLLUP_DAILY_RETENTION_DAYS', '1825')))
+}
+
+# Per-metric statistics; m2 (sum of squared deviations) lets buckets be merged exactly
+STATS = ['mean', 'm2', 'min', 'max', 'p95']
+ROLLUP_COLUMNS = ['Volume_Name', 'Timestamp', 'Count'] + [f"{m}_{s}" for m in METRIC_COLUMNS for s in STATS]
+
+def compute_rollup(df, tier):
+    """
+    Aggregates raw samples into `tier` buckets per volume. Timestamp is the
+    bucket start; columns are Count plus <metric>_mean/_m2/_min/_max/_p95.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    keys = [df['Volume_Name'], df['Timestamp'].dt.floor(TIERS[tier])]
+    grouped = df[METRIC_COLUMNS].astype('float64').groupby(keys, observed=True, sort=True)
+    agg = grouped.agg(['count', 'mean', 'var', 'min', 'max'])
+    p95 = grouped.quantile(0.95)
+
+    out = pd.DataFrame({'Count': agg[(METRIC_COLUMNS[0], 'count')]})
+    for metric in METRIC_COLUMNS:
+        count = agg[(metric, 'count')]
+        out[f"{metric}_mean"] = agg[(metric, 'mean')]
+        out[f"{metric}_m2"] = agg[(metric, 'var')].fillna(0) * (count - 1)
+        out[f"{metric}_min"] = agg[(metric, 'min')]
+        out[f"{metric}_max"] = agg[(metric, 'max')]
+        out[f"{metric}_p95"] = p95[metric]
+    out = out.reset_index()
+    out['Volume_Name'] = out['Volume_Name'].astype(str)
+    return out[ROLLUP_COLUMNS]
+
+def merge_rollups(a, b):
+    """
+    Combines two rollup tables of the same tier. Buckets present in both are
+    merged exactly for Count/mean/m2/min/max (Chan et al.); p95 cannot be
+    merged without the raw samples, so the larger of the two is kept (an
+    approximation that keeps spikes visible).
+    """
+    both = pd.concat([a, b], ignore_index=True)
+    keys = [both['Volume_Name'].astype(str), pd.to_datetime(both['Timestamp'])]
+    count = both['Count'].astype('float64')
+    total = count.groupby(keys).transform('sum')
+    grouped = both.groupby(keys)
+
+    out = pd.DataFrame({'Count': grouped['Count'].sum()})
+    for metric in METRIC_COLUMNS:
+        mean = both[f"{metric}_mean"]
+        grand_mean = (count * mean).groupby(keys).transform('sum') / total
+        m2 = both[f"{metric}_m2"] + count * (mean - grand_mean) ** 2
+        out[f"{metric}_mean"] = grand_mean.groupby(keys).first()
+        out[f"{metric}_m2"] = m2.groupby(keys).sum()
+        out[f"{metric}_min"] = grouped[f"{metric}_min"].min()
+        out[f"{metric}_max"] = grouped[f"{metric}_max"].max()
+        out[f"{metric}_p95"] = grouped[f"{metric}_p95"].max()
+    out.index.names = ['Volume_Name', 'Timestamp']
+    return out.reset_index()[ROLLUP_COLUMNS]
+
+class RollupStore:
+    """
+    Hourly and daily rollups of a telemetry store, kept as one small Parquet
+    file per tier and volume:
+
+        <name>_rollups/<tier>/<volume>.parquet      (CSV store)
+        <root>/_rollups/<tier>/<volume>.parquet     (Parquet store)
+
+    Writers call ingest() after appending raw rows: the rows are rolled up
+    on their own and merged into the buckets they touch, without reading the
+    raw store. After a range replacement refresh() recomputes the affected
+    buckets from the raw store (the hot cache when it reaches back far
+    enough). Rows older than the tier's retention
+    (relative to the volume's newest bucket) are dropped.
+    """
+
+    def __init__(self, path=DATA_PATH):
+        self.path = path
+        self.store = open_store(path)
+        if str(path).lower().endswith('.csv'):
+            self.root = os.path.splitext(path)[0] + '_rollups'
+        else:
+            self.root = os.path.join(path, '_rollups')
+
+    def _path(self, tier, vol_name):
+        return os.path.join(self.root, tier, f"{vol_name}.parquet")
+
+    def reset(self):
+        """Drops all rollups (e.g. before the raw store is rewritten)."""
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+
+    def ingest(self, df, complete=False):
+        """
+        Updates the rollups for freshly appended raw rows by merging their
+        buckets into the stored ones (merge_rollups), so the cost depends on
+        the appended rows, not on the history. With complete=True, df holds
+        every raw row of its volumes (e.g. a generated shard), so the tables
+        replace those volumes' rollups.
+        """
+        if df.empty:
+            return
+        tables = {tier: compute_rollup(df, tier) for tier in TIERS}
+        if complete:
+            self.replace_volumes(tables)
+            return
+        for tier, table in tables.items():
+            for vol_name, rows in table.groupby('Volume_Name', sort=False):
+                path = self._path(tier, vol_name)
+                if os.path.isfile(path):
+                    rows = merge_rollups(pd.read_parquet(path), rows)
+                self._write(tier, vol_name, rows)
+
+    def refresh(self, volumes, start, end=None):
+        """
+        Recomputes the buckets of `volumes` overlapping [start, end] (end=None
+        means open-ended) from the raw store, e.g. after replace_range().
+        """
+        volumes = [str(v) for v in volumes]
+        start = pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+
+        # One raw read covering the widest bucket of every tier
+        widest = max(TIERS.values())
+        raw_end = None if end is None else end.floor(widest) + widest - pd.Timedelta(1, 'ns')
+        raw = self._raw(volumes, start.floor(widest), raw_end)
+
+        for tier, width in TIERS.items():
+            first = start.floor(width)
+            last = None if end is None else end.floor(width)
+            table = compute_rollup(raw, tier)
+            in_range = table['Timestamp'] >= first
+            if last is not None:
+                in_range &= table['Timestamp'] <= last
+            self._upsert(tier, table[in_range], volumes, first, last)
+
+    def _raw(self, volumes, start, end):
+        # Recent replacements are covered by the hot cache; older ones read the store
+        cache = get_hot_cache(self.path)
+        frames = [cache.since(v, start) for v in volumes]
+        if any(f is None for f in frames):
+            return self.store.read(volumes=volumes, start=start, end=end)
+        raw = pd.concat(frames, ignore_index=True)
+        return raw if end is None else raw[raw['Timestamp'] <= end]
+
+    def replace_volumes(self, tables):
+        """Writes precomputed {tier: rollup table}, replacing those volumes' rollups."""
+        for tier, table in tables.items():
+            for vol_name, rows in table.groupby('Volume_Name', sort=False):
+                self._write(tier, vol_name, rows)
+
+    def _upsert(self, tier, table, volumes, first, last):
+        by_volume = dict(tuple(table.groupby('Volume_Name', sort=False)))
+        for vol_name in volumes:
+            rows = by_volume.get(vol_name, table.iloc[:0])
+            path = self._path(tier, vol_name)
+            if os.path.isfile(path):
+                existing = pd.read_parquet(path)
+                stale = existing['Timestamp'] >= first
+                if last is not None:
+                    stale &= existing['Timestamp'] <= last
+                kept = existing[~stale]
+                rows = pd.concat([kept, rows], ignore_index=True) if not rows.empty else kept
+            self._write(tier, vol_name, rows)
+
+    def _write(self, tier, vol_name, rows):
+        path = self._path(tier, vol_name)
+        rows = rows.sort_values('Timestamp')
+        if not rows.empty:
+            # Retention is relative to the newest bucket, so replayed or synthetic history is kept consistently
+            rows = rows[rows['Timestamp'] > rows['Timestamp'].max() - RETENTION[tier]]
+        if rows.empty:
+            if os.path.isfile(path):
+                os.remove(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        rows[ROLLUP_COLUMNS].to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def read(self, tier, volumes=None, start=None, end=None):
+        """Rollup rows of one tier, optionally limited to volumes and a time range."""
+        tier_dir = os.path.join(self.root, tier)
+        if volumes is None:
+            names = sorted(f[:-len('.parquet')] for f in os.listdir(tier_dir) if f.endswith('.parquet')) if os.path.isdir(tier_dir) else []
+        else:
+            names = [str(v) for v in volumes]
+        frames = [pd.read_parquet(self._path(tier, v)) for v in names if os.path.isfile(self._path(tier, v))]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=ROLLUP_COLUMNS)
+        df['Volume_Name'] = df['Volume_Name'].astype('category')
+        df['Timestamp'] = pd.to_datetime(df['Timestamp'])
+        if start is not None:
+            df = df[df['Timestamp'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['Timestamp'] <= pd.Timestamp(end)]
+        return df.reset_index(drop=True)
+
+    def tier_for(self, resolution, span=None):
+        """
+        Picks the coarsest tier whose buckets are no wider than `resolution`
+        and whose retention covers `span` (how far back the request goes).
+        If the fine enough tiers don't reach back far enough, the coarsest
+        tier that does is used. Returns None when only raw samples will do.
+        """
+        resolution = pd.Timedelta(resolution)
+        fine_enough = [t for t, width in TIERS.items() if width <= resolution]
+        if not fine_enough:
+            return None
+        if span is None:
+            return max(fine_enough, key=TIERS.get)
+        covering = [t for t in fine_enough if RETENTION[t] >= pd.Timedelta(span)]
+        if covering:
+            return max(covering, key=TIERS.get)
+        covering = [t for t in TIERS if RETENTION[t] >= pd.Timedelta(span)]
+        return max(covering, key=TIERS.get) if covering else max(TIERS, key=RETENTION.get)
+
+    def rebuild(self):
+        """Recomputes every tier from the full raw store."""
+        self.reset()
+        self.ingest(self.store.read(), complete=True)
+
+if __name__ == "__main__":
+    rollups = RollupStore()
+    print("Rebuilding rollups...")
+    rollups.rebuild()
+    for tier in TIERS:
+        print(f"  {tier}: {len(rollups.read(tier))} rows (retention {RETENTION[tier].days} days)")
@@ -0,0 +1,568 @@
+import os
+import json
+import shutil
+import uuid
+import time
+import numpy as np
+import pandas as pd
+
+# Location of the telemetry store. A '.csv' path keeps the legacy single-file
+# layout; any other path is treated as a partitioned Parquet directory.
+DATA_PATH = os.getenv('TELEMETRY_STORE', 'storage_data.csv')
+
+METRIC_COLUMNS = ['Latency_ms', 'IOPS', 'Throughput_MB']
+
+# The CSV store folds its tombstone log back into the file once it has this many entries
+CSV_COMPACT_TOMBSTONES = int(os.getenv('CSV_COMPACT_TOMBSTONES', '32'))
+# Rows parsed per chunk when the CSV store reads (bounds memory to the chunk plus the result)
+CSV_READ_CHUNK_ROWS = int(os.getenv('CSV_READ_CHUNK_ROWS', '250000'))
+COLUMNS = ['Volume_Name', 'Timestamp'] + METRIC_COLUMNS
+
+def apply_schema(df):
+    """
+    Casts telemetry to the compact typed schema:
+    category Volume_Name, datetime64 Timestamp, float32 metrics.
+    """
+    df['Volume_Name'] = df['Volume_Name'].astype('category')
+    if not pd.api.types.is_datetime64_any_dtype(df['Timestamp']):
+        df['Timestamp'] = pd.to_datetime(df['Timestamp'], format='ISO8601')
+    for col in METRIC_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('float32')
+    return df
+
+# Callbacks run after every write through a store (e.g. hot_cache keeping its rings current)
+_write_listeners = []
+
+def add_write_listener(listener):
+    """
+    Registers listener(path, op, df, vol_name=None, start=None, end=None),
+    called after every store write with op 'append', 'replace' or 'rewrite'.
+    """
+    _write_listeners.append(listener)
+
+def _notify_write(path, op, df, **kwargs):
+    for listener in _write_listeners:
+        listener(path, op, df, **kwargs)
+
+def open_store(path=DATA_PATH):
+    """
+    Returns the store implementation matching the path.
+    """
+    if str(path).lower().endswith('.csv'):
+        return CsvTelemetryStore(path)
+    return ParquetTelemetryStore(path)
+
+def _read_versions(path):
+    if not os.path.isfile(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def _bump_versions(path, volumes, reset=False):
+    """
+    Stamps the written volumes with a new version in the store's version file
+    (replaced atomically so readers never see a partial file).
+    """
+    versions = {} if reset else _read_versions(path)
+    stamp = time.time_ns()
+    for vol in volumes:
+        versions[str(vol)] = stamp
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(versions, f)
+    os.replace(tmp_path, path)
+
+def _latest_rows(df):
+    # Last sample per volume (ties keep the most recently written row)
+    latest = df.sort_values('Timestamp', kind='stable').groupby('Volume_Name', observed=True).tail(1)
+    return latest.sort_values('Volume_Name').reset_index(drop=True)
+
+def _read_snapshot(path):
+    if not os.path.isfile(path):
+        return None
+    return apply_schema(pd.read_parquet(path))
+
+def _write_snapshot(path, latest):
+    latest = latest[COLUMNS].astype({'Volume_Name': str})
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    latest.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def _update_snapshot(path, df, reset=False, drop=()):
+    """
+    Folds freshly written rows into the latest-row-per-volume snapshot, so the
+    fleet list never has to scan history. Volumes in `drop` are removed first.
+    """
+    current = None if reset else _read_snapshot(path)
+    parts = []
+    if current is not None:
+        parts.append(current[~current['Volume_Name'].isin(list(drop))].astype({'Volume_Name': str}))
+    parts.append(df[COLUMNS].astype({'Volume_Name': str}))
+    _write_snapshot(path, _latest_rows(apply_schema(pd.concat(parts, ignore_index=True))))
+
+def _snapshot_after_replace(store, vol_name, start, end, df):
+    """
+    Keeps the snapshot correct after replace_range(). Only when the volume's
+    latest row was replaced and no replacement row is newer than `start` does
+    the volume have to be re-read.
+    """
+    current = _read_snapshot(store.snapshot_path)
+    if current is None:
+        return
+    row = current[current['Volume_Name'] == vol_name]
+    latest_ts = row['Timestamp'].iloc[0] if not row.empty else None
+    replaced = latest_ts is not None and latest_ts >= pd.Timestamp(start) and (end is None or latest_ts <= pd.Timestamp(end))
+    if not replaced:
+        if not df.empty:
+            _update_snapshot(store.snapshot_path, df)
+    elif not df.empty and pd.to_datetime(df['Timestamp']).max() >= pd.Timestamp(start):
+        # Replacement rows are newer than every surviving row of the volume
+        _update_snapshot(store.snapshot_path, df, drop=[vol_name])
+    else:
+        _update_snapshot(store.snapshot_path, store.read(volumes=[vol_name]), drop=[vol_name])
+
+class CsvTelemetryStore:
+    """
+    Legacy single-file store. read() parses the file in chunks of
+    CSV_READ_CHUNK_ROWS rows and keeps only the requested volumes and time
+    range of each, so memory follows the result, but every read still scans
+    the whole file (the Parquet store prunes partitions instead).
+
+    Range replacements are not done by rewriting the file: they append a
+    tombstone (volume, time range, number of rows in the file at that point)
+    to a small sidecar log and append the replacement rows, so the write cost
+    is O(delta). read() hides rows covered by a tombstone; compact() folds the
+    log back into the file, automatically once it holds CSV_COMPACT_TOMBSTONES
+    entries. Each volume's rows come back in time order.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tombstone_path = os.path.splitext(path)[0] + '.tombstones.csv'
+        self.versions_path = os.path.splitext(path)[0] + '.versions.json'
+        self.rewrites_path = os.path.splitext(path)[0] + '.rewrites.json'
+        self.snapshot_path = os.path.splitext(path)[0] + '.latest.parquet'
+
+    def data_version(self, vol_name=None):
+        """
+        Version stamp of one volume's data (or of the whole store if vol_name
+        is None), bumped by every write through the store. Meant as a cache
+        key; volumes never written through the store report 0.
+        """
+        versions = _read_versions(self.versions_path)
+        if vol_name is None:
+            return max(versions.values(), default=0)
+        return versions.get(str(vol_name), 0)
+
+    def data_versions(self):
+        """Version stamp of every volume written through the store, as a dict."""
+        return _read_versions(self.versions_path)
+
+    def rewrite_version(self, vol_name):
+        """
+        Stamp of the last time one volume's existing rows were replaced
+        (replace_range() or rewrite()), 0 if never. Appends leave it alone, so
+        incremental consumers know when to rebuild instead of folding in.
+        """
+        return _read_versions(self.rewrites_path).get(str(vol_name), 0)
+
+    def latest(self, volumes=None):
+        """
+        Latest row per volume from the snapshot maintained by every write. A
+        file written before snapshots existed is parsed once to build it.
+        """
+        snapshot = _read_snapshot(self.snapshot_path)
+        if snapshot is None:
+            snapshot = _latest_rows(self.read())
+            _write_snapshot(self.snapshot_path, snapshot)
+        if volumes is not None:
+            snapshot = snapshot[snapshot['Volume_Name'].isin(volumes)].reset_index(drop=True)
+        return snapshot
+
+    def read(self, volumes=None, start=None, end=None):
+        tombstones = self._read_tombstones()
+        parts = []
+        with pd.read_csv(self.path, chunksize=CSV_READ_CHUNK_ROWS) as chunks:
+            for chunk in chunks:
+                # Filtering keeps the chunk's index: the file row numbers the tombstones refer to
+                if volumes is not None:
+                    chunk = chunk[chunk['Volume_Name'].isin(volumes)]
+                chunk['Timestamp'] = pd.to_datetime(chunk['Timestamp'], format='ISO8601')
+                chunk = _filter_time(chunk, start, end)
+                parts.append(self._apply_tombstones(chunk, tombstones))
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=COLUMNS)
+        return _time_ordered(apply_schema(df))
+
+    def _read_tombstones(self):
+        if not os.path.isfile(self.tombstone_path):
+            return None
+        return pd.read_csv(self.tombstone_path, parse_dates=['Start', 'End'])
+
+    def _apply_tombstones(self, df, tombstones):
+        # df's index holds the row numbers in the file
+        if tombstones is None or df.empty:
+            return df
+        # One (candidate row x tombstone) mask over the rows of tombstoned volumes only
+        candidates = np.flatnonzero(df['Volume_Name'].isin(tombstones['Volume_Name']).to_numpy())
+        volumes = df['Volume_Name'].to_numpy()[candidates, None]
+        timestamps = pd.to_datetime(df['Timestamp'].iloc[candidates], format='ISO8601').to_numpy()[:, None]
+        hit = (
+            # A tombstone only hides rows that were already in the file when it was written
+            (df.index.to_numpy()[candidates, None] < tombstones['Rows'].to_numpy())
+            & (volumes == tombstones['Volume_Name'].to_numpy())
+            & (timestamps >= tombstones['Start'].to_numpy())
+            & (timestamps <= tombstones['End'].fillna(pd.Timestamp.max).to_numpy())
+        )
+        deleted = np.zeros(len(df), dtype=bool)
+        deleted[candidates[hit.any(axis=1)]] = True
+        return df[~deleted]
+
+    def append(self, df):
+        """Appends rows to the end of the file."""
+        header = not os.path.isfile(self.path)
+        df[COLUMNS].to_csv(self.path, mode='a', header=header, index=False)
+        _bump_versions(self.versions_path, df['Volume_Name'].unique())
+        if header:
+            _update_snapshot(self.snapshot_path, df, reset=True)
+        elif os.path.isfile(self.snapshot_path):
+            _update_snapshot(self.snapshot_path, df)
+        _notify_write(self.path, 'append', df)
+
+    def replace_range(self, vol_name, start, end, df):
+        """
+        Replaces the rows of one volume with start <= Timestamp <= end (end=None
+        means open-ended) by df, writing only a tombstone and the new rows.
+        """
+        # Byte scan for the row count (no parsing); the tombstone covers rows up to here
+        with open(self.path, 'rb') as f:
+            rows = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b'')) - 1
+        tombstone = pd.DataFrame([{'Volume_Name': vol_name, 'Start': start, 'End': end, 'Rows': rows}])
+        tombstone.to_csv(self.tombstone_path, mode='a', header=not os.path.isfile(self.tombstone_path), index=False)
+        df[COLUMNS].to_csv(self.path, mode='a', header=False, index=False)
+        _bump_versions(self.rewrites_path, [vol_name])
+        _bump_versions(self.versions_path, [vol_name])
+        _snapshot_after_replace(self, vol_name, start, end, df)
+        _notify_write(self.path, 'replace', df, vol_name=vol_name, start=start, end=end)
+        if len(pd.read_csv(self.tombstone_path)) >= CSV_COMPACT_TOMBSTONES:
+            self.compact()
+
+    def rewrite(self, df):
+        """Replaces the whole file."""
+        df[COLUMNS].to_csv(self.path, index=False)
+        if os.path.isfile(self.tombstone_path):
+            os.remove(self.tombstone_path)
+        _bump_versions(self.rewrites_path, df['Volume_Name'].unique())
+        _bump_versions(self.versions_path, df['Volume_Name'].unique(), reset=True)
+        _update_snapshot(self.snapshot_path, df, reset=True)
+        _notify_write(self.path, 'rewrite', df)
+
+    def compact(self):
+        """
+        Folds pending tombstones into the file. What read() returns does not
+        change, so versions, the snapshot and caches are left alone.
+        """
+        if not os.path.isfile(self.tombstone_path):
+            return
+        df = self._apply_tombstones(pd.read_csv(self.path), self._read_tombstones())
+        tmp_path = f"{self.path}.{uuid.uuid4().hex[:8]}.tmp"
+        df[COLUMNS].to_csv(tmp_path, index=False)
+        # Tombstones first: a reader in between sees the replaced rows once more, never loses rows
+        os.remove(self.tombstone_path)
+        os.replace(tmp_path, self.path)
+
+class ParquetTelemetryStore:
+    """
+    Columnar store partitioned by volume and day:
+
+        <root>/Volume_Name=<vol>/day=<YYYY-MM-DD>/part-<id>.parquet
+
+    Writes only ever add new part files; reads prune partitions by volume and
+    day, push the Timestamp range down to the Parquet row groups and return
+    each volume's rows in time order, like the CSV file.
+
+    replace_range() swaps part files through a small journal in <root>/_journal:
+    a pending record lists the files it adds and removes, and renaming it to
+    committed is the single step that switches readers from the old files to
+    the new ones. Readers skip the added files of pending records and the
+    removed files of committed ones, so neither a concurrent read nor a crash
+    mid-replacement ever sees both.
+    """
+    # Pending records older than this belong to a crashed writer and are rolled back
+    JOURNAL_STALE_SECONDS = 3600
+
+    def __init__(self, root):
+        self.root = root
+        self.versions_path = os.path.join(root, '_versions.json')
+        self.rewrites_path = os.path.join(root, '_rewrites.json')
+        self.snapshot_path = os.path.join(root, '_latest.parquet')
+        self.journal_dir = os.path.join(root, '_journal')
+
+    def _partition_dir(self, vol, day):
+        return os.path.join(self.root, f"Volume_Name={vol}", f"day={day}")
+
+    def data_version(self, vol_name=None):
+        """
+        Version stamp of one volume's data (or of the whole store if vol_name
+        is None), bumped by every write through the store. Meant as a cache key.
+        """
+        versions = _read_versions(self.versions_path)
+        if vol_name is None:
+            return max(versions.values(), default=0)
+        return versions.get(str(vol_name), 0)
+
+    def data_versions(self):
+        """Version stamp of every volume written through the store, as a dict."""
+        return _read_versions(self.versions_path)
+
+    def rewrite_version(self, vol_name):
+        """
+        Stamp of the last time one volume's existing rows were replaced
+        (replace_range() or rewrite()), 0 if never. Appends leave it alone, so
+        incremental consumers know when to rebuild instead of folding in.
+        """
+        return _read_versions(self.rewrites_path).get(str(vol_name), 0)
+
+    def latest(self, volumes=None):
+        """
+        Latest row per volume from the snapshot maintained by every write. A
+        store written before snapshots existed builds it once from each
+        volume's newest day partition.
+        """
+        snapshot = _read_snapshot(self.snapshot_path)
+        if snapshot is None:
+            snapshot = self._scan_latest()
+            if not snapshot.empty:
+                _write_snapshot(self.snapshot_path, snapshot)
+        if volumes is not None:
+            snapshot = snapshot[snapshot['Volume_Name'].isin(volumes)].reset_index(drop=True)
+        return snapshot
+
+    def _journal_records(self):
+        # (path, state, record) of every journal entry
+        if not os.path.isdir(self.journal_dir):
+            return []
+        records = []
+        for name in sorted(os.listdir(self.journal_dir)):
+            state = name.rsplit('.', 2)[-2] if name.endswith('.json') else None
+            if state not in ('pending', 'committed'):
+                continue
+            path = os.path.join(self.journal_dir, name)
+            try:
+                with open(path) as f:
+                    records.append((path, state, json.load(f)))
+            except FileNotFoundError:
+                continue  # Finished by its writer meanwhile
+        return records
+
+    def _hidden_files(self):
+        """Part files readers must skip: not yet committed, or already replaced."""
+        hidden = set()
+        for _, state, record in self._journal_records():
+            hidden.update(record['add'] if state == 'pending' else record['remove'])
+        return {os.path.normpath(os.path.join(self.root, f)) for f in hidden}
+
+    def _finish_journal(self):
+        """Completes committed replacements and rolls back stale pending ones (crashed writers)."""
+        for path, state, record in self._journal_records():
+            try:
+                if state == 'pending' and time.time() - os.path.getmtime(path) < self.JOURNAL_STALE_SECONDS:
+                    continue
+                for f in record['remove' if state == 'committed' else 'add']:
+                    if os.path.isfile(os.path.join(self.root, f)):
+                        os.remove(os.path.join(self.root, f))
+                os.remove(path)
+            except FileNotFoundError:
+                continue  # Finished by its writer meanwhile
+
+    def _scan_latest(self):
+        files = []
+        hidden = self._hidden_files()
+        if os.path.isdir(self.root):
+            for vol_dir in sorted(os.listdir(self.root)):
+                if not vol_dir.startswith('Volume_Name='):
+                    continue
+                vol_path = os.path.join(self.root, vol_dir)
+                for day_dir in sorted(os.listdir(vol_path), reverse=True):
+                    day_path = os.path.join(vol_path, day_dir)
+                    parts = [os.path.join(day_path, f) for f in os.listdir(day_path) if f.endswith('.parquet')]
+                    parts = [f for f in parts if os.path.normpath(f) not in hidden]
+                    if parts:
+                        files.extend(parts)
+                        break
+        return _latest_rows(self._read_files(files))
+
+    def read(self, volumes=None, start=None, end=None):
+        try:
+            return self._read_files(self._list_files(volumes, start, end), start, end)
+        except FileNotFoundError:
+            # A replacement committed and removed its old files meanwhile: list again
+            return self._read_files(self._list_files(volumes, start, end), start, end)
+
+    def _list_files(self, volumes=None, start=None, end=None):
+        if not os.path.isdir(self.root):
+            return []
+
+        # Prune partition directories before touching any file
+        files = []
+        hidden = self._hidden_files()
+        for vol_dir in sorted(os.listdir(self.root)):
+            if not vol_dir.startswith('Volume_Name='):
+                continue
+            if volumes is not None and vol_dir.split('=', 1)[1] not in volumes:
+                continue
+            vol_path = os.path.join(self.root, vol_dir)
+            for day_dir in sorted(os.listdir(vol_path)):
+                day = day_dir.split('=', 1)[1]
+                if start is not None and day < pd.Timestamp(start).strftime('%Y-%m-%d'):
+                    continue
+                if end is not None and day > pd.Timestamp(end).strftime('%Y-%m-%d'):
+                    continue
+                day_path = os.path.join(vol_path, day_dir)
+                files.extend(
+                    path for path in (os.path.join(day_path, f) for f in sorted(os.listdir(day_path)) if f.endswith('.parquet'))
+                    if os.path.normpath(path) not in hidden
+                )
+        return files
+
+    def _read_files(self, files, start=None, end=None):
+        import pyarrow.dataset as ds
+
+        if not files:
+            return apply_schema(pd.DataFrame(columns=COLUMNS))
+        # Order by part id (write time) so the result reads like an append-only log
+        files.sort(key=lambda f: (os.path.basename(f), f))
+
+        dataset = ds.dataset(files, format='parquet', partitioning='hive', partition_base_dir=self.root)
+        predicate = None
+        if start is not None:
+            predicate = ds.field('Timestamp') >= pd.Timestamp(start)
+        if end is not None:
+            upper = ds.field('Timestamp') <= pd.Timestamp(end)
+            predicate = upper if predicate is None else predicate & upper
+        table = dataset.to_table(columns=COLUMNS, filter=predicate)
+
+        return _time_ordered(apply_schema(table.to_pandas()))
+
+    def append(self, df):
+        """Writes new rows as fresh part files; existing files are never modified."""
+        is_new = not os.path.isdir(self.root)
+        self._write_parts(df)
+        if is_new:
+            _update_snapshot(self.snapshot_path, df, reset=True)
+        elif os.path.isfile(self.snapshot_path):
+            _update_snapshot(self.snapshot_path, df)
+        _notify_write(self.root, 'append', df)
+
+    def _write_parts(self, df, part_id=None, bump=True):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        part_id = part_id or f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        timestamps = pd.to_datetime(df['Timestamp'])
+        # Convert once to Arrow and slice per partition (cheap) instead of per-partition pandas writes
+        table = pa.Table.from_pandas(pd.DataFrame({
+            'Timestamp': timestamps.to_numpy(dtype='datetime64[ns]'),
+            **{col: df[col].to_numpy(dtype='float32') for col in METRIC_COLUMNS}
+        }), preserve_index=False)
+        partitions = pd.Series(range(len(df))).groupby(
+            [df['Volume_Name'].astype(str).to_numpy(), timestamps.dt.strftime('%Y-%m-%d').to_numpy()], sort=False
+        ).indices
+        for (vol, day), rows in partitions.items():
+            out_dir = self._partition_dir(vol, day)
+            os.makedirs(out_dir, exist_ok=True)
+            pq.write_table(table.take(rows), os.path.join(out_dir, part_id))
+        if bump:
+            _bump_versions(self.versions_path, {vol for vol, _ in partitions})
+
+    def replace_range(self, vol_name, start, end, df):
+        """
+        Replaces the rows of one volume with start <= Timestamp <= end (end=None
+        means open-ended) by df. Only the touched day partitions of that volume
+        are rewritten; the new part files replace the old ones in one journal
+        commit.
+        """
+        self._finish_journal()
+        start = pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+        vol_path = os.path.join(self.root, f"Volume_Name={vol_name}")
+        first_day = start.strftime('%Y-%m-%d')
+        last_day = None if end is None else end.strftime('%Y-%m-%d')
+
+        touched = []
+        if os.path.isdir(vol_path):
+            for day_dir in sorted(os.listdir(vol_path)):
+                day = day_dir.split('=', 1)[1]
+                if day >= first_day and (last_day is None or day <= last_day):
+                    touched.append(day)
+
+        # Surviving rows of the touched partitions + replacement rows
+        kept = self.read(volumes=[vol_name], start=first_day) if touched else pd.DataFrame(columns=COLUMNS)
+        if touched:
+            kept = kept[kept['Timestamp'].dt.strftime('%Y-%m-%d').isin(touched)]
+            in_range = kept['Timestamp'] >= start
+            if end is not None:
+                in_range &= kept['Timestamp'] <= end
+            kept = kept[~in_range]
+        hidden = self._hidden_files()
+        old_files = [
+            path
+            for day in touched
+            for path in (os.path.join(vol_path, f"day={day}", f) for f in os.listdir(os.path.join(vol_path, f"day={day}")))
+            if path.endswith('.parquet') and os.path.normpath(path) not in hidden
+        ]
+
+        new_rows = pd.concat([kept.astype({'Volume_Name': str}), df[COLUMNS]], ignore_index=True)
+        new_rows['Volume_Name'] = vol_name
+        part_id = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        new_days = pd.to_datetime(new_rows['Timestamp']).dt.strftime('%Y-%m-%d').unique()
+        record = {
+            'add': [os.path.relpath(os.path.join(self._partition_dir(vol_name, day), part_id), self.root) for day in new_days],
+            'remove': [os.path.relpath(path, self.root) for path in old_files]
+        }
+        os.makedirs(self.journal_dir, exist_ok=True)
+        txn = os.path.join(self.journal_dir, part_id[:-len('.parquet')])
+        tmp_path = f"{txn}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, f"{txn}.pending.json")
+        if not new_rows.empty:
+            self._write_parts(new_rows, part_id, bump=False)
+        # The switch: readers now skip the old files instead of the new ones
+        os.replace(f"{txn}.pending.json", f"{txn}.committed.json")
+        for path in old_files:
+            os.remove(path)
+        os.remove(f"{txn}.committed.json")
+        _bump_versions(self.rewrites_path, [vol_name])
+        _bump_versions(self.versions_path, [vol_name])
+        _snapshot_after_replace(self, vol_name, start, end, df)
+        _notify_write(self.root, 'replace', df, vol_name=vol_name, start=start, end=end)
+
+    def rewrite(self, df):
+        """Replaces the whole store."""
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+        _bump_versions(self.rewrites_path, df['Volume_Name'].unique())
+        self._write_parts(df)
+        _update_snapshot(self.snapshot_path, df, reset=True)
+        _notify_write(self.root, 'rewrite', df)
+
+def _time_ordered(df):
+    # Each volume's rows in time order: replaced or late rows are moved into
+    # place, so a volume's newer appends still come last (BaselineState.sync)
+    codes = df['Volume_Name'].cat.codes.to_numpy()
+    timestamps = df['Timestamp'].to_numpy().view('int64')
+    by_volume = np.argsort(codes, kind='stable')
+    same_volume = codes[by_volume][1:] == codes[by_volume][:-1]
+    if (same_volume & (np.diff(timestamps[by_volume]) < 0)).any():
+        df = df.iloc[np.lexsort((timestamps, codes))].reset_index(drop=True)
+    return df
+
+def _filter_time(df, start, end):
+    if start is not None:
+        df = df[df['Timestamp'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['Timestamp'] <= pd.Timestamp(end)]
+    return df
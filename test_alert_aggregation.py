@@ -0,0 +1,65 @@
+import datetime
+import threading
+
+from alert_aggregation import AlertAggregator
+
+def make_result(volume, pattern='Spike', severity='High', status='Completed'):
+    return {
+        'id': f"INV-{volume}", 'volume': volume, 'svm': 'DATA_SVM', 'severity': severity, 'status': status,
+        'analysis': {'behavior_pattern': pattern}, 'findings': {'primary_cause': 'Backend Contention'}
+    }
+
+def make_aggregator(**kwargs):
+    digests = []
+    # Long window: the tests flush by hand instead of waiting for the timer
+    aggregator = AlertAggregator(on_digest=digests.append, window_seconds=kwargs.pop('window_seconds', 3600), **kwargs)
+    return aggregator, digests
+
+def test_window_coalesces_groups_into_one_digest():
+    aggregator, digests = make_aggregator()
+    now = datetime.datetime.now()
+    assert aggregator.submit(make_result('vol_a', severity='Medium'), now=now)
+    assert aggregator.submit(make_result('vol_b'), now=now + datetime.timedelta(seconds=5))
+    assert aggregator.submit(make_result('vol_a'), now=now + datetime.timedelta(seconds=10))
+    assert not aggregator.submit(make_result('vol_c', status='Running'), now=now)
+    digest = aggregator.flush()
+
+    assert digests == [digest]
+    assert digest['id'].startswith('DIGEST-') and digest['severity'] == 'High'
+    assert [(g['volume'], g['count'], g['severity']) for g in digest['groups']] == [('vol_a', 2, 'High'), ('vol_b', 1, 'High')]
+    assert digest['window_start'] == now.strftime('%Y-%m-%d %H:%M:%S')
+    assert aggregator.flush() is None
+
+def test_single_event_passes_through_with_its_own_report():
+    aggregator, digests = make_aggregator()
+    result = make_result('vol_a')
+    aggregator.submit(result)
+    assert aggregator.flush() is result
+
+def test_repeats_are_suppressed_until_the_incident_goes_quiet():
+    aggregator, digests = make_aggregator(incident_timeout=1800)
+    now = datetime.datetime.now()
+    aggregator.submit(make_result('vol_a'), now=now)
+    aggregator.flush()
+
+    # Still ongoing: each repeat extends the incident
+    for minutes in [10, 35, 60]:
+        assert not aggregator.submit(make_result('vol_a'), now=now + datetime.timedelta(minutes=minutes))
+    # Another pattern on the same volume is a different incident
+    assert aggregator.submit(make_result('vol_a', pattern='Sustained'), now=now + datetime.timedelta(minutes=61))
+    assert aggregator.submit(make_result('vol_b'), now=now + datetime.timedelta(minutes=61))
+    digest = aggregator.flush()
+    assert digest['suppressed'] == 3
+    assert aggregator.stats == {'submitted': 6, 'suppressed': 3, 'digests': 2}
+
+    # Quiet for longer than the timeout: alerted again
+    assert aggregator.submit(make_result('vol_b'), now=now + datetime.timedelta(minutes=61 + 31))
+
+def test_window_timer_flushes():
+    done = threading.Event()
+    digests = []
+    aggregator = AlertAggregator(on_digest=lambda d: (digests.append(d), done.set()), window_seconds=0.05)
+    aggregator.submit(make_result('vol_a'))
+    aggregator.submit(make_result('vol_b'))
+    assert done.wait(5)
+    assert len(digests[0]['groups']) == 2
@@ -0,0 +1,153 @@
+import base64
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+import alerting
+import alert_delivery
+from alert_delivery import AlertDispatcher, SMTPConnectionPool, retry_with_backoff
+
+RESULT = {
+    'id': 'inv-0001',
+    'severity': 'High',
+    'volume': 'vol_a',
+    'findings': {'primary_cause': 'Backend Contention', 'confidence_score': 'High', 'reasoning': 'Latency spike'},
+    'analysis': {'behavior_pattern': 'Spike', 'description': 'Latency above the hourly baseline'}
+}
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    # Just enough ESMTP for smtplib; DATA is refused with 451 while fail_data > 0.
+    # With auth_token set, AUTH XOAUTH2 is advertised and only that bearer token accepted.
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 stub ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().split(' ', 1)[0].upper()
+            if command == 'EHLO' and server.auth_token:
+                self.reply('250-stub')
+                self.reply('250 AUTH XOAUTH2')
+            elif command == 'AUTH':
+                auth = base64.b64decode(line.split()[-1]).decode()
+                server.auths.append(auth.split('auth=Bearer ', 1)[-1].rstrip('\1'))
+                self.reply('235 Accepted' if server.auths[-1] == server.auth_token else '535 Rejected')
+            elif command in ('EHLO', 'HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                while (line := self.rfile.readline()) not in (b'.\r\n', b''):
+                    data.append(line)
+                if server.fail_data:
+                    server.fail_data -= 1
+                    self.reply('451 Try again later')
+                else:
+                    server.messages.append(b''.join(data))
+                    self.reply('250 Queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Not implemented')
+
+class SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+class TeamsHandler(BaseHTTPRequestHandler):
+    # Webhook stub: answers with the next scripted status (200 once the script runs out)
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers['Content-Length']))
+        server.posts += 1
+        server.clients.add(self.client_address)
+        status = server.statuses.pop(0) if server.statuses else 200
+        body = b'ok' if status == 200 else b'busy'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    server = SMTPServer(('127.0.0.1', 0), SMTPHandler)
+    server.connections, server.messages, server.fail_data = 0, [], 0
+    server.auth_token, server.auths = None, []
+    monkeypatch.setattr(alerting, 'SMTP_HOST', '127.0.0.1')
+    monkeypatch.setattr(alerting, 'SMTP_PORT', server.server_address[1])
+    monkeypatch.setattr(alerting, 'SMTP_SECURITY', 'none')
+    yield serve(server)
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def teams_server(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), TeamsHandler)
+    server.posts, server.clients, server.statuses = 0, set(), []
+    monkeypatch.setenv('TEAMS_WEBHOOK_URL', f"http://127.0.0.1:{server.server_address[1]}/webhook")
+    yield serve(server)
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    # Delivery is under test, not rendering: skip the report_renderer process pool
+    monkeypatch.setattr(alert_delivery, 'render_report', lambda result: b'%PDF-1.3 stub')
+    dispatcher = AlertDispatcher(workers=1, attempts=3, base_delay=0.01)
+    yield dispatcher
+    dispatcher.shutdown()
+
+def test_smtp_pool_reuses_connections(smtp_server):
+    pool = SMTPConnectionPool(max_size=1)
+    for _ in range(3):
+        pool.send_message(alerting.build_email_message(RESULT))
+    pool.close()
+    assert len(smtp_server.messages) == 3
+    assert smtp_server.connections == 1
+
+def test_dispatcher_delivers_over_pooled_smtp_and_keepalive_http(smtp_server, teams_server, dispatcher):
+    futures = [dispatcher.enqueue(RESULT, {'enable_email': True, 'enable_teams': True}) for _ in range(3)]
+    assert [f.result(timeout=30) for f in futures] == [['Email', 'Teams']] * 3
+    assert len(smtp_server.messages) == 3 and smtp_server.connections == 1
+    assert teams_server.posts == 3 and len(teams_server.clients) == 1
+    assert b'AI_Investigation_inv-0001.pdf' in smtp_server.messages[0]
+
+def test_dispatcher_retries_transient_failures(smtp_server, teams_server, dispatcher):
+    smtp_server.fail_data = 2
+    teams_server.statuses = [503]
+    actions = dispatcher.enqueue(RESULT, {'enable_email': True, 'enable_teams': True}).result(timeout=30)
+    assert actions == ['Email', 'Teams']
+    # A failed send drops its connection; the retry opens a new one
+    assert len(smtp_server.messages) == 1 and smtp_server.connections == 3
+    assert teams_server.posts == 2
+
+def test_dispatcher_gives_up_after_retry_limit(smtp_server, teams_server, dispatcher):
+    smtp_server.fail_data = 5
+    teams_server.statuses = [503] * 5
+    actions = dispatcher.enqueue(RESULT, {'enable_email': True, 'enable_teams': True}).result(timeout=30)
+    assert actions == []
+    assert smtp_server.messages == [] and smtp_server.fail_data == 2
+    assert teams_server.posts == 3
+
+def test_retry_with_backoff_doubles_the_delay(monkeypatch):
+    delays = []
+    monkeypatch.setattr(alert_delivery.time, 'sleep', delays.append)
+    assert not retry_with_backoff(lambda: False, attempts=4, base_delay=0.5)
+    assert len(delays) == 3
+    for attempt, delay in enumerate(delays):
+        assert 0.5 * 2 ** attempt <= delay <= 0.75 * 2 ** attempt
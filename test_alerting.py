@@ -0,0 +1,74 @@
+import threading
+import time
+import datetime
+
+import alerting
+from alerting import AccessTokenCache
+from alert_delivery import AlertDispatcher
+from test_alert_delivery import RESULT, smtp_server, dispatcher
+
+def expiring_in(seconds):
+    # google-auth style naive UTC expiry
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) + datetime.timedelta(seconds=seconds)
+
+def test_token_cache_refreshes_only_near_expiry():
+    cache = AccessTokenCache(refresh_margin=300)
+    issued = []
+    def refresh(lifetime):
+        issued.append(f"token-{len(issued)}")
+        return issued[-1], expiring_in(lifetime)
+
+    assert [cache.get(lambda: refresh(3600)) for _ in range(3)] == ['token-0'] * 3
+    cache.invalidate()
+    # Within the refresh margin of its expiry a token is never handed out
+    assert [cache.get(lambda: refresh(200)) for _ in range(2)] == ['token-1', 'token-2']
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['refreshes']) == (2, 3, 3)
+
+def test_token_cache_refreshes_once_for_concurrent_senders():
+    cache = AccessTokenCache()
+    calls = []
+    def refresh():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'token', expiring_in(3600)
+
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(cache.get(refresh))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert tokens == ['token'] * 8
+    assert len(calls) == 1
+
+def oauth_configured(monkeypatch, tokens):
+    # Gmail OAuth settings pointing at the stub; each refresh hands out the next token
+    for name in ['GMAIL_CLIENT_ID', 'GMAIL_CLIENT_SECRET', 'GMAIL_REFRESH_TOKEN']:
+        monkeypatch.setattr(alerting, name, 'test')
+    monkeypatch.setattr(alerting, 'GMAIL_APP_PASSWORD', '')
+    monkeypatch.setattr(alerting, '_token_cache', AccessTokenCache())
+    refreshes = []
+    def refresh():
+        refreshes.append(tokens[len(refreshes)])
+        return refreshes[-1], expiring_in(3600)
+    monkeypatch.setattr(alerting, '_refresh_gmail_access_token', refresh)
+    return refreshes
+
+def test_dispatcher_retries_reuse_the_cached_token(smtp_server, dispatcher, monkeypatch):
+    refreshes = oauth_configured(monkeypatch, ['token-0'])
+    smtp_server.auth_token = 'token-0'
+    smtp_server.fail_data = 2
+    futures = [dispatcher.enqueue(RESULT, {'enable_email': True}) for _ in range(2)]
+    assert [f.result(timeout=30) for f in futures] == [['Email'], ['Email']]
+    # Every failed send reconnects and authenticates again, all with the one token
+    assert smtp_server.connections == 3
+    assert smtp_server.auths == ['token-0'] * 3
+    assert refreshes == ['token-0']
+
+def test_dispatcher_retry_refreshes_a_rejected_token(smtp_server, dispatcher, monkeypatch):
+    refreshes = oauth_configured(monkeypatch, ['revoked', 'token-1'])
+    smtp_server.auth_token = 'token-1'
+    assert dispatcher.enqueue(RESULT, {'enable_email': True}).result(timeout=30) == ['Email']
+    assert smtp_server.auths == ['revoked', 'token-1']
+    assert refreshes == ['revoked', 'token-1']
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from telemetry_store import open_store
+from anomaly_detection import load_data, detect_anomalies, calculate_baseline, BaselineState, EwmaBaselineState, FleetCheckpoint
+
+def make_telemetry(vol_name, start, periods, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Volume_Name': vol_name,
+        'Timestamp': pd.date_range(start, periods=periods, freq='5min'),
+        'Latency_ms': rng.normal(2.0, 0.3, periods),
+        'IOPS': rng.normal(1000, 50, periods),
+        'Throughput_MB': rng.normal(40, 5, periods)
+    })
+
+def score_like_app(data_path, vol_name):
+    # The app's stateful path: a freshly started server loads the fleet checkpoint, then scores the volume
+    return FleetCheckpoint(data_path).load().detect(vol_name, load_data(data_path, volumes=[vol_name]))
+
+def test_stateful_scoring_produces_iops_z(tmp_path):
+    data_path = str(tmp_path / 'storage_data.csv')
+    store = open_store(data_path)
+    store.append(make_telemetry('vol_a', '2026-01-01', 2 * 288))
+    store.append(make_telemetry('vol_b', '2026-01-01', 2 * 288, seed=2))
+
+    scored = score_like_app(data_path, 'vol_a')
+    for z_col in ['Latency_Z', 'IOPS_Z', 'Throughput_Z']:
+        assert z_col in scored.columns
+        assert scored[z_col].notna().all()
+
+    # Restored from the checkpoint, only the appended rows are folded in
+    store.append(make_telemetry('vol_a', '2026-01-03', 288, seed=1))
+    scored = score_like_app(data_path, 'vol_a')
+    fresh = detect_anomalies(load_data(data_path, volumes=['vol_a']), baseline_state=EwmaBaselineState())
+    assert len(scored) == 3 * 288
+    np.testing.assert_allclose(scored['IOPS_Z'], fresh['IOPS_Z'], rtol=1e-5)
+
+def test_fleet_checkpoint_refreshes_only_changed_volumes(tmp_path):
+    data_path = str(tmp_path / 'storage_data.csv')
+    store = open_store(data_path)
+    store.append(make_telemetry('vol_a', '2026-01-01', 288))
+    store.append(make_telemetry('vol_b', '2026-01-01', 288, seed=1))
+    checkpoint = FleetCheckpoint(data_path)
+    for vol in ['vol_a', 'vol_b']:
+        checkpoint.refresh(vol)
+    assert checkpoint.stale_volumes() == []
+
+    store.append(make_telemetry('vol_b', '2026-01-02', 12, seed=2))
+    restored = FleetCheckpoint(data_path).load()
+    assert restored.stale_volumes() == ['vol_b']
+    expected = EwmaBaselineState().sync(load_data(data_path, volumes=['vol_b'])).to_frame()
+    pd.testing.assert_frame_equal(restored.baseline(['vol_b']), expected, check_categorical=False)
+    assert restored.stale_volumes() == []
+
+def test_ewma_baseline_without_decay_matches_batch_baseline(tmp_path):
+    df = pd.concat([make_telemetry('vol_a', '2026-01-01', 288), make_telemetry('vol_b', '2026-01-01', 288, seed=1)])
+    df['Hour'] = df['Timestamp'].dt.hour
+    expected = calculate_baseline(df).sort_values(['Volume_Name', 'Hour'], ignore_index=True)
+    state = EwmaBaselineState(half_life=pd.Timedelta(days=100000)).sync(df)
+    state.save(tmp_path / 'state.npz')
+    actual = EwmaBaselineState.load(tmp_path / 'state.npz').to_frame().sort_values(['Volume_Name', 'Hour'], ignore_index=True)
+    assert list(actual.columns) == list(expected.columns)
+    np.testing.assert_allclose(actual.iloc[:, 2:].to_numpy(float), expected.iloc[:, 2:].to_numpy(float), rtol=1e-4)
+
+def assert_matches_batch_baseline(state, df):
+    expected = calculate_baseline(df).sort_values(['Volume_Name', 'Hour'], ignore_index=True)
+    actual = state.to_frame().sort_values(['Volume_Name', 'Hour'], ignore_index=True)
+    np.testing.assert_allclose(actual.iloc[:, 2:].to_numpy(float), expected.iloc[:, 2:].to_numpy(float), rtol=1e-9)
+
+def test_sync_folds_late_appends_that_land_mid_frame():
+    def read(frames):
+        # Like a read of a store partitioned by volume: ordered per volume, not by append
+        df = pd.concat(frames).sort_values(['Volume_Name', 'Timestamp'], ignore_index=True)
+        return df.assign(Hour=df['Timestamp'].dt.hour)
+
+    frames = [make_telemetry('vol_a', '2026-01-01', 288), make_telemetry('vol_b', '2026-01-01', 288, seed=1)]
+    state = BaselineState().sync(read(frames))
+
+    late = make_telemetry('vol_a', '2026-01-02', 24, seed=2)
+    late['Latency_ms'] = 25.0
+    df = read(frames + [late])
+    assert (df['Volume_Name'].iloc[288:312] == 'vol_a').all()
+    assert_matches_batch_baseline(state.sync(df), df)
+
+    # Same length, rewritten values: rebuilt rather than missed
+    df.loc[df.index[:10], 'Latency_ms'] = 50.0
+    assert_matches_batch_baseline(state.sync(df), df)
+
+    # A row inside the range already seen: rebuilt as well
+    df = read([df.drop(columns='Hour'), make_telemetry('vol_b', '2026-01-01 00:02', 1, seed=3)])
+    assert_matches_batch_baseline(state.sync(df), df)
+
+def test_fleet_checkpoint_rebuilds_after_replace_range(tmp_path):
+    data_path = str(tmp_path / 'storage_data.csv')
+    store = open_store(data_path)
+    store.append(make_telemetry('vol_a', '2026-01-01', 2 * 288))
+    FleetCheckpoint(data_path).refresh('vol_a')
+
+    # Like inject_normal_data: the last hour replaced by (different) normal rows
+    replacement = make_telemetry('vol_a', '2026-01-02 23:00', 12, seed=5)
+    store.replace_range('vol_a', '2026-01-02 23:00', None, replacement)
+    restored = FleetCheckpoint(data_path).load()
+    assert restored.stale_volumes() == ['vol_a']
+    expected = EwmaBaselineState().sync(load_data(data_path, volumes=['vol_a'])).to_frame()
+    pd.testing.assert_frame_equal(restored.baseline(['vol_a']), expected, check_categorical=False)
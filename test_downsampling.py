@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from downsampling import lttb_indices, minmax_indices, build_pyramid, chart_series, rollup_series, PYRAMID_LEVELS, MAX_POINTS
+from test_anomaly_detection import make_telemetry
+
+def test_lttb_keeps_size_endpoints_and_order():
+    x = np.arange(10000, dtype='float64')
+    y = np.sin(x / 300)
+    y[4321] = 50.0
+    indices = lttb_indices(x, y, 500)
+    assert len(indices) == 500
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert (np.diff(indices) > 0).all()
+    assert 4321 in indices
+    # Nothing to reduce
+    assert lttb_indices(x[:100], y[:100], 500).tolist() == list(range(100))
+
+def test_minmax_keeps_every_bucket_extreme():
+    timestamps = pd.date_range('2026-01-01', periods=288, freq='5min')
+    values = np.random.default_rng(0).normal(2.0, 0.3, 288)
+    values[100] = 40.0
+    indices = minmax_indices(timestamps, values, '1h')
+    assert len(indices) <= 2 * 24
+    assert (np.diff(indices) > 0).all()
+    buckets = pd.Series(values).groupby(timestamps.floor('1h'))
+    kept = pd.Series(values[indices]).groupby(timestamps[indices].floor('1h'))
+    pd.testing.assert_series_equal(kept.max(), buckets.max())
+    pd.testing.assert_series_equal(kept.min(), buckets.min())
+
+def test_chart_series_is_bounded_and_ends_at_the_newest_sample():
+    df = make_telemetry('vol_a', '2025-01-01', 365 * 288)
+    df.loc[df.index[-1500], 'Latency_ms'] = 90.0
+    pyramid = build_pyramid(df, metrics=['Latency_ms'])
+    assert len(pyramid['Latency_ms']) == len(PYRAMID_LEVELS)
+    for time_range in ['Hour', 'Day', 'Week', 'Month', 'Year']:
+        series = chart_series(pyramid, 'Latency_ms', time_range)
+        assert 0 < len(series) <= MAX_POINTS
+        assert series['Timestamp'].is_monotonic_increasing
+        assert series['Timestamp'].iloc[-1] == df['Timestamp'].iloc[-1]
+        # Every point is a measured sample
+        assert series['Latency_ms'].isin(df['Latency_ms']).all()
+    # The spike survives decimation at every zoom level that covers it
+    for time_range in ['Week', 'Month', 'Year']:
+        assert chart_series(pyramid, 'Latency_ms', time_range)['Latency_ms'].max() == 90.0
+    # Short windows are served raw (both ends inclusive)
+    assert len(chart_series(pyramid, 'Latency_ms', 'Hour')) == 13
+
+def test_rollup_series_charts_the_bucket_max():
+    # Unsorted buckets, as concatenated from several files
+    rollup = pd.DataFrame({
+        'Timestamp': pd.date_range('2026-01-01', periods=2000, freq='1h'),
+        'Latency_ms_mean': np.zeros(2000),
+        'Latency_ms_max': np.arange(2000, dtype='float64')
+    }).sample(frac=1, random_state=0)
+    series = rollup_series(rollup, 'Latency_ms', 'Month')
+    assert len(series) <= MAX_POINTS
+    assert series['Timestamp'].is_monotonic_increasing
+    assert series['Timestamp'].iloc[-1] == rollup['Timestamp'].max()
+    assert series['Latency_ms'].iloc[-1] == 1999.0
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from telemetry_store import open_store
+from fleet_metrics import get_latest_metrics, FleetAnomalySummary, DEFAULT_METADATA
+from reporting import render_fleet_summary_report
+from test_anomaly_detection import make_telemetry
+
+def test_latest_metrics_from_snapshot_match_full_frame(tmp_path):
+    data_path = str(tmp_path / 'storage_data.csv')
+    store = open_store(data_path)
+    store.append(make_telemetry('vol_a', '2026-01-01', 288))
+    store.append(make_telemetry('AZURETEST', '2026-01-01', 200, seed=1))
+    # Late rows for vol_a land after AZURETEST's in the file
+    store.append(make_telemetry('vol_a', '2026-01-02', 3, seed=2))
+
+    from_frame = get_latest_metrics(store.read(), as_frame=True)
+    from_snapshot = get_latest_metrics(store.latest(), as_frame=True)
+    pd.testing.assert_frame_equal(from_snapshot, from_frame)
+    latest = from_frame.set_index('Name')
+    assert latest.loc['vol_a', 'SVM'] == DEFAULT_METADATA['SVM']
+    assert latest.loc['AZURETEST', 'SVM'] == 'USERDATA_SVM'
+    assert latest.loc['vol_a', 'Lat'] == round(float(store.read(volumes=['vol_a'])['Latency_ms'].iloc[-1]), 2)
+
+def test_snapshot_follows_replace_range(tmp_path):
+    data_path = str(tmp_path / 'storage_data.csv')
+    store = open_store(data_path)
+    store.append(make_telemetry('vol_a', '2026-01-01', 288))
+    replacement = make_telemetry('vol_a', '2026-01-01 23:00', 3, seed=1).assign(Latency_ms=7.0)
+    store.replace_range('vol_a', '2026-01-01 23:00', None, replacement)
+    latest = get_latest_metrics(store.latest())
+    assert len(latest) == 1
+    assert latest[0]['Lat'] == 7.0
+    assert store.latest()['Timestamp'].iloc[0] == pd.Timestamp('2026-01-01 23:10')
+    assert get_latest_metrics(store.read().iloc[:0]) == []
+
+def make_scored(vol_name, seed):
+    df = make_telemetry(vol_name, '2026-01-01', 2 * 288, seed=seed)
+    rng = np.random.default_rng(seed)
+    df['Severity'] = rng.choice(['Normal', 'Low', 'Medium', 'High'], len(df), p=[0.9, 0.04, 0.03, 0.03])
+    df['Is_Anomaly'] = df['Severity'] != 'Normal'
+    return df
+
+def test_fleet_summary_fed_in_chunks_matches_one_pass():
+    scored = pd.concat([make_scored('vol_a', 0), make_scored('AZURETEST', 1), make_scored('vol_b', 2)], ignore_index=True)
+    one_pass = FleetAnomalySummary().add(scored)
+    chunked = FleetAnomalySummary()
+    for _, chunk in scored.groupby(np.arange(len(scored)) // 250):
+        chunked.add(chunk)
+
+    assert chunked.total == one_pass.total == scored['Is_Anomaly'].sum()
+    pd.testing.assert_frame_equal(chunked.volumes(), one_pass.volumes())
+    pd.testing.assert_frame_equal(chunked.by_svm(), one_pass.by_svm())
+    table = one_pass.volumes()
+    high = scored[scored['Severity'] == 'High'].groupby('Volume_Name').size()
+    assert table['High'].tolist() == sorted(high.tolist(), reverse=True)
+    assert table.set_index('Volume')['SVM']['AZURETEST'] == 'USERDATA_SVM'
+
+    heatmap = one_pass.heatmap(['vol_a', 'vol_b'], max_columns=12)
+    assert heatmap.shape == (2, 12)
+    assert heatmap.to_numpy().sum() == scored[scored['Volume_Name'].isin(['vol_a', 'vol_b'])]['Is_Anomaly'].sum()
+
+def test_fleet_summary_report_renders():
+    summary = FleetAnomalySummary().add(make_scored('vol_a', 0)).add(make_scored('vol_b', 1))
+    pdf = render_fleet_summary_report(summary, top_n=1)
+    assert pdf.startswith(b'%PDF')
+    assert render_fleet_summary_report(make_scored('vol_a', 0).iloc[:0]).startswith(b'%PDF')
@@ -0,0 +1,86 @@
+import datetime
+import numpy as np
+import pandas as pd
+
+from telemetry_store import open_store
+from hot_cache import VolumeRing, HotCache, get_hot_cache
+from data_generator import inject_normal_data
+from test_anomaly_detection import make_telemetry
+
+def ring_frame(ring):
+    timestamps, metrics = ring.arrays()
+    return timestamps, metrics[:, 0]
+
+def test_ring_wraps_around_in_time_order():
+    ring = VolumeRing(5, covered_from=0)
+    ring.push(np.arange(1, 4), np.arange(1, 4, dtype='float32')[:, None].repeat(3, axis=1))
+    ring.push(np.arange(4, 8), np.arange(4, 8, dtype='float32')[:, None].repeat(3, axis=1))
+    timestamps, latency = ring_frame(ring)
+    assert ring.start != 0 and ring.size == 5
+    assert timestamps.tolist() == [3, 4, 5, 6, 7]
+    assert latency.tolist() == [3, 4, 5, 6, 7]
+    # Evicting samples moves the point from which the ring is complete
+    assert ring.covered_from == 3
+    # Binary search across the wrapped segments
+    assert [ring.search(t) for t in [0, 3, 5, 6, 7, 8]] == [0, 0, 2, 3, 4, 5]
+
+    # A batch larger than the ring keeps only its newest samples
+    ring.push(np.arange(10, 17), np.zeros((7, 3), dtype='float32'))
+    assert ring_frame(ring)[0].tolist() == [12, 13, 14, 15, 16]
+    assert ring.covered_from == 12
+
+def assert_matches_store(cache, store, vol_name, n):
+    expected = store.read(volumes=[vol_name]).tail(n).reset_index(drop=True)
+    pd.testing.assert_frame_equal(cache.tail(vol_name, n), expected, check_categorical=False)
+
+def test_write_listener_keeps_rings_current(tmp_path):
+    data_path = str(tmp_path / 'storage_data.csv')
+    store = open_store(data_path)
+    store.append(make_telemetry('vol_a', '2026-01-01', 3 * 288))
+    cache = get_hot_cache(data_path)
+    assert_matches_store(cache, store, 'vol_a', 100)
+    ring = cache._rings['vol_a']
+
+    # Appends and replacements are folded into the primed ring, not re-read
+    store.append(make_telemetry('vol_a', '2026-01-04', 12, seed=1))
+    replacement = make_telemetry('vol_a', '2026-01-03 23:00', 12, seed=2).assign(Latency_ms=50.0)
+    store.replace_range('vol_a', '2026-01-03 23:00', '2026-01-03 23:55', replacement)
+    assert cache._rings['vol_a'] is ring
+    assert_matches_store(cache, store, 'vol_a', 100)
+
+    # A rewrite drops the rings; the next use primes from the new data
+    store.rewrite(make_telemetry('vol_a', '2026-02-01', 288, seed=3))
+    assert 'vol_a' not in cache._rings
+    assert_matches_store(cache, store, 'vol_a', 50)
+
+def test_write_by_another_process_reprimes(tmp_path):
+    data_path = str(tmp_path / 'storage_data.csv')
+    store = open_store(data_path)
+    store.append(make_telemetry('vol_a', '2026-01-01', 288))
+    # Not registered for this store's writes, like a cache in another process
+    cache = HotCache(data_path)
+    cache.tail('vol_a', 10)
+    store.append(make_telemetry('vol_a', '2026-01-02', 12, seed=1))
+    assert_matches_store(cache, store, 'vol_a', 20)
+
+def test_inject_normal_data_replaces_only_the_last_hour(tmp_path):
+    data_path = str(tmp_path / 'storage_data.csv')
+    store = open_store(data_path)
+    now = pd.Timestamp(datetime.datetime.now()).floor('5min')
+    spike = make_telemetry('vol_a', now - pd.Timedelta(hours=3), 48).assign(Latency_ms=40.0)
+    store.append(spike)
+    store.append(make_telemetry('vol_b', now - pd.Timedelta(hours=3), 48, seed=1))
+    get_hot_cache(data_path).tail('vol_a', 10)
+
+    started = pd.Timestamp(datetime.datetime.now())
+    assert inject_normal_data('vol_a', duration_mins=15, file_path=data_path)
+    df = store.read(volumes=['vol_a'])
+    assert df['Timestamp'].is_monotonic_increasing and df['Timestamp'].is_unique
+    recent = df['Timestamp'] >= started - pd.Timedelta(hours=1)
+    # Last hour and the spike ahead of it: normal values only, plus the 15 minutes bridged ahead
+    assert df.loc[recent, 'Latency_ms'].between(1.0, 3.0).all()
+    assert (df.loc[~recent, 'Latency_ms'] == 40.0).all()
+    assert df['Timestamp'].max() > started + pd.Timedelta(minutes=14)
+    assert len(store.read(volumes=['vol_b'])) == 48
+    # The hot cache saw the replacement through the write listener
+    pd.testing.assert_frame_equal(get_hot_cache(data_path).tail('vol_a', 20), df.tail(20).reset_index(drop=True), check_categorical=False)
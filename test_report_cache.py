@@ -0,0 +1,75 @@
+import os
+import pandas as pd
+
+from report_cache import RenderCache, report_key, STAMPED_FIELDS
+from reporting import stamp_report, _stamp_placeholder
+from test_anomaly_detection import make_telemetry
+
+KB = 1024
+
+def entry(char):
+    return char.encode() * KB
+
+def test_lru_spills_to_disk_and_promotes_back(tmp_path):
+    cache = RenderCache('test', max_memory_mb=3 * KB / (1024 * 1024), spill_dir=str(tmp_path))
+    for key in 'abc':
+        cache.put(key, entry(key))
+    cache.get('a')  # now most recently used
+    cache.put('d', entry('d'))
+    # 'b' was least recently used: spilled, the others stay in memory
+    assert list(cache._entries) == ['c', 'a', 'd']
+    assert os.listdir(tmp_path / 'test') == ['b.bin']
+    assert cache.memory_usage() == 3 * KB
+
+    assert cache.get('b') == entry('b')
+    assert list(cache._entries) == ['a', 'd', 'b']
+    assert cache.stats == {'hits': 1, 'disk_hits': 1, 'misses': 0, 'spilled': 2}
+    assert cache.get('x') is None and cache.stats['misses'] == 1
+    # A second cache (e.g. a renderer process) finds the spilled entries
+    assert RenderCache('test', spill_dir=str(tmp_path)).get('c') == entry('c')
+
+def test_spill_directory_is_trimmed_oldest_first(tmp_path):
+    cache = RenderCache('test', max_memory_mb=KB / (1024 * 1024), max_disk_mb=2 * KB / (1024 * 1024), spill_dir=str(tmp_path))
+    for i, key in enumerate('abcd'):
+        cache.put(key, entry(key))
+        if i:
+            # mtime order is the disk LRU order
+            os.utime(tmp_path / 'test' / f"{'abcd'[i - 1]}.bin", (i, i))
+    assert sorted(os.listdir(tmp_path / 'test')) == ['b.bin', 'c.bin']
+    assert cache.get_or_render('a', lambda: entry('A')) == entry('A')
+
+def make_result(**overrides):
+    history = make_telemetry('vol_a', '2026-01-01', 3 * 288)
+    result = {
+        'id': 'inv-0001', 'timestamp': '2026-01-03 23:55:00', 'volume': 'vol_a', 'severity': 'High',
+        'findings': {'primary_cause': 'Backend Contention', 'confidence_score': 'High'},
+        'recommendations': ['Check QoS'], 'history': history
+    }
+    result.update(overrides)
+    return result
+
+def test_report_key_ignores_stamped_fields_only():
+    key = report_key(make_result())
+    assert report_key(make_result(id='inv-0002', timestamp='2026-01-04 00:00:00')) == key
+    assert report_key(make_result(findings={'primary_cause': 'Workload Spike', 'confidence_score': 'High'})) != key
+
+    # Only the chart's 24-hour window of history counts
+    older = make_result()
+    older['history'].loc[0, 'Latency_ms'] = 99.0
+    assert report_key(older) == key
+    newer = make_result()
+    newer['history'].loc[newer['history'].index[-1], 'Latency_ms'] = 99.0
+    assert report_key(newer) != key
+
+    # Ids nested in digest groups are stamped too
+    digest = {'id': 'dig-1', 'groups': [{'id': 'inv-1', 'volume': 'vol_a', 'count': 3}]}
+    assert report_key(digest) == report_key({'id': 'dig-2', 'groups': [{'id': 'inv-9', 'volume': 'vol_a', 'count': 3}]})
+    assert report_key(digest) != report_key({'id': 'dig-1', 'groups': [{'id': 'inv-1', 'volume': 'vol_a', 'count': 4}]})
+
+def test_stamp_report_keeps_the_body_length():
+    body = f"ID: {_stamp_placeholder('id')} at {_stamp_placeholder('timestamp')}".encode('latin-1')
+    stamped = stamp_report(body, {'id': 'inv-(0001)', 'timestamp': pd.Timestamp('2026-01-03 23:55')})
+    assert len(stamped) == len(body)
+    assert stamped.startswith(b'ID: inv-_0001_ ')
+    assert b'2026-01-03 23:55:00' in stamped
+    assert len(_stamp_placeholder('id')) == STAMPED_FIELDS['id']
@@ -0,0 +1,66 @@
+import pandas as pd
+
+from telemetry_store import open_store
+from rollups import RollupStore, compute_rollup, TIERS, RETENTION
+from test_anomaly_detection import make_telemetry
+
+def assert_rollups_match_raw(rollups, store, volumes):
+    raw = store.read(volumes=volumes)
+    for tier in TIERS:
+        expected = compute_rollup(raw, tier).reset_index(drop=True)
+        actual = rollups.read(tier, volumes=volumes).astype({'Volume_Name': str})
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, rtol=1e-6)
+
+def test_refresh_after_replace_range(tmp_path):
+    data_path = str(tmp_path / 'storage_data.csv')
+    store = open_store(data_path)
+    rollups = RollupStore(data_path)
+    for vol, seed in [('vol_a', 0), ('vol_b', 1)]:
+        df = make_telemetry(vol, '2026-01-01', 3 * 288, seed=seed)
+        store.append(df)
+        rollups.ingest(df)
+    before_b = rollups.read('1h', volumes=['vol_b'])
+
+    # A closed range inside history, then an open-ended one (as inject_normal_data does)
+    spike = make_telemetry('vol_a', '2026-01-02 10:30', 6, seed=2).assign(Latency_ms=80.0)
+    store.replace_range('vol_a', '2026-01-02 10:30', '2026-01-02 10:55', spike)
+    rollups.refresh(['vol_a'], '2026-01-02 10:30', '2026-01-02 10:55')
+    assert_rollups_match_raw(rollups, store, ['vol_a'])
+    hour = rollups.read('1h', volumes=['vol_a'], start='2026-01-02 10:00', end='2026-01-02 10:00')
+    assert hour['Latency_ms_max'].iloc[0] == 80.0
+
+    tail = make_telemetry('vol_a', '2026-01-03 22:00', 6, seed=3)
+    store.replace_range('vol_a', '2026-01-03 22:00', None, tail)
+    rollups.refresh(['vol_a'], '2026-01-03 22:00')
+    assert_rollups_match_raw(rollups, store, ['vol_a'])
+    assert rollups.read('1h', volumes=['vol_a'])['Timestamp'].max() == pd.Timestamp('2026-01-03 22:00')
+    pd.testing.assert_frame_equal(rollups.read('1h', volumes=['vol_b']), before_b)
+
+def test_ingest_merges_appends_exactly_except_p95(tmp_path):
+    data_path = str(tmp_path / 'storage_data.csv')
+    store = open_store(data_path)
+    rollups = RollupStore(data_path)
+    df = make_telemetry('vol_a', '2026-01-01', 2 * 288)
+    # Batches split mid-hour, so buckets are merged from both sides
+    for batch in [df.iloc[:100], df.iloc[100:107], df.iloc[107:]]:
+        store.append(batch)
+        rollups.ingest(batch)
+    for tier in TIERS:
+        expected = compute_rollup(store.read(), tier).reset_index(drop=True)
+        actual = rollups.read(tier).astype({'Volume_Name': str})
+        exact = [col for col in expected.columns if not col.endswith('_p95')]
+        pd.testing.assert_frame_equal(actual[exact], expected[exact], check_dtype=False, rtol=1e-6)
+        # p95 is exact for buckets filled by one batch; merged ones keep the larger part's, within the bucket's range
+        split = actual['Timestamp'] == pd.Timestamp('2026-01-01 08:00').floor(TIERS[tier])
+        for metric in ['Latency_ms', 'IOPS', 'Throughput_MB']:
+            col = f"{metric}_p95"
+            pd.testing.assert_series_equal(actual.loc[~split, col], expected.loc[~split, col], check_dtype=False, rtol=1e-6)
+            assert actual.loc[split, col].between(actual.loc[split, f"{metric}_min"], actual.loc[split, f"{metric}_max"]).all()
+
+def test_tier_for_picks_the_coarsest_fine_enough_tier(tmp_path):
+    rollups = RollupStore(str(tmp_path / 'storage_data.csv'))
+    assert rollups.tier_for('5min') is None
+    assert rollups.tier_for('4h') == '1h'
+    assert rollups.tier_for('1d', span='365D') == '1d'
+    # Hourly buckets aren't kept long enough: the daily tier has to do
+    assert rollups.tier_for('1h', span=RETENTION['1h'] + pd.Timedelta(days=1)) == '1d'
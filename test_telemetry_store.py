@@ -0,0 +1,71 @@
+import os
+import pandas as pd
+import pytest
+
+import telemetry_store
+from telemetry_store import open_store
+from test_anomaly_detection import make_telemetry
+
+def make_store(path):
+    store = open_store(path)
+    store.append(make_telemetry('vol_a', '2026-01-01', 2 * 288))
+    store.append(make_telemetry('vol_b', '2026-01-01', 2 * 288, seed=1))
+    return store
+
+def replacement(start, periods):
+    df = make_telemetry('vol_a', start, periods, seed=2)
+    df['Latency_ms'] = 99.0
+    return df
+
+def test_csv_reads_filter_chunk_by_chunk(tmp_path, monkeypatch):
+    store = make_store(str(tmp_path / 'storage_data.csv'))
+    store.replace_range('vol_a', '2026-01-01 12:00', '2026-01-01 13:00', replacement('2026-01-01 12:00', 13))
+    store.append(make_telemetry('vol_a', '2026-01-03', 12, seed=3))
+    expected = store.read(volumes=['vol_a'], start='2026-01-01 06:00')
+
+    monkeypatch.setattr(telemetry_store, 'CSV_READ_CHUNK_ROWS', 100)
+    actual = store.read(volumes=['vol_a'], start='2026-01-01 06:00')
+    pd.testing.assert_frame_equal(actual, expected)
+    assert len(actual) == 2 * 288 - 72 + 12
+    assert (actual.loc[actual['Timestamp'].between('2026-01-01 12:00', '2026-01-01 13:00'), 'Latency_ms'] == 99.0).all()
+
+def test_parquet_replace_range_is_never_seen_half_done(tmp_path, monkeypatch):
+    store = make_store(str(tmp_path / 'store'))
+    before = store.read(volumes=['vol_a'])
+    new_rows = replacement('2026-01-01 23:00', 24)
+
+    # Crash before the commit: readers keep seeing the old rows only
+    real_replace = os.replace
+    def crash_on_commit(src, dst):
+        if dst.endswith('.committed.json'):
+            raise OSError('crash')
+        real_replace(src, dst)
+    monkeypatch.setattr(telemetry_store.os, 'replace', crash_on_commit)
+    with pytest.raises(OSError):
+        store.replace_range('vol_a', '2026-01-01 23:00', '2026-01-02 00:55', new_rows)
+    monkeypatch.undo()
+    pd.testing.assert_frame_equal(store.read(volumes=['vol_a']), before)
+
+    # Crash after the commit, before the old files are removed: readers see the new rows only
+    real_remove = os.remove
+    def crash_on_cleanup(path):
+        if path.endswith('.parquet'):
+            raise OSError('crash')
+        real_remove(path)
+    monkeypatch.setattr(telemetry_store.os, 'remove', crash_on_cleanup)
+    with pytest.raises(OSError):
+        store.replace_range('vol_a', '2026-01-01 23:00', '2026-01-02 00:55', new_rows)
+    monkeypatch.undo()
+    after = store.read(volumes=['vol_a'])
+    assert len(after) == len(before)
+    assert after['Timestamp'].is_unique
+    assert (after.loc[after['Timestamp'].between('2026-01-01 23:00', '2026-01-02 00:55'), 'Latency_ms'] == 99.0).all()
+
+    # The next replacement finishes the committed one and rolls back the stale pending one
+    for name in os.listdir(store.journal_dir):
+        os.utime(os.path.join(store.journal_dir, name), (0, 0))
+    store.replace_range('vol_a', '2026-01-02 12:00', None, replacement('2026-01-02 12:00', 12))
+    assert os.listdir(store.journal_dir) == []
+    parts = sum(len(files) for _, _, files in os.walk(os.path.join(store.root, 'Volume_Name=vol_a')))
+    assert parts == 2
+    assert len(store.read(volumes=['vol_a'])) == 288 + 144 + 12